@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app import config
+from app.utils.memory import memory_report, start_tracing, stop_tracing, tracing_status
+
+def require_admin():
+    """Admin endpoints expose process internals and are off unless configured"""
+    if not config.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set SIGMA2RML_ADMIN=1)")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/memory")
+def get_memory(limit: int = 20, group_by: str = "lineno", since_baseline: bool = False):
+    """Resident memory and the top allocation sites (when tracemalloc is tracing)"""
+    if not 1 <= limit <= 200:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+    try:
+        return memory_report(limit, group_by, since_baseline)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+@router.get("/memory/tracing")
+def get_memory_tracing():
+    """Whether tracemalloc is tracing, and its memory use"""
+    return tracing_status()
+
+@router.post("/memory/tracing")
+def start_memory_tracing(frames: int = 1):
+    """Start tracemalloc and take the baseline snapshot for since_baseline reports"""
+    if not 1 <= frames <= 64:
+        raise HTTPException(status_code=400, detail="frames must be between 1 and 64")
+    return start_tracing(frames)
+
+@router.delete("/memory/tracing")
+def stop_memory_tracing():
+    """Stop tracemalloc and drop the baseline snapshot"""
+    return stop_tracing()
@@ -1,22 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from app.storage.db import load_db, delete_file_record, get_file_record
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.core.transpiler_refactored import TRANSPILER_VERSION
+from app.storage.db import load_db, delete_file_record, get_file_record, update_file_record
+from app.storage.layout import resolve_path, uploads, translations
+from app.utils.archive_stream import stream_zip, stream_tar, stream_ndjson
+from app.utils.file_responses import build_file_response, file_digest, forget_file, read_text
 import os
-import yaml
+import time
 
 file_router = APIRouter()
 
-def normalize_path(path):
-    """Normalize path to use forward slashes for consistency"""
-    return path.replace('\\', '/')
-
-def resolve_path(stored_path):
-    """Resolve stored path to actual file system path"""
-    # Convert forward slashes back to OS-specific separators for file operations
-    if os.name == 'nt':  # Windows
-        return stored_path.replace('/', '\\')
-    else:  # Unix-like systems
-        return stored_path
-
 @file_router.get("/")
 def list_files():
     """List all uploaded files with their status"""
@@ -36,9 +31,189 @@ def list_files():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load file list: {str(e)}")
 
+EXPORT_FORMATS = {
+    "zip": (stream_zip, "application/zip", "translated_rules.zip"),
+    "tar": (stream_tar, "application/x-tar", "translated_rules.tar"),
+    "ndjson": (stream_ndjson, "application/x-ndjson", "translated_rules.ndjson"),
+}
+
+def parse_since(since):
+    """Parse a since filter given as epoch seconds or an ISO 8601 timestamp"""
+    if since is None or not since.strip():
+        return None
+    try:
+        return float(since)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(since.strip().replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid since timestamp: {since}")
+
+def collect_export_entries(filenames=None, since=None):
+    """Collect metadata for every translated rule matching the filters, without reading contents"""
+    entries = []
+    for record in load_db():
+        if filenames is not None and record["filename"] not in filenames:
+            continue
+        if not record.get("translated") or not record.get("rml_path"):
+            continue
+        
+        actual_rml_path = resolve_path(record["rml_path"])
+        if not os.path.exists(actual_rml_path):
+            continue
+        
+        modified = os.path.getmtime(actual_rml_path)
+        if since is not None and modified < since:
+            continue
+        
+        actual_path = resolve_path(record["path"])
+        entries.append({
+            "filename": record["filename"],
+            "title": record.get("title", ""),
+            "arcname": os.path.basename(actual_rml_path),
+            "path": actual_rml_path,
+            "size": os.path.getsize(actual_rml_path),
+            "modified": modified,
+            "source_sha256": file_digest(actual_path) if os.path.exists(actual_path) else None,
+            "rml_sha256": file_digest(actual_rml_path),
+        })
+    return entries
+
+@file_router.get("/export")
+def export_translations(format: str = "zip", filenames: Optional[str] = None, since: Optional[str] = None):
+    """Stream every translated rule (or a filtered subset) as a zip, tar or NDJSON archive"""
+    from app.core.translation import get_transpiler
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid export format. Allowed formats: {', '.join(EXPORT_FORMATS)}"
+        )
+    
+    since_ts = parse_since(since)
+    wanted = None
+    if filenames:
+        wanted = {name.strip() for name in filenames.split(',') if name.strip()}
+    
+    try:
+        # Taken before scanning so that it can be used as the next since= value
+        generated_at = time.time()
+        entries = collect_export_entries(wanted, since_ts)
+        
+        manifest = {
+            "generated_at": generated_at,
+            "transpiler_version": TRANSPILER_VERSION,
+            "transpiler_options": get_transpiler().output_options(),
+            "since": since_ts,
+            "count": len(entries),
+            "rules": [
+                {
+                    "filename": entry["filename"],
+                    "title": entry["title"],
+                    "rml": entry["arcname"],
+                    "source_sha256": entry["source_sha256"],
+                    "rml_sha256": entry["rml_sha256"],
+                    "modified": entry["modified"],
+                }
+                for entry in entries
+            ],
+        }
+        
+        writer, media_type, download_name = EXPORT_FORMATS[format]
+        return StreamingResponse(
+            writer(manifest, entries),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{download_name}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to export translations: {str(e)}")
+
+def record_fingerprint(record):
+    """Stored fingerprint, or computed from the file (and stored) when it is missing or from another FINGERPRINT_VERSION"""
+    import yaml
+    from app.core.canonical import FINGERPRINT_VERSION, rule_fingerprint
+    if record.get("fingerprint") and record.get("fingerprint_version") == FINGERPRINT_VERSION:
+        return record["fingerprint"]
+    actual_path = resolve_path(record["path"])
+    if not os.path.exists(actual_path):
+        return None
+    try:
+        with open(actual_path, 'r', encoding='utf-8') as f:
+            fingerprint = rule_fingerprint(yaml.safe_load(f))
+    except (ValueError, yaml.YAMLError):
+        return None
+    update_file_record(record["filename"], fingerprint=fingerprint, fingerprint_version=FINGERPRINT_VERSION)
+    return fingerprint
+
+@file_router.get("/duplicates")
+def list_duplicates():
+    """Group uploaded rules that are the same detection written differently"""
+    try:
+        clusters = {}
+        unfingerprinted = []
+        records = load_db()
+        for record in records:
+            fingerprint = record_fingerprint(record)
+            if fingerprint is None:
+                unfingerprinted.append(record["filename"])
+                continue
+            clusters.setdefault(fingerprint, []).append({
+                "filename": record["filename"],
+                "title": record.get("title", ""),
+            })
+
+        duplicates = [
+            {"fingerprint": fingerprint, "count": len(files), "files": files}
+            for fingerprint, files in clusters.items()
+            if len(files) > 1
+        ]
+        duplicates.sort(key=lambda cluster: (-cluster["count"], cluster["files"][0]["filename"]))
+        return {
+            "checked": len(records),
+            "total": len(duplicates),
+            "clusters": duplicates,
+            "unfingerprinted": unfingerprinted,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find duplicates: {str(e)}")
+
+@file_router.get("/pack")
+def pack_rules(compact: bool = False):
+    """One RML specification for every uploaded count and near rule, sharing one monitor per shape"""
+    import yaml
+    from app.core.pack import build_pack
+    from app.core.translation import get_transpiler
+    try:
+        rules = []
+        unreadable = []
+        for record in load_db():
+            actual_path = resolve_path(record["path"])
+            if not os.path.exists(actual_path):
+                unreadable.append({"name": record["filename"], "reason": "File not found on disk"})
+                continue
+            try:
+                with open(actual_path, 'r', encoding='utf-8') as f:
+                    sigma_rule = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                unreadable.append({"name": record["filename"], "reason": f"Invalid YAML format: {str(e)}"})
+                continue
+            if not isinstance(sigma_rule, dict):
+                unreadable.append({"name": record["filename"], "reason": "Invalid YAML format"})
+                continue
+            rules.append((record["filename"], sigma_rule))
+
+        rml, report = build_pack(rules, compact, get_transpiler())
+        report["unpacked"] = unreadable + report["unpacked"]
+        return {"rml": rml, "output_length": len(rml), **report}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to pack rules: {str(e)}")
+
 @file_router.get("/{filename}")
 def view_file(filename: str):
     """View the content of a specific file"""
+    import yaml
     if not filename or not filename.strip():
         raise HTTPException(status_code=400, detail="Invalid filename")
     
@@ -93,6 +268,25 @@ def view_file(filename: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
 
+@file_router.get("/{filename}/raw")
+def view_file_raw(filename: str, request: Request):
+    """Download the original file as-is, with ETag, Range and compression support"""
+    if not filename or not filename.strip():
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    
+    record = get_file_record(filename)
+    if not record:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    actual_path = resolve_path(record["path"])
+    if not os.path.exists(actual_path):
+        raise HTTPException(status_code=404, detail=f"File not found on disk: {actual_path}")
+    
+    try:
+        return build_file_response(request, actual_path, "application/yaml; charset=utf-8", filename)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
+
 @file_router.get("/rml/{filename}")
 def view_rml_legacy(filename: str):
     """Legacy endpoint for viewing RML translation (matches frontend URL structure)"""
@@ -116,8 +310,8 @@ def view_rml(filename: str):
         if not os.path.exists(actual_rml_path):
             raise HTTPException(status_code=404, detail=f"RML file not found on disk: {actual_rml_path}")
         
-        with open(actual_rml_path, "r", encoding="utf-8") as f:
-            rml_content = f.read()
+        # Served from the output cache, warmed when the file was translated
+        rml_content = read_text(actual_rml_path)
         
         return {
             "filename": filename,
@@ -133,6 +327,26 @@ def view_rml(filename: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read RML file: {str(e)}")
 
+@file_router.get("/{filename}/rml/raw")
+def view_rml_raw(filename: str, request: Request):
+    """Download the RML translation as-is, with ETag, Range and compression support"""
+    if not filename or not filename.strip():
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    
+    record = get_file_record(filename)
+    if not record or not record.get("translated") or not record.get("rml_path"):
+        raise HTTPException(status_code=404, detail="RML file not available")
+    
+    actual_rml_path = resolve_path(record["rml_path"])
+    if not os.path.exists(actual_rml_path):
+        raise HTTPException(status_code=404, detail=f"RML file not found on disk: {actual_rml_path}")
+    
+    try:
+        rml_filename = os.path.basename(actual_rml_path)
+        return build_file_response(request, actual_rml_path, "text/plain; charset=utf-8", rml_filename)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read RML file: {str(e)}")
+
 @file_router.delete("/{filename}")
 def delete_file(filename: str):
     """Delete a file and its associated RML translation"""
@@ -150,19 +364,19 @@ def delete_file(filename: str):
         actual_path = resolve_path(record["path"])
         
         # Delete the original file if it exists
-        if os.path.exists(actual_path):
-            os.remove(actual_path)
+        if uploads.remove(record["path"]):
+            forget_file(actual_path)
             deleted_files.append("original file")
         
         # Delete the RML file if it exists
         if record.get("rml_path"):
             actual_rml_path = resolve_path(record["rml_path"])
-            if os.path.exists(actual_rml_path):
-                os.remove(actual_rml_path)
+            if translations.remove(record["rml_path"]):
+                forget_file(actual_rml_path)
                 deleted_files.append("RML translation")
         
         # Remove from database
-        delete_file_record(filename)
+        delete_file_record(filename, durable=True)
         
         return {
             "message": f"File {filename} deleted successfully",
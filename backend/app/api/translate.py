@@ -1,95 +1,109 @@
-from fastapi import APIRouter, HTTPException
-from app.core.transpiler_refactored import RefactoredTranspiler
-from app.storage.db import get_file_record, update_translation_status
-import os
-import yaml
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import List, Optional
+from app import config
+from app.api.transpile import check_profile_request
+from app.core.profiling import profile_call
+from app.core.translation import translate_file
+from app.jobs.events import job_events, job_event_stream
+from app.jobs.worker import get_runner, submit_job
+from app.utils.admission import admit, translate_admission
+from app.storage.db import get_file_record, load_db
 
 router = APIRouter()
-transpiler = RefactoredTranspiler()
 
-def resolve_path(stored_path):
-    """Resolve stored path to actual file system path"""
-    # Convert forward slashes back to OS-specific separators for file operations
-    if os.name == 'nt':  # Windows
-        return stored_path.replace('/', '\\')
-    else:  # Unix-like systems
-        return stored_path
+class JobRequest(BaseModel):
+    """Files to translate: one filename, a list, or every untranslated file"""
+    filename: Optional[str] = None
+    filenames: Optional[List[str]] = None
+    all_untranslated: bool = False
 
-@router.post("/{filename}")
-def translate_sigma_file(filename: str):
-    """Translate a Sigma rule file to RML"""
-    # Validate filename
-    if not filename or not filename.strip():
-        raise HTTPException(status_code=400, detail="Invalid filename")
-    
-    # Get file record
-    record = get_file_record(filename)
-    if not record:
-        raise HTTPException(status_code=404, detail="File not found")
+@router.post("/jobs", status_code=202)
+def submit_translation_job(request: JobRequest):
+    """Queue a background translation job and return immediately"""
+    if request.all_untranslated:
+        filenames = [f["filename"] for f in load_db() if not f.get("translated", False)]
+    else:
+        filenames = list(request.filenames or [])
+        if request.filename:
+            filenames.insert(0, request.filename)
+        if not filenames:
+            raise HTTPException(status_code=400, detail="Provide filename, filenames or all_untranslated")
 
-    try:
-        # Resolve the stored path to actual file system path
-        actual_path = resolve_path(record["path"])
-        
-        # Check if file exists on disk
-        if not os.path.exists(actual_path):
-            raise HTTPException(status_code=404, detail=f"File not found on disk: {actual_path}")
-        
-        # Read and validate Sigma rule
-        with open(actual_path, "r", encoding="utf-8") as f:
-            sigma_text = f.read()
-        
-        if not sigma_text.strip():
-            raise HTTPException(status_code=400, detail="File is empty")
-        
-        # Validate YAML format
-        try:
-            yaml_content = yaml.safe_load(sigma_text)
-            if not yaml_content:
-                raise HTTPException(status_code=400, detail="Invalid YAML format")
-        except yaml.YAMLError as e:
-            raise HTTPException(status_code=400, detail=f"Invalid YAML format: {str(e)}")
-        
-        # Transpile to RML
-        rml_output = transpiler.transpile(sigma_text)
-        
-        if not rml_output:
-            raise HTTPException(status_code=500, detail="Transpilation failed - no output generated")
-        
-        # Create translated_files directory if it doesn't exist
-        translated_dir = "translated_files"
-        os.makedirs(translated_dir, exist_ok=True)
-        
-        # Save translated RML to file
-        rml_filename = filename.rsplit('.', 1)[0] + ".rml"
-        rml_path = os.path.join(translated_dir, rml_filename)
-        
-        # Normalize path for storage (use forward slashes)
-        normalized_rml_path = rml_path.replace('\\', '/')
-        
-        with open(rml_path, "w", encoding="utf-8") as f:
-            f.write(rml_output)
+        # Keep the request order, drop duplicates
+        filenames = list(dict.fromkeys(filenames))
+        missing = [name for name in filenames if not name or not get_file_record(name)]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"File not found: {', '.join(missing)}")
+
+    job_id = submit_job(filenames)
+    return get_runner().queue.get(job_id)
 
-        # Update database record with normalized path
-        update_translation_status(filename, normalized_rml_path)
-        
-        return {
-            "status": "success", 
-            "filename": filename,
-            "rml_text": rml_output,
-            "rml_path": normalized_rml_path,
-            "actual_rml_path": rml_path,
-            "message": f"Successfully translated {filename} to RML"
-        }
+@router.get("/jobs/{job_id}")
+def get_translation_job(job_id: str):
+    """Get the status of a translation job and of each of its files"""
+    job = get_runner().queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
+@router.post("/jobs/{job_id}/cancel")
+def cancel_translation_job(job_id: str):
+    """Cancel the files of a job that have not started yet"""
+    queue = get_runner().queue
+    if not queue.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    job_events.publish(job_id, {"id": None, "event": "cancelled"})
+    return queue.get(job_id)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_translation_job(job_id: str, request: Request):
+    """Stream per-file completion events of a job as server-sent events"""
+    queue = (await run_in_threadpool(get_runner)).queue
+    if not await run_in_threadpool(queue.get, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return StreamingResponse(
+        job_event_stream(queue, job_id, request=request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/{filename}", dependencies=[Depends(admit(translate_admission))])
+def translate_sigma_file(filename: str, profile: bool = False, profile_dump: Optional[str] = None):
+    """Translate a Sigma rule file to RML"""
+    check_profile_request(profile, profile_dump)
+    report = None
+    try:
+        if profile or profile_dump:
+            result, report = profile_call(
+                translate_file, filename,
+                label=f"translate-{filename}", dump=profile_dump, directory=config.PROFILE_DIR
+            )
+        else:
+            result = translate_file(filename)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except RuntimeError as re:
+        raise HTTPException(status_code=500, detail=str(re))
     except Exception as e:
         # Log the error for debugging
         print(f"Error translating {filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
 
+    response = {
+        "status": "success",
+        **result,
+        "message": f"Successfully translated {filename} to RML"
+    }
+    if report is not None:
+        response["profile"] = report
+    return response
+
 @router.get("/{filename}/status")
 def get_translation_status(filename: str):
     """Get the translation status of a file"""
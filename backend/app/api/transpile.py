@@ -1,39 +1,81 @@
-from fastapi import APIRouter, Form, HTTPException
-from app.core.transpiler_refactored import RefactoredTranspiler
-import yaml
+from fastapi import APIRouter, Depends, Form, HTTPException
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from app import config
+from app.core.metrics import stage
+from app.core.profiling import DUMP_FORMATS, profile_call
+from app.core.translation import get_transpiler
+from app.utils.admission import admit, transpile_admission
+from app.utils.singleflight import SingleFlight, rule_key
 
 router = APIRouter()
-transpiler = RefactoredTranspiler()
 
-@router.post("/")
-async def transpile_sigma(sigma_text: str = Form(...)):
+# Identical rules submitted concurrently (editor autosave, CI) share one transpilation
+transpile_flight = SingleFlight()
+
+def _transpile(sigma_rule, compact=False):
+    """RML for a rule and, for compact output, its source map"""
+    if compact:
+        return get_transpiler().transpile_with_source_map(sigma_rule)
+    return get_transpiler().transpile(sigma_rule), None
+
+def check_profile_request(profile: bool, profile_dump: Optional[str]):
+    """Reject profiling requests when profiling is off or the dump format is unknown"""
+    if not (profile or profile_dump):
+        return
+    if not config.PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled (set SIGMA2RML_PROFILING=1)")
+    if profile_dump is not None and profile_dump not in DUMP_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported profile_dump: {profile_dump}. Supported: {', '.join(DUMP_FORMATS)}"
+        )
+
+@router.post("/", dependencies=[Depends(admit(transpile_admission))])
+async def transpile_sigma(sigma_text: str = Form(...), compact: bool = False, profile: bool = False, profile_dump: Optional[str] = None):
     """Transpile Sigma rule text to RML"""
+    import yaml
     try:
         # Validate input
         if not sigma_text or not sigma_text.strip():
             raise HTTPException(status_code=400, detail="Sigma rule text is required")
+        check_profile_request(profile, profile_dump)
         
         # Try to parse as YAML first
         try:
-            yaml_content = yaml.safe_load(sigma_text)
+            with stage("yaml_load"):
+                yaml_content = yaml.safe_load(sigma_text)
             if not yaml_content:
                 raise HTTPException(status_code=400, detail="Invalid YAML format")
         except yaml.YAMLError as e:
             raise HTTPException(status_code=400, detail=f"Invalid YAML format: {str(e)}")
         
-        # Transpile to RML
-        result = transpiler.transpile(sigma_text)
+        report = None
+        if profile or profile_dump:
+            # Profiled runs are never coalesced and include YAML loading in the transpiler
+            (result, source_map), report = await run_in_threadpool(
+                profile_call, _transpile, sigma_text, compact,
+                label="transpile", dump=profile_dump, directory=config.PROFILE_DIR
+            )
+        else:
+            # Transpile the parsed rule off the event loop, coalesced by normalized rule and layout
+            result, source_map = await transpile_flight.do((rule_key(yaml_content), compact), _transpile, yaml_content, compact)
         
         if not result:
             raise HTTPException(status_code=500, detail="Transpilation failed - no output generated")
         
-        return {
+        response = {
             "status": "success",
             "rml": result,
             "input_length": len(sigma_text),
             "output_length": len(result),
             "message": "Sigma rule successfully transpiled to RML"
         }
+        if source_map is not None:
+            response["source_map"] = source_map
+        if report is not None:
+            response["profile"] = report
+        return response
         
     except HTTPException:
         raise
@@ -43,6 +85,7 @@ async def transpile_sigma(sigma_text: str = Form(...)):
 @router.post("/validate")
 async def validate_sigma(sigma_text: str = Form(...)):
     """Validate Sigma rule format without transpiling"""
+    import yaml
     try:
         # Validate input
         if not sigma_text or not sigma_text.strip():
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from app.storage.store import store_uploaded_file
+from app.utils.admission import admit, upload_admission
 import os
 
 router = APIRouter()
 
-@router.post("/")
+@router.post("/", dependencies=[Depends(admit(upload_admission))])
 async def upload_file(file: UploadFile = File(...)):
     """Upload a Sigma rule file"""
     try:
@@ -0,0 +1,89 @@
+"""
+Runtime configuration
+Every setting can be overridden through a SIGMA2RML_* environment variable
+"""
+
+import os
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+# Registry write-behind: flush at most every N milliseconds or after K pending mutations.
+# An interval of 0 writes every mutation through synchronously.
+REGISTRY_FLUSH_INTERVAL_MS = _env_float("SIGMA2RML_REGISTRY_FLUSH_INTERVAL_MS", 5.0)
+REGISTRY_FLUSH_BATCH = _env_int("SIGMA2RML_REGISTRY_FLUSH_BATCH", 100)
+
+# Registry backend: "json" (single process, write-behind) or "sqlite" (WAL mode, safe
+# for uvicorn --workers N). Cache invalidation between workers goes through REGISTRY_EVENTS_PATH.
+REGISTRY_BACKEND = os.environ.get("SIGMA2RML_REGISTRY_BACKEND", "json").strip().lower()
+REGISTRY_EVENTS_PATH = os.environ.get("SIGMA2RML_REGISTRY_EVENTS_PATH", "registry_events.log")
+
+# Background translation jobs: queue database, worker threads per process, and how
+# often idle workers check the queue for jobs submitted by other processes.
+JOBS_DB_PATH = os.environ.get("SIGMA2RML_JOBS_DB_PATH", "translation_jobs.db")
+JOB_WORKERS = _env_int("SIGMA2RML_JOB_WORKERS", min(4, os.cpu_count() or 1))
+JOB_POLL_INTERVAL_S = _env_float("SIGMA2RML_JOB_POLL_INTERVAL_S", 1.0)
+
+# Job progress streams: events buffered per stream, how long a worker waits for a
+# slow stream before dropping events (the stream then catches up from the queue),
+# and the keepalive interval.
+JOB_EVENTS_QUEUE_SIZE = _env_int("SIGMA2RML_JOB_EVENTS_QUEUE_SIZE", 256)
+JOB_EVENTS_PUT_TIMEOUT_S = _env_float("SIGMA2RML_JOB_EVENTS_PUT_TIMEOUT_S", 0.1)
+JOB_EVENTS_KEEPALIVE_S = _env_float("SIGMA2RML_JOB_EVENTS_KEEPALIVE_S", 10.0)
+
+# Eager mode: queue a translation as soon as a file is uploaded. Warmup: on startup,
+# queue every record whose RML is missing or was built from another source or transpiler version.
+EAGER_TRANSLATE = _env_bool("SIGMA2RML_EAGER_TRANSLATE", False)
+WARMUP_ON_STARTUP = _env_bool("SIGMA2RML_WARMUP_ON_STARTUP", EAGER_TRANSLATE)
+
+# Admission control for transpile, translate and upload: requests running at once,
+# requests allowed to wait, and how long they may wait before being shed with 503.
+ADMISSION_MAX_CONCURRENCY = _env_int("SIGMA2RML_ADMISSION_MAX_CONCURRENCY", max(2, os.cpu_count() or 1))
+ADMISSION_QUEUE_SIZE = _env_int("SIGMA2RML_ADMISSION_QUEUE_SIZE", 32)
+ADMISSION_QUEUE_TIMEOUT_S = _env_float("SIGMA2RML_ADMISSION_QUEUE_TIMEOUT_S", 10.0)
+
+# On-demand profiling (?profile=true on transpile and translate): off by default because
+# it exposes code paths and serializes profiled requests. Dumps go to PROFILE_DIR.
+PROFILING_ENABLED = _env_bool("SIGMA2RML_PROFILING", False)
+PROFILE_DIR = os.environ.get("SIGMA2RML_PROFILE_DIR", "profiles")
+
+# Admin endpoints (/admin/memory): off by default. A non-zero TRACEMALLOC_FRAMES starts
+# allocation tracing at startup with that many frames per traceback.
+ADMIN_ENABLED = _env_bool("SIGMA2RML_ADMIN", False)
+TRACEMALLOC_FRAMES = _env_int("SIGMA2RML_TRACEMALLOC_FRAMES", 0)
+
+# Readiness (/ready): a handler counts as saturated once all its slots are busy and its
+# admission queue is at least this full (0..1).
+READY_QUEUE_THRESHOLD = _env_float("SIGMA2RML_READY_QUEUE_THRESHOLD", 0.5)
+
+# Condition limits: rules whose condition is longer than this many characters or nests
+# parentheses deeper than this are rejected with an error instead of being parsed.
+CONDITION_MAX_LENGTH = _env_int("SIGMA2RML_CONDITION_MAX_LENGTH", 100_000)
+CONDITION_MAX_DEPTH = _env_int("SIGMA2RML_CONDITION_MAX_DEPTH", 64)
+
+# count() monitors: 0 keeps the tumbling window anchored on the first matching event; N
+# slides the window in N buckets (N + 1 state values, at most one bucket undercounted).
+COUNT_BUCKETS = _env_int("SIGMA2RML_COUNT_BUCKETS", 0)
+
+# count() by field monitors: keys tracked at once (3 state values each). A key's slot is
+# recycled once it has been idle for the rule's timeframe.
+COUNT_KEYS = _env_int("SIGMA2RML_COUNT_KEYS", 8)
+
+# count(field) monitors keep up to `limit` distinct values per key; rules with a larger limit
+# count every matching event instead, with a warning comment in their RML.
+COUNT_MAX_DISTINCT = _env_int("SIGMA2RML_COUNT_MAX_DISTINCT", 32)
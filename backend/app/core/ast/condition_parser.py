@@ -296,11 +296,19 @@ class ConditionParser:
                     self.eat()  # Consume the temporal operator
                     
                     if temporal_op == 'count':
-                        # Handle count() case
+                        # Handle count([distinct] [field]) [by field] case
+                        field = group_by = None
                         if self.current_token() == '(':
                             self.eat('(')  # Consume (
+                            if self.current_token() and self.current_token().lower() == 'distinct':
+                                self.eat()
+                            if self.current_token() not in (None, ')'):
+                                field = self.eat()
                             if self.current_token() == ')':
                                 self.eat(')')  # Consume )
+                                if self.current_token() and self.current_token().lower() == 'by':
+                                    self.eat()
+                                    group_by = self.eat() if self.current_token() else None
                                 # Look for comparison
                                 if self.current_token() and '>' in self.current_token():
                                     count_expr = self.eat()
@@ -314,15 +322,15 @@ class ConditionParser:
                                     if '>' in count_expr:
                                         try:
                                             count_num = int(count_expr.split('>')[1])
-                                            return TemporalNode(token, 'count', None, None, count_num)
+                                            return TemporalNode(token, 'count', None, None, count_num, field, group_by)
                                         except (ValueError, IndexError):
-                                            return TemporalNode(token, 'count', None, None, count_expr)
+                                            return TemporalNode(token, 'count', None, None, count_expr, field, group_by)
                                     else:
-                                        return TemporalNode(token, 'count', None, None, count_expr)
+                                        return TemporalNode(token, 'count', None, None, count_expr, field, group_by)
                                 else:
-                                    return TemporalNode(token, 'count', None, None, "5")
+                                    return TemporalNode(token, 'count', None, None, "5", field, group_by)
                             else:
-                                return TemporalNode(token, 'count', None, None, "5")
+                                return TemporalNode(token, 'count', None, None, "5", field)
                         else:
                             return TemporalNode(token, 'count', None, None, "5")
                     else:
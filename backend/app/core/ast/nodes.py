@@ -1,6 +1,8 @@
 # backend/app/core/ast/nodes.py
 
 import re
+from ..intervals import BOUND_MODIFIERS, Interval
+from ..value_sets import compress_values, format_alternation, membership_guard
 
 class ASTNode:
     """Base class for all AST nodes"""
@@ -45,11 +47,7 @@ class SelectionNode(ASTNode):
         for field, value in self.fields.items():
             if isinstance(value, list):
                 # Handle list values with OR operator
-                if all(isinstance(v, str) for v in value):
-                    quoted_values = [f"'{v}'" for v in value]
-                    field_pairs.append(f"{field.lower()}: {' | '.join(quoted_values)}")
-                else:
-                    field_pairs.append(f"{field.lower()}: {' | '.join(str(v) for v in value)}")
+                field_pairs.append(f"{field.lower()}: {format_alternation(compress_values(value).values())}")
             elif isinstance(value, str):
                 field_pairs.append(f"{field.lower()}: '{value}'")
             else:
@@ -63,11 +61,7 @@ class SelectionNode(ASTNode):
         for field, value in self.fields.items():
             if isinstance(value, list):
                 # Handle list values with OR operator
-                if all(isinstance(v, str) for v in value):
-                    quoted_values = [f"'{v}'" for v in value]
-                    field_pairs.append(f"{field.lower()}: {' | '.join(quoted_values)}")
-                else:
-                    field_pairs.append(f"{field.lower()}: {' | '.join(str(v) for v in value)}")
+                field_pairs.append(f"{field.lower()}: {format_alternation(compress_values(value).values())}")
             elif isinstance(value, str):
                 field_pairs.append(f"{field.lower()}: '{value}'")
             else:
@@ -92,192 +86,106 @@ class MatchNode(ASTNode):
         self.name = name
         self.fields = fields
     
-    def to_rml(self) -> str:
-        """Convert match to RML format: selection matches {eventid: 4663, accesses: 'DELETE'};"""
+    def _patterns(self):
+        """Field patterns and their constraints; numeric bounds on a field share one variable"""
         field_pairs = []
         modifier_constraints = []
         modifier_counter = 1
+        intervals = self._intervals()
         
         for field, value in self.fields.items():
             if isinstance(value, list):
-                # Handle list values with OR operator
-                if all(isinstance(v, str) for v in value):
-                    quoted_values = [f"'{v}'" for v in value]
-                    field_pairs.append(f"{field.lower()}: {' | '.join(quoted_values)}")
+                # Handle list values with OR operator; integer runs become range checks
+                value_set = compress_values(value)
+                if value_set.ranges:
+                    field_pairs.append(f"{field.lower()}: x{modifier_counter}")
+                    modifier_constraints.append(membership_guard(f"x{modifier_counter}", value_set, "&&", "||"))
+                    modifier_counter += 1
                 else:
-                    field_pairs.append(f"{field.lower()}: {' | '.join(str(v) for v in value)}")
+                    field_pairs.append(f"{field.lower()}: {format_alternation(value_set.literals)}")
             elif isinstance(value, str):
                 field_pairs.append(f"{field.lower()}: '{value}'")
             else:
                 # Check for comparison operators (only support lt, lte, gt, gte)
                 if '|' in str(field):
                     base_field, operator = field.split('|', 1)
-                    if operator in ['lt', 'lte', 'gt', 'gte']:
-                        # Generate RML with comparison: {field: x1} with x1 <= value
-                        field_pairs.append(f"{base_field.lower()}: x{modifier_counter}")
-                        
-                        # Convert operator to RML syntax
-                        if operator == 'lt':
-                            rml_op = '<'
-                        elif operator == 'lte':
-                            rml_op = '<='
-                        elif operator == 'gt':
-                            rml_op = '>'
-                        elif operator == 'gte':
-                            rml_op = '>='
+                    if operator in BOUND_MODIFIERS:
+                        interval = intervals.pop(base_field.lower(), None)
+                        if interval is None:
+                            # Already emitted with the field's first bound
+                            continue
+                        point = interval.point()
+                        if point is not None:
+                            field_pairs.append(f"{base_field.lower()}: {point}")
                         else:
-                            rml_op = '='
-                        
-                        modifier_constraints.append(f"x{modifier_counter} {rml_op} {value}")
-                        modifier_counter += 1
+                            # Generate RML with comparison: {field: x1} with x1 >= low && x1 <= high
+                            field_pairs.append(f"{base_field.lower()}: x{modifier_counter}")
+                            modifier_constraints.extend(interval.constraints(f"x{modifier_counter}"))
+                            modifier_counter += 1
                     else:
                         # Unsupported modifier - mark as unsupported
                         field_pairs.append(f"// UNSUPPORTED MODIFIER: {field.lower()}: {value} ({operator} not supported)")
                 else:
                     field_pairs.append(f"{field.lower()}: {value}")
         
-        # Build the RML string
-        rml_content = f"{self.name} matches {{{', '.join(field_pairs)}}}"
-        
-        # Add modifier constraints if any
-        if modifier_constraints:
-            rml_content += f" with {' && '.join(modifier_constraints)}"
-        
-        return rml_content + ";"
+        return field_pairs, modifier_constraints
     
-    def to_rml_content(self) -> str:
-        """Return just the content part without the selection name"""
-        field_pairs = []
-        modifier_constraints = []
-        modifier_counter = 1
-        
+    def _intervals(self) -> dict:
+        """Every lt/lte/gt/gte bound merged per field, in the order fields first appear"""
+        intervals = {}
         for field, value in self.fields.items():
-            if isinstance(value, list):
-                # Handle list values with OR operator
-                if all(isinstance(v, str) for v in value):
-                    quoted_values = [f"'{v}'" for v in value]
-                    field_pairs.append(f"{field.lower()}: {' | '.join(quoted_values)}")
-                else:
-                    field_pairs.append(f"{field.lower()}: {' | '.join(str(v) for v in value)}")
-            elif isinstance(value, str):
-                field_pairs.append(f"{field.lower()}: '{value}'")
-            else:
-                # Check for comparison operators (only support lt, lte, gt, gte)
-                if '|' in str(field):
-                    base_field, operator = field.split('|', 1)
-                    if operator in ['lt', 'lte', 'gt', 'gte']:
-                        # Generate RML with comparison: {field: x1} with x1 <= value
-                        field_pairs.append(f"{base_field.lower()}: x{modifier_counter}")
-                        
-                        # Convert operator to RML syntax
-                        if operator == 'lt':
-                            rml_op = '<'
-                        elif operator == 'lte':
-                            rml_op = '<='
-                        elif operator == 'gt':
-                            rml_op = '>'
-                        elif operator == 'gte':
-                            rml_op = '>='
-                        else:
-                            rml_op = '='
-                        
-                        modifier_constraints.append(f"x{modifier_counter} {rml_op} {value}")
-                        modifier_counter += 1
-                    else:
-                        # Unsupported modifier - mark as unsupported
-                        field_pairs.append(f"// UNSUPPORTED MODIFIER: {field.lower()}: {value} ({operator} not supported)")
-                else:
-                    field_pairs.append(f"{field.lower()}: {value}")
-        
-        # Build the content string
-        content = f"{{{', '.join(field_pairs)}}}"
-        
-        # Add modifier constraints if any
+            if isinstance(value, (list, str)) or '|' not in str(field):
+                continue
+            base_field, operator = field.split('|', 1)
+            if operator in BOUND_MODIFIERS:
+                intervals.setdefault(base_field.lower(), Interval()).narrow(operator, value)
+        return intervals
+    
+    def never_matches(self) -> list:
+        """Fields whose numeric bounds contradict each other"""
+        return [field for field, interval in self._intervals().items() if interval.is_empty()]
+    
+    def _with_constraints(self, content: str, modifier_constraints: list) -> str:
         if modifier_constraints:
             content += f" with {' && '.join(modifier_constraints)}"
-        
         return content
     
+    def _flag_empty(self, rml: str) -> str:
+        empty_fields = self.never_matches()
+        if empty_fields:
+            rml += f" // never matches: empty range for {', '.join(empty_fields)}"
+        return rml
+    
+    def to_rml(self) -> str:
+        """Convert match to RML format: selection matches {eventid: 4663, accesses: 'DELETE'};"""
+        field_pairs, modifier_constraints = self._patterns()
+        rml_content = f"{self.name} matches {{{', '.join(field_pairs)}}}"
+        return self._flag_empty(self._with_constraints(rml_content, modifier_constraints) + ";")
+    
+    def to_rml_content(self) -> str:
+        """Return just the content part without the selection name"""
+        field_pairs, modifier_constraints = self._patterns()
+        return self._with_constraints(f"{{{', '.join(field_pairs)}}}", modifier_constraints)
+    
     def get_comparison_constraints(self) -> list:
         """Get comparison constraints for fields with supported operators (lt, lte, gt, gte)"""
         constraints = []
         modifier_counter = 1
         
-        for field, value in self.fields.items():
-            if '|' in str(field):
-                base_field, operator = field.split('|', 1)
-                if operator in ['lt', 'lte', 'gt', 'gte']:
-                    # Convert operator to RML syntax
-                    if operator == 'lt':
-                        rml_op = '<'
-                    elif operator == 'lte':
-                        rml_op = '<='
-                    elif operator == 'gt':
-                        rml_op = '>'
-                    elif operator == 'gte':
-                        rml_op = '>='
-                    else:
-                        rml_op = '='
-                    
-                    constraints.append(f"{base_field.lower()}: x{modifier_counter} with x{modifier_counter} {rml_op} {value}")
-                    modifier_counter += 1
-                # Note: Unsupported modifiers are handled in to_rml() method
+        # Note: Unsupported modifiers are handled in to_rml() method
+        for base_field, interval in self._intervals().items():
+            checks = ' && '.join(interval.constraints(f"x{modifier_counter}"))
+            constraints.append(f"{base_field}: x{modifier_counter} with {checks}")
+            modifier_counter += 1
         
         return constraints
     
     def get_negation_rml(self) -> str:
         """Generate negation using 'not matches' with opposite conditions"""
-        field_pairs = []
-        modifier_constraints = []
-        modifier_counter = 1
-        
-        for field, value in self.fields.items():
-            if isinstance(value, list):
-                # Handle list values with OR operator
-                if all(isinstance(v, str) for v in value):
-                    quoted_values = [f"'{v}'" for v in value]
-                    field_pairs.append(f"{field.lower()}: {' | '.join(quoted_values)}")
-                else:
-                    field_pairs.append(f"{field.lower()}: {' | '.join(str(v) for v in value)}")
-            elif isinstance(value, str):
-                field_pairs.append(f"{field.lower()}: '{value}'")
-            else:
-                # Check for comparison operators (only support lt, lte, gt, gte)
-                if '|' in str(field):
-                    base_field, operator = field.split('|', 1)
-                    if operator in ['lt', 'lte', 'gt', 'gte']:
-                        # Generate RML with comparison: {field: x1} with x1 [operator] value
-                        field_pairs.append(f"{base_field.lower()}: x{modifier_counter}")
-                        
-                        # Convert operator to RML syntax (keep same operator for not matches)
-                        if operator == 'lt':
-                            rml_op = '<'
-                        elif operator == 'lte':
-                            rml_op = '<='
-                        elif operator == 'gt':
-                            rml_op = '>'
-                        elif operator == 'gte':
-                            rml_op = '>='
-                        else:
-                            rml_op = '='
-                        
-                        modifier_constraints.append(f"x{modifier_counter} {rml_op} {value}")
-                        modifier_counter += 1
-                    else:
-                        # Unsupported modifier - mark as unsupported
-                        field_pairs.append(f"// UNSUPPORTED MODIFIER: {field.lower()}: {value} ({operator} not supported)")
-                else:
-                    field_pairs.append(f"{field.lower()}: {value}")
-        
-        # Build the negation RML string
+        field_pairs, modifier_constraints = self._patterns()
         safe_name = f"safe_{self.name}" if hasattr(self, 'name') else "safe_selection"
         rml_content = f"{safe_name} not matches {{{', '.join(field_pairs)}}}"
-        
-        # Add modifier constraints if any
-        if modifier_constraints:
-            rml_content += f" with {' && '.join(modifier_constraints)}"
-        
-        return rml_content + ";"
+        return self._flag_empty(self._with_constraints(rml_content, modifier_constraints) + ";")
 
 class AndNode(ASTNode):
     """Represents logical AND operation"""
@@ -368,12 +276,15 @@ class QuantifierNode(ASTNode):
 class TemporalNode(ASTNode):
     """Represents temporal operators like '| near', '| count'"""
     
-    def __init__(self, selection1: str, operator: str, selection2: str = None, timeframe: str = None, count: int = None):
+    def __init__(self, selection1: str, operator: str, selection2: str = None, timeframe: str = None, count: int = None,
+                 field: str = None, group_by: str = None):
         self.selection1 = selection1
         self.operator = operator
         self.selection2 = selection2
         self.timeframe = timeframe or "10s"  # Default 10 seconds
         self.count = count
+        self.field = field  # count(field): distinct values of field
+        self.group_by = group_by  # count() by field: one count per value of field
     
     def to_rml(self) -> str:
         """Convert temporal to RML format"""
@@ -386,7 +297,8 @@ class TemporalNode(ASTNode):
         elif self.operator == "within":
             return f"temporal_within({self.selection1}, {self.selection2}, {self.timeframe})"
         elif self.operator == "count":
-            return f"temporal_count({self.selection1}, {self.count}, {self.timeframe})"
+            keys = (f", distinct={self.field}" if self.field else "") + (f", by={self.group_by}" if self.group_by else "")
+            return f"temporal_count({self.selection1}, {self.count}, {self.timeframe}{keys})"
         else:
             return f"// Unknown temporal operator: {self.operator}"
 
@@ -6,6 +6,8 @@ Handles complex Sigma temporal conditions with multiple selections, AND/OR opera
 import re
 from typing import List, Dict, Any, Tuple, Optional
 from .nodes import ASTNode, NameNode, AndNode, OrNode, NotNode, MatchNode
+from ..emitter import RMLEmitter, render
+from ..value_sets import compress_values, format_alternation
 
 class TemporalMonitorGenerator:
     """Generates RML temporal monitor patterns for complex Sigma conditions"""
@@ -81,8 +83,13 @@ class TemporalMonitorGenerator:
             selections: List of (selection_name, is_negated) tuples
             timeframe_ms: Timeframe in milliseconds
         """
+        return render(lambda out: self.emit_temporal_monitor(selections, timeframe_ms, out))
+    
+    def emit_temporal_monitor(self, selections: List[Tuple[str, bool]], timeframe_ms: int, out: RMLEmitter):
+        """Write the temporal monitor to out, one selection rule at a time"""
         if not selections:
-            return "// No selections found for temporal monitor"
+            out.comment("No selections found for temporal monitor")
+            return
         
         num_selections = len(selections)
         
@@ -91,28 +98,23 @@ class TemporalMonitorGenerator:
         initial_state = ", ".join(["0" for _ in range(num_selections)])
         
         # Generate the main monitor declaration
-        rml = f"Main = logsource >> Monitor<0, {initial_state}>!;\n"
-        rml += f"Monitor<start_ts, {state_vars}> = \n"
-        
-        # Generate monitor rules for each selection
-        for i, (selection_name, is_negated) in enumerate(selections):
-            rml += self._generate_selection_rule(selection_name, is_negated, i, num_selections, timeframe_ms)
-            if i < num_selections - 1:
-                rml += "\n\\/\n"
-        
-        # Generate other_events rule
-        rml += "\n\\/\n"
-        rml += self._generate_other_events_rule(num_selections, timeframe_ms)
-        
-        # Add semicolon at the end
-        rml += ";"
+        out.line(f"Main = logsource >> Monitor<0, {initial_state}>!;")
         
-        return rml
+        with out.statement():
+            out.write(f"Monitor<start_ts, {state_vars}> = \n")
+            
+            # Generate monitor rules for each selection, then the other_events rule
+            for i, (selection_name, is_negated) in enumerate(selections):
+                self._write_selection_rule(out, selection_name, is_negated, i, num_selections, timeframe_ms)
+                out.write("\n\\/\n")
+            self._write_other_events_rule(out, num_selections, timeframe_ms)
+            
+            # Add semicolon at the end
+            out.write(";")
     
-    def _generate_selection_rule(self, selection_name: str, is_negated: bool, 
-                                selection_index: int, total_selections: int, 
-                                timeframe_ms: int) -> str:
-        """Generate RML rule for a specific selection"""
+    def _write_selection_rule(self, out: RMLEmitter, selection_name: str, is_negated: bool,
+                              selection_index: int, total_selections: int, timeframe_ms: int):
+        """Write the RML rule for a specific selection into the current statement"""
         
         # Create safe selection name
         safe_name = f"safe_{selection_name}"
@@ -140,39 +142,37 @@ class TemporalMonitorGenerator:
             check_condition = f"Monitor<start_ts, {new_state_str}>"
         
         # Handle negation - always use (ts) for the selection call
-        rml = f"{{\n    let ts; {safe_name}(ts) (\n"
+        out.write(f"{{\n    let ts; {safe_name}(ts) (\n")
         
         # Generate the main logic
-        rml += f"        if (start_ts == 0 || ts - start_ts > {timeframe_ms})\n"
-        rml += f"            Monitor<ts, {new_state_str}>\n"
-        rml += f"        else (\n"
-        rml += f"            {check_condition}\n"
-        rml += f"        )\n"
-        rml += f"    )\n"
-        rml += f"}}"
-        
-        return rml
+        out.write(f"        if (start_ts == 0 || ts - start_ts > {timeframe_ms})\n")
+        out.write(f"            Monitor<ts, {new_state_str}>\n")
+        out.write(f"        else (\n")
+        out.write(f"            {check_condition}\n")
+        out.write(f"        )\n")
+        out.write(f"    )\n")
+        out.write(f"}}")
     
-    def _generate_other_events_rule(self, num_selections: int, timeframe_ms: int) -> str:
-        """Generate RML rule for other events (timeout handling)"""
+    def _write_other_events_rule(self, out: RMLEmitter, num_selections: int, timeframe_ms: int):
+        """Write the RML rule for other events (timeout handling) into the current statement"""
         
         initial_state = ", ".join(["0" for _ in range(num_selections)])
         
-        rml = f"{{\n    let ts; other_events(ts) (\n"
-        rml += f"        if (start_ts > 0 && ts - start_ts > {timeframe_ms})\n"
-        rml += f"            Monitor<0, {initial_state}>\n"
-        rml += f"        else (\n"
-        rml += f"            Monitor<start_ts, {', '.join([f's{i+1}' for i in range(num_selections)])}>\n"
-        rml += f"        )\n"
-        rml += f"    )\n"
-        rml += f"}}"
-        
-        return rml
+        out.write(f"{{\n    let ts; other_events(ts) (\n")
+        out.write(f"        if (start_ts > 0 && ts - start_ts > {timeframe_ms})\n")
+        out.write(f"            Monitor<0, {initial_state}>\n")
+        out.write(f"        else (\n")
+        out.write(f"            Monitor<start_ts, {', '.join([f's{i+1}' for i in range(num_selections)])}>\n")
+        out.write(f"        )\n")
+        out.write(f"    )\n")
+        out.write(f"}}")
     
     def generate_selection_definitions(self, selections: List[Tuple[str, bool]], detection: dict) -> str:
         """Generate RML definitions for all selections with proper field values"""
-        rml_lines = []
-        
+        return render(lambda out: self.emit_selection_definitions(selections, detection, out))
+    
+    def emit_selection_definitions(self, selections: List[Tuple[str, bool]], detection: dict, out: RMLEmitter):
+        """Write one event type per selection, then other_events"""
         for selection_name, is_negated in selections:
             safe_name = f"safe_{selection_name}"
             
@@ -183,22 +183,18 @@ class TemporalMonitorGenerator:
                     for field, value in detection[selection_name].items():
                         if isinstance(value, list):
                             # Handle list values
-                            if all(isinstance(v, str) for v in value):
-                                quoted_values = [f"'{v}'" for v in value]
-                                field_pairs.append(f"{field.lower()}: {' | '.join(quoted_values)}")
-                            else:
-                                field_pairs.append(f"{field.lower()}: {' | '.join(str(v) for v in value)}")
+                            field_pairs.append(f"{field.lower()}: {format_alternation(compress_values(value).values())}")
                         elif isinstance(value, str):
                             field_pairs.append(f"{field.lower()}: '{value}'")
                         else:
                             field_pairs.append(f"{field.lower()}: {value}")
                     
                     if field_pairs:
-                        rml_lines.append(f"{safe_name}(ts) not matches {{{', '.join(field_pairs)}}};")
+                        out.line(f"{safe_name}(ts) not matches {{{', '.join(field_pairs)}}};")
                     else:
-                        rml_lines.append(f"{safe_name}(ts) not matches {{timestamp: ts}};")
+                        out.line(f"{safe_name}(ts) not matches {{timestamp: ts}};")
                 else:
-                    rml_lines.append(f"{safe_name}(ts) not matches {{timestamp: ts}};")
+                    out.line(f"{safe_name}(ts) not matches {{timestamp: ts}};")
             else:
                 # For positive selections, include the actual fields
                 if selection_name in detection and isinstance(detection[selection_name], dict):
@@ -206,24 +202,18 @@ class TemporalMonitorGenerator:
                     for field, value in detection[selection_name].items():
                         if isinstance(value, list):
                             # Handle list values
-                            if all(isinstance(v, str) for v in value):
-                                quoted_values = [f"'{v}'" for v in value]
-                                field_pairs.append(f"{field.lower()}: {' | '.join(quoted_values)}")
-                            else:
-                                field_pairs.append(f"{field.lower()}: {' | '.join(str(v) for v in value)}")
+                            field_pairs.append(f"{field.lower()}: {format_alternation(compress_values(value).values())}")
                         elif isinstance(value, str):
                             field_pairs.append(f"{field.lower()}: '{value}'")
                         else:
                             field_pairs.append(f"{field.lower()}: {value}")
                     
-                    rml_lines.append(f"{safe_name}(ts) matches {{{', '.join(field_pairs)}}};")
+                    out.line(f"{safe_name}(ts) matches {{{', '.join(field_pairs)}}};")
                 else:
-                    rml_lines.append(f"{safe_name}(ts) matches {{timestamp: ts}};")
+                    out.line(f"{safe_name}(ts) matches {{timestamp: ts}};")
         
         # Add other_events definition
-        rml_lines.append("other_events(ts) matches {timestamp: ts};")
-        
-        return "\n".join(rml_lines)
+        out.line("other_events(ts) matches {timestamp: ts};")
 
     def generate_complete_temporal_rml(self, condition_node: ASTNode, timeframe_str: str = None, detection: dict = None) -> str:
         """
@@ -233,6 +223,10 @@ class TemporalMonitorGenerator:
             timeframe_str: Timeframe string (e.g., "5m", "10s")
             detection: Detection section from Sigma rule for field values
         """
+        return render(lambda out: self.emit_complete_temporal_rml(condition_node, timeframe_str, detection, out))
+    
+    def emit_complete_temporal_rml(self, condition_node: ASTNode, timeframe_str: str, detection: dict, out: RMLEmitter):
+        """Write the complete temporal RML to out"""
         # Parse timeframe
         timeframe_ms = self.parse_timeframe(timeframe_str)
         
@@ -240,21 +234,17 @@ class TemporalMonitorGenerator:
         selections = self.extract_selections_from_condition(condition_node)
         
         if not selections:
-            return "// No selections found for temporal monitor"
-        
-        # Generate RML
-        rml_parts = []
+            out.comment("No selections found for temporal monitor")
+            return
         
         # Add selection definitions
-        rml_parts.append("// Selection definitions")
-        rml_parts.append(self.generate_selection_definitions(selections, detection or {}))
-        rml_parts.append("")
+        out.comment("Selection definitions")
+        self.emit_selection_definitions(selections, detection or {}, out)
+        out.blank()
         
         # Add temporal monitor
-        rml_parts.append("// Temporal monitor")
-        rml_parts.append(self.generate_temporal_monitor(selections, timeframe_ms))
-        
-        return "\n".join(rml_parts)
+        out.comment("Temporal monitor")
+        self.emit_temporal_monitor(selections, timeframe_ms, out)
 
 class EnhancedTemporalNode(ASTNode):
     """Enhanced temporal node that can handle complex conditions with timeframe"""
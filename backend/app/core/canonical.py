@@ -0,0 +1,171 @@
+"""
+Canonical form and structural fingerprint of Sigma rules.
+
+The condition is parsed with ConditionParser and rewritten into a normal
+form: negations are pushed down to the leaves (not (a or b) and not a and
+not b read the same), double negations cancel, nested and/or are flattened,
+repeated operands are dropped and operands are sorted. Quantifiers become
+plain and/or over the selections they cover.
+
+Leaves are not selection names but digests of the selection content, so two
+rules that spell their detection differently (other selection names, other
+key order, other list order, a different timeframe unit) share a
+fingerprint. Titles, descriptions and other metadata do not count.
+
+The fingerprint is what the duplicate report groups on. It does not key the
+transpile coalescing: generated RML still follows the condition as written
+(selection names, monitor shape), so two spellings can differ in output.
+
+Records store the FINGERPRINT_VERSION their fingerprint was computed with;
+a fingerprint from another version is computed again from the file.
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, Optional
+
+# Bump whenever the canonical form changes for the same rule
+FINGERPRINT_VERSION = "2"
+
+_TIMEFRAME = re.compile(r"^\s*(\d+)\s*([smhd])\s*$", re.IGNORECASE)
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def _timeframe_seconds(timeframe) -> Any:
+    """'1m' and '60s' are the same window; anything unparseable is kept as written"""
+    if timeframe is None:
+        return None
+    match = _TIMEFRAME.match(str(timeframe).split(":", 1)[-1])
+    if not match:
+        return str(timeframe).strip()
+    return int(match.group(1)) * _UNITS[match.group(2).lower()]
+
+def _sort_key(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+def _normalize_value(value):
+    if isinstance(value, dict):
+        return {str(key).lower(): _normalize_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # Values in a list are alternatives: order and repeats do not matter
+        unique = {_sort_key(item): _normalize_value(item) for item in value}
+        return [unique[key] for key in sorted(unique)]
+    return value
+
+def selection_digest(selection) -> str:
+    """Digest of a selection's content, independent of key and list order"""
+    canonical = _sort_key(_normalize_value(selection))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+def render(form) -> str:
+    """Text of a canonical form: and(...), or(...), not(...), leaves as they are"""
+    if isinstance(form, str):
+        return form
+    operator, operands = form
+    return f"{operator}({','.join(render(operand) for operand in operands)})"
+
+def _join(operator, operands):
+    """Flatten, deduplicate and sort the operands of an associative operator"""
+    flat = {}
+    for operand in operands:
+        if isinstance(operand, tuple) and operand[0] == operator:
+            for inner in operand[1]:
+                flat[render(inner)] = inner
+        else:
+            flat[render(operand)] = operand
+    if len(flat) == 1:
+        return next(iter(flat.values()))
+    return (operator, tuple(flat[key] for key in sorted(flat)))
+
+def _negate(form, negated):
+    return ("not", (form,)) if negated else form
+
+class Canonicalizer:
+    """Normal form of a ConditionParser AST, with leaves mapped through leaves"""
+
+    def __init__(self, leaves: Optional[Dict[str, str]] = None):
+        self.leaves = leaves or {}
+
+    def leaf(self, name: str) -> str:
+        return self.leaves.get(name, f"name:{name}")
+
+    def form(self, node, negated: bool = False):
+        from .ast.nodes import AndNode, OrNode, NotNode, NameNode, QuantifierNode, TemporalNode, UnsupportedNode
+        from .ast.temporal_monitor import EnhancedTemporalNode
+
+        if isinstance(node, NotNode):
+            return self.form(node.operand, not negated)
+        if isinstance(node, (AndNode, OrNode)):
+            operator = "and" if isinstance(node, AndNode) else "or"
+            return self._combine(operator, [self.form(node.left, negated), self.form(node.right, negated)], negated)
+        if isinstance(node, QuantifierNode):
+            leaves = [_negate(self.leaf(name), negated) for name in node.selections]
+            quantifier = node.quantifier
+            if quantifier.startswith("all of"):
+                return self._combine("and", leaves, negated)
+            if quantifier.startswith("any of") or quantifier == "1 of":
+                return self._combine("or", leaves, negated)
+            count = quantifier.split()[0]
+            operands = sorted(set(self.leaf(name) for name in node.selections))
+            return _negate(f"atleast({count},{','.join(operands)})", negated)
+        if isinstance(node, NameNode):
+            return _negate(self.leaf(node.name), negated)
+        if isinstance(node, TemporalNode):
+            parts = [node.operator, self.leaf(node.selection1)]
+            if node.selection2:
+                parts.append(self.leaf(node.selection2))
+            if node.count is not None:
+                parts.append(str(node.count))
+            if node.field:
+                parts.append(f"distinct:{node.field.lower()}")
+            if node.group_by:
+                parts.append(f"by:{node.group_by.lower()}")
+            parts.append(str(_timeframe_seconds(node.timeframe)))
+            return _negate(f"temporal({','.join(parts)})", negated)
+        if isinstance(node, EnhancedTemporalNode):
+            inner = render(self.form(node.condition_node))
+            return _negate(f"window({_timeframe_seconds(node.timeframe)},{inner})", negated)
+        if isinstance(node, UnsupportedNode):
+            return _negate(f"unsupported({node.feature})", negated)
+        raise ValueError(f"Cannot canonicalize {type(node).__name__}")
+
+    @staticmethod
+    def _combine(operator, operands, negated):
+        if negated:
+            # De Morgan: operands already carry the negation, the operator flips
+            operator = "or" if operator == "and" else "and"
+        return _join(operator, operands)
+
+def canonical_condition(condition, selections, detection: Optional[dict] = None, leaves: Optional[Dict[str, str]] = None) -> str:
+    """Normal form of a condition; leaves maps selection names to what the form should show"""
+    from .ast.condition_parser import ConditionParser
+    if isinstance(condition, list):
+        # A list of conditions matches when any of them does
+        condition = " or ".join(f"({item})" for item in condition)
+    if not isinstance(condition, str) or not condition.strip():
+        raise ValueError("Condition is required")
+    try:
+        tree = ConditionParser(list(selections), detection).parse(condition)
+        return render(Canonicalizer(leaves).form(tree))
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Cannot parse condition: {str(e)}")
+
+def rule_fingerprint(sigma_rule: dict) -> str:
+    """SHA-256 of a rule's canonical form: logsource, condition over selection contents, timeframe"""
+    if not isinstance(sigma_rule, dict):
+        raise ValueError("Sigma rule must be a mapping")
+    detection = sigma_rule.get("detection")
+    if not isinstance(detection, dict):
+        raise ValueError("Sigma rule has no detection section")
+    selections = [key for key in detection if key not in ("condition", "timeframe")]
+    leaves = {name: f"sel:{selection_digest(detection[name])}" for name in selections}
+    logsource = sigma_rule.get("logsource") or {}
+    payload = {
+        "logsource": {str(key).lower(): str(value).lower() for key, value in logsource.items()} if isinstance(logsource, dict) else str(logsource),
+        "condition": canonical_condition(detection.get("condition"), selections, detection, leaves),
+        "timeframe": _timeframe_seconds(detection.get("timeframe")),
+    }
+    canonical = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
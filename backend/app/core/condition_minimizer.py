@@ -0,0 +1,329 @@
+"""
+Boolean minimization of Sigma conditions.
+
+The condition (after quantifier expansion) is parsed into a boolean formula
+over selection names and compiled into a reduced ordered BDD, which is
+canonical: tautologies and contradictions reduce to a constant, and
+duplicate or absorbed selections (A or (A and B)) disappear. An irredundant
+sum of products is read back from the BDD (Minato's ISOP) and factored on
+shared literals, and the result replaces the condition only when it has
+fewer literals than what was written.
+
+Conditions that are not plain boolean formulas over selection names
+(temporal operators, "1 of them", unsupported quantifiers) are left alone.
+So are conditions too large to minimize cheaply: an irredundant cover can
+be exponential in the condition (a product of N two-selection sums has 2^N
+cubes), so work stops past a budget of selections, BDD nodes and cubes, as
+it does when the condition nests deeper than Python's recursion limit.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Union
+
+FALSE, TRUE = 0, 1
+
+_TOKEN = re.compile(r"\s*(\(|\)|[^\s()]+)")
+
+# Minimization budget; past any of these the condition is left as written
+MAX_SELECTIONS = 64
+MAX_BDD_NODES = 20_000
+MAX_CUBES = 512
+
+class BudgetExceeded(ValueError):
+    """Minimizing the condition would cost more than the budget allows"""
+
+@dataclass
+class BoolExpr:
+    """A formula node: operator is 'and', 'or' or 'not'"""
+    operator: str
+    operands: List["Formula"]
+
+# A selection name, a constant, or a compound formula
+Formula = Union[str, bool, BoolExpr]
+
+class _Parser:
+    """Recursive descent over not > and > or, as Sigma reads conditions"""
+
+    def __init__(self, condition: str, selections: Set[str]):
+        self.tokens = _TOKEN.findall(condition)
+        self.position = 0
+        self.selections = selections
+
+    def parse(self) -> Formula:
+        if not self.tokens:
+            raise ValueError("Empty condition")
+        formula = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected token: {self.tokens[self.position]}")
+        return formula
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _take(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError("Unexpected end of condition")
+        self.position += 1
+        return token
+
+    def _or(self):
+        operands = [self._and()]
+        while self._peek() == "or":
+            self._take()
+            operands.append(self._and())
+        return operands[0] if len(operands) == 1 else BoolExpr("or", operands)
+
+    def _and(self):
+        operands = [self._unary()]
+        while self._peek() == "and":
+            self._take()
+            operands.append(self._unary())
+        return operands[0] if len(operands) == 1 else BoolExpr("and", operands)
+
+    def _unary(self):
+        token = self._take()
+        if token == "not":
+            return BoolExpr("not", [self._unary()])
+        if token == "(":
+            formula = self._or()
+            if self._take() != ")":
+                raise ValueError("Unbalanced parentheses")
+            return formula
+        if token not in self.selections:
+            raise ValueError(f"Not a selection: {token}")
+        return token
+
+def parse_condition(condition: str, selections: List[str]) -> Formula:
+    """Parse a plain boolean condition; ValueError for anything else"""
+    return _Parser(condition, set(selections)).parse()
+
+def count_literals(formula: Formula) -> int:
+    if isinstance(formula, BoolExpr):
+        return sum(count_literals(operand) for operand in formula.operands)
+    return 0 if isinstance(formula, bool) else 1
+
+def variables_of(formula: Formula, found: Optional[List[str]] = None) -> List[str]:
+    """Selection names in order of first appearance"""
+    found = [] if found is None else found
+    if isinstance(formula, BoolExpr):
+        for operand in formula.operands:
+            variables_of(operand, found)
+    elif isinstance(formula, str) and formula not in found:
+        found.append(formula)
+    return found
+
+def polarities(formula: Formula, negated: bool = False, found: Optional[Dict[str, Set[bool]]] = None) -> Dict[str, Set[bool]]:
+    """For each selection, whether it appears negated (True), plain (False), or both"""
+    found = {} if found is None else found
+    if isinstance(formula, BoolExpr):
+        flip = formula.operator == "not"
+        for operand in formula.operands:
+            polarities(operand, negated != flip, found)
+    elif isinstance(formula, str):
+        found.setdefault(formula, set()).add(negated)
+    return found
+
+def to_condition(formula: Formula) -> str:
+    """Back to Sigma condition syntax"""
+    if isinstance(formula, bool):
+        return "true" if formula else "false"
+    if isinstance(formula, str):
+        return formula
+    if formula.operator == "not":
+        return f"not {to_condition(formula.operands[0])}"
+    parts = []
+    for operand in formula.operands:
+        text = to_condition(operand)
+        parts.append(f"({text})" if isinstance(operand, BoolExpr) and operand.operator != "not" else text)
+    return f" {formula.operator} ".join(parts)
+
+class BDD:
+    """Reduced ordered BDD; nodes are ints, 0 and 1 are the terminals"""
+
+    def __init__(self, variables: List[str], max_nodes: int = MAX_BDD_NODES):
+        self.variables = list(variables)
+        self.max_nodes = max_nodes
+        self.levels = {name: level for level, name in enumerate(self.variables)}
+        # node -> (level, low, high); terminals sit below every variable
+        self.nodes = [(len(self.variables), FALSE, FALSE), (len(self.variables), TRUE, TRUE)]
+        self.unique = {}
+        self.ite_cache = {}
+
+    def _mk(self, level, low, high):
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            if len(self.nodes) >= self.max_nodes:
+                raise BudgetExceeded(f"More than {self.max_nodes} BDD nodes")
+            node = self.unique[key] = len(self.nodes)
+            self.nodes.append(key)
+        return node
+
+    def variable(self, name):
+        return self._mk(self.levels[name], FALSE, TRUE)
+
+    def level(self, node):
+        return self.nodes[node][0]
+
+    def cofactors(self, node, level):
+        node_level, low, high = self.nodes[node]
+        if node_level == level:
+            return low, high
+        return node, node
+
+    def ite(self, f, g, h):
+        """if f then g else h"""
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        key = (f, g, h)
+        result = self.ite_cache.get(key)
+        if result is None:
+            top = min(self.level(f), self.level(g), self.level(h))
+            f0, f1 = self.cofactors(f, top)
+            g0, g1 = self.cofactors(g, top)
+            h0, h1 = self.cofactors(h, top)
+            result = self.ite_cache[key] = self._mk(top, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        return result
+
+    def negate(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def conjoin(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def disjoin(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def build(self, formula: Formula):
+        if isinstance(formula, bool):
+            return TRUE if formula else FALSE
+        if isinstance(formula, str):
+            return self.variable(formula)
+        if formula.operator == "not":
+            return self.negate(self.build(formula.operands[0]))
+        combine = self.conjoin if formula.operator == "and" else self.disjoin
+        result = TRUE if formula.operator == "and" else FALSE
+        for operand in formula.operands:
+            result = combine(result, self.build(operand))
+        return result
+
+    def isop(self, lower, upper, cache=None, max_cubes: int = MAX_CUBES):
+        """Irredundant cover of the interval [lower, upper]: (cubes, node); a cube maps variable -> value
+
+        BudgetExceeded as soon as a partial cover has more than max_cubes cubes.
+        """
+        cache = {} if cache is None else cache
+        if lower == FALSE:
+            return [], FALSE
+        if upper == TRUE:
+            return [{}], TRUE
+        cached = cache.get((lower, upper))
+        if cached is not None:
+            return cached
+        top = min(self.level(lower), self.level(upper))
+        name = self.variables[top]
+        lower0, lower1 = self.cofactors(lower, top)
+        upper0, upper1 = self.cofactors(upper, top)
+        # Cubes that need the variable false, then true, then those that need neither
+        cubes0, cover0 = self.isop(self.conjoin(lower0, self.negate(upper1)), upper0, cache, max_cubes)
+        cubes1, cover1 = self.isop(self.conjoin(lower1, self.negate(upper0)), upper1, cache, max_cubes)
+        rest_lower = self.disjoin(self.conjoin(lower0, self.negate(cover0)), self.conjoin(lower1, self.negate(cover1)))
+        cubes_rest, cover_rest = self.isop(rest_lower, self.conjoin(upper0, upper1), cache, max_cubes)
+        if len(cubes0) + len(cubes1) + len(cubes_rest) > max_cubes:
+            raise BudgetExceeded(f"More than {max_cubes} cubes")
+        cubes = [dict(cube, **{name: False}) for cube in cubes0]
+        cubes += [dict(cube, **{name: True}) for cube in cubes1]
+        cubes += cubes_rest
+        cover = self.disjoin(self._mk(top, cover0, cover1), cover_rest)
+        cache[(lower, upper)] = (cubes, cover)
+        return cubes, cover
+
+def _literal(name, value):
+    return name if value else BoolExpr("not", [name])
+
+def _join(operator, operands):
+    return operands[0] if len(operands) == 1 else BoolExpr(operator, operands)
+
+def factor(cubes: List[Dict[str, bool]], order: List[str]) -> Formula:
+    """Sum of products, with the literal shared by most cubes pulled out first"""
+    if not cubes:
+        return False
+    if any(not cube for cube in cubes):
+        return True
+    if len(cubes) == 1:
+        cube = cubes[0]
+        return _join("and", [_literal(name, cube[name]) for name in order if name in cube])
+    counts = {}
+    for cube in cubes:
+        for literal in cube.items():
+            counts[literal] = counts.get(literal, 0) + 1
+    literal, shared = max(counts.items(), key=lambda item: (item[1], -order.index(item[0][0])))
+    if shared < 2:
+        return _join("or", [factor([cube], order) for cube in cubes])
+    name, value = literal
+    inner = [{k: v for k, v in cube.items() if k != name} for cube in cubes if cube.get(name) == value]
+    rest = [cube for cube in cubes if cube.get(name) != value]
+    with_literal = _join("and", [_literal(name, value), factor(inner, order)]) if inner else _literal(name, value)
+    if isinstance(with_literal, BoolExpr) and with_literal.operator == "and":
+        # Flatten a and (b and c) into a and b and c
+        flattened = []
+        for operand in with_literal.operands:
+            flattened.extend(operand.operands if isinstance(operand, BoolExpr) and operand.operator == "and" else [operand])
+        with_literal = BoolExpr("and", flattened)
+    if not rest:
+        return with_literal
+    rest_formula = factor(rest, order)
+    operands = [with_literal]
+    operands.extend(rest_formula.operands if isinstance(rest_formula, BoolExpr) and rest_formula.operator == "or" else [rest_formula])
+    return BoolExpr("or", operands)
+
+@dataclass
+class MinimizedCondition:
+    """Result of minimize_condition"""
+    original: Formula
+    formula: Formula
+    original_literals: int
+    literals: int
+
+    @property
+    def constant(self) -> Optional[bool]:
+        """True for a tautology, False for a contradiction, otherwise None"""
+        return self.formula if isinstance(self.formula, bool) else None
+
+    @property
+    def reduced(self) -> bool:
+        return self.constant is not None or self.literals < self.original_literals
+
+def minimize_condition(condition: str, selections: List[str]) -> Optional[MinimizedCondition]:
+    """Minimal equivalent of condition, or None if it is not a plain boolean condition or is over budget"""
+    try:
+        original = parse_condition(condition, selections)
+        order = variables_of(original)
+        if len(order) > MAX_SELECTIONS:
+            return None
+        bdd = BDD(order)
+        root = bdd.build(original)
+        if root in (FALSE, TRUE):
+            formula = root == TRUE
+        else:
+            cubes, _ = bdd.isop(root, root)
+            formula = factor(cubes, order)
+        return MinimizedCondition(
+            original=original,
+            formula=formula,
+            original_literals=count_literals(original),
+            literals=count_literals(formula),
+        )
+    except (ValueError, RecursionError):
+        # Nesting deeper than the recursion limit is left to the stack-based simplifier
+        return None
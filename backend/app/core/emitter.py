@@ -0,0 +1,140 @@
+"""
+Streaming RML writer.
+
+Generators write RML through an RMLEmitter instead of building strings:
+each statement goes to the sink (StringIO, an open file, a response
+stream: anything with write(str)) as it is produced, so a monitor with
+thousands of cases is never copied as a whole.
+
+Two layouts:
+
+- pretty (default): what the generators write, byte for byte, with
+  comments, blank lines and multi-line monitors; lines are separated by
+  "\\n" and there is no trailing newline;
+- compact: comments and blank lines are dropped and each statement is
+  written on one line, whitespace runs collapsed to a single space.
+  Quoted literals are kept as written. Names registered with alias()
+  are shortened: event types to e0, e1, ..., specifications to M0, M1,
+  ... A single write must not split a quoted literal, a "//" comment
+  or an identifier.
+
+A compact emitter also builds a source map back to the pretty layout:
+which pretty lines each compact line came from, and the original name
+of each short identifier.
+"""
+
+import io
+import re
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, TextIO
+
+# Quoted literal, comment, whitespace run, identifier, anything else
+_COMPACT_TOKEN = re.compile(r"'[^']*'?|//[^\n]*|\s+|[A-Za-z_]\w*|[^'\s/A-Za-z_]+|/")
+_IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+# Names the RML runtime looks up; never shortened
+_KEPT = {"Main", "logsource"}
+
+SOURCE_MAP_VERSION = 1
+
+class RMLEmitter:
+    """Writes RML statements, comments and blank lines to a text sink"""
+
+    def __init__(self, sink: TextIO, compact: bool = False):
+        self.sink = sink
+        self.compact = compact
+        self.written = False
+        # compact mode: a space is owed before the next token of the statement
+        self._space = False
+        self._column = 0
+        # compact mode: original name -> short name, and the pretty lines [first, last] of each line written
+        self.aliases: Dict[str, str] = {}
+        self.lines: List[List[int]] = []
+        self._pretty_line = 0
+        self._numbered = {"e": 0, "M": 0}
+
+    def _new_line(self):
+        if self.written:
+            self.sink.write("\n")
+        self.written = True
+        self._space = False
+        self._column = 0
+
+    def comment(self, text: str):
+        """A whole-line // comment; dropped in compact mode"""
+        if self.compact:
+            self._pretty_line += 1
+        else:
+            self._new_line()
+            self.sink.write(f"// {text}")
+
+    def blank(self):
+        """An empty separator line; dropped in compact mode"""
+        if self.compact:
+            self._pretty_line += 1
+        else:
+            self._new_line()
+
+    def alias(self, *names: str):
+        """Internal names the compact layout writes short; register them before their first use"""
+        if not self.compact:
+            return
+        for name in names:
+            if name in self.aliases or name in _KEPT or not _IDENTIFIER.fullmatch(name):
+                continue
+            prefix = "e" if name[0].islower() else "M"
+            self.aliases[name] = f"{prefix}{self._numbered[prefix]}"
+            self._numbered[prefix] += 1
+
+    def line(self, text: str):
+        """A complete statement (or several lines of one) written in one go"""
+        with self.statement():
+            self.write(text)
+
+    @contextmanager
+    def statement(self):
+        """Start a statement on a new line; write() its pieces inside the block"""
+        self._new_line()
+        if self.compact:
+            self._pretty_line += 1
+            self.lines.append([self._pretty_line, self._pretty_line])
+        yield self
+
+    def write(self, text: str):
+        """Part of the current statement"""
+        if not self.compact:
+            self.sink.write(text)
+            return
+        newlines = text.count("\n")
+        if newlines:
+            self._pretty_line += newlines
+            self.lines[-1][1] = self._pretty_line
+        for match in _COMPACT_TOKEN.finditer(text):
+            token = match.group()
+            if token.startswith("//"):
+                continue
+            if token.isspace():
+                self._space = True
+                continue
+            # A field name in a pattern ({name: value}) is not a reference
+            if token in self.aliases and text[match.end():match.end() + 1] != ":":
+                token = self.aliases[token]
+            if self._space and self._column:
+                self.sink.write(" ")
+                self._column += 1
+            self.sink.write(token)
+            self._column += len(token)
+            self._space = False
+
+    def source_map(self) -> Dict[str, Any]:
+        """Where each compact line came from: lines[n - 1] are the pretty lines of line n; names maps short names back"""
+        return {
+            "version": SOURCE_MAP_VERSION,
+            "names": {short: name for name, short in self.aliases.items()},
+            "lines": [list(span) for span in self.lines],
+        }
+
+def render(produce: Callable[[RMLEmitter], None], compact: bool = False) -> str:
+    """Text written by produce(emitter), for callers that want a string"""
+    buffer = io.StringIO()
+    produce(RMLEmitter(buffer, compact))
+    return buffer.getvalue()
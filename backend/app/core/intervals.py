@@ -0,0 +1,72 @@
+"""
+Interval merging for numeric modifiers.
+
+Sigma allows several bounds on one field (Count|gte: 5 and Count|lte: 10).
+Instead of one variable and one comparison per modifier, the bounds on a field
+are merged into a single interval: the tightest lower and upper bound are
+kept, the rest are dropped as redundant. An interval holding one value becomes
+a plain equality, and a contradictory one (Count|gte: 10 with Count|lt: 5) is
+reported as empty, so the event type can be flagged as never matching.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+BOUND_MODIFIERS = ("gte", "gt", "lte", "lt")
+
+_OPERATORS = {"gte": ">=", "gt": ">", "lte": "<=", "lt": "<"}
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+@dataclass
+class Interval:
+    """Bounds on one field; each bound is (value, inclusive)"""
+    low: Optional[Tuple[Any, bool]] = None
+    high: Optional[Tuple[Any, bool]] = None
+    # Bounds whose values cannot be compared (not numbers), kept verbatim
+    unmerged: List[Tuple[str, Any]] = field(default_factory=list)
+
+    def narrow(self, modifier: str, value) -> None:
+        """Intersect with the bound given by a gte/gt/lte/lt modifier"""
+        if modifier not in BOUND_MODIFIERS:
+            raise ValueError(f"Unsupported bound modifier: {modifier}")
+        if not _is_number(value):
+            self.unmerged.append((modifier, value))
+            return
+        inclusive = modifier in ("gte", "lte")
+        if modifier in ("gte", "gt"):
+            if self.low is None or value > self.low[0] or (value == self.low[0] and not inclusive):
+                self.low = (value, inclusive)
+        else:
+            if self.high is None or value < self.high[0] or (value == self.high[0] and not inclusive):
+                self.high = (value, inclusive)
+
+    def is_empty(self) -> bool:
+        if self.low is None or self.high is None:
+            return False
+        (low, low_inclusive), (high, high_inclusive) = self.low, self.high
+        return low > high or (low == high and not (low_inclusive and high_inclusive))
+
+    def point(self):
+        """The only value in the interval, or None"""
+        if self.unmerged or self.low is None or self.high is None or self.is_empty():
+            return None
+        return self.low[0] if self.low[0] == self.high[0] else None
+
+    def constraints(self, variable: str) -> List[str]:
+        """Comparisons on variable, lower bound first"""
+        checks = []
+        if self.low is not None:
+            checks.append(f"{variable} {'>=' if self.low[1] else '>'} {self.low[0]}")
+        if self.high is not None:
+            checks.append(f"{variable} {'<=' if self.high[1] else '<'} {self.high[0]}")
+        checks.extend(f"{variable} {_OPERATORS[modifier]} {value}" for modifier, value in self.unmerged)
+        return checks
+
+def merge_bounds(bounds: List[Tuple[str, Any]]) -> Interval:
+    """Interval from (modifier, value) pairs"""
+    interval = Interval()
+    for modifier, value in bounds:
+        interval.narrow(modifier, value)
+    return interval
@@ -0,0 +1,120 @@
+"""
+Keyed count monitors: count() by field and count(field) with per-key state.
+
+`selection | count() by TargetUserName > 5` keeps one count per user, and
+`selection | count(WorkstationName) by TargetUserName > 3` (also written
+`count(distinct WorkstationName)`) counts the distinct workstations of each
+user. The hit event type binds the group key (and the counted value) along
+with the timestamp, and the monitor keeps a table of `keys` slots:
+
+    Monitor<k1, t1, n1, ..., kK, tK, nK>
+
+Slot i holds a key, the start of its window and its count. A hit goes to the
+slot of its key while that window is open; otherwise it takes the first slot
+whose window is over, since a key idle for longer than the timeframe has
+nothing left to count. That is the eviction policy: state is the table,
+whatever the number of keys ever seen, and a slot is recycled as soon as its
+key has been idle for a timeframe. When every slot holds an active key the
+new key takes the last one, so alerts can be missed with more than `keys`
+keys active at once.
+
+Distinct counts keep the values already seen in the slot, newest first:
+
+    Monitor<k1, t1, n1, v1_1, ..., v1_L, ...>
+
+A value already in the slot leaves it unchanged. Only `limit` values are
+needed: the verdict comes before a slot would hold more. The transpiler
+counts every matching event instead, with a warning comment, when the limit
+is above its count_max_distinct. Without `by` there is a single slot and no
+key.
+
+Windows are tumbling per key, as in the default count monitor; state values
+start at 0, so a key or value equal to 0 is indistinguishable from a free
+slot's.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# count(), count(field), count(distinct field), each optionally followed by `by field`
+_COUNT_CALL = re.compile(r'\|\s*count\s*\(\s*(?:distinct\s+)?(\w*)\s*\)(?:\s+by\s+(\w+))?', re.IGNORECASE)
+
+@dataclass
+class CountAggregation:
+    """What a count() condition counts"""
+    field: Optional[str] = None  # count(field): distinct values of field
+    group_by: Optional[str] = None  # by field: one count per value of field
+
+    @property
+    def keyed(self) -> bool:
+        return bool(self.field or self.group_by)
+
+def parse_count(condition: str) -> Optional[CountAggregation]:
+    """The aggregation of a `| count(...)` condition, or None when there is none"""
+    match = _COUNT_CALL.search(condition)
+    if match is None:
+        return None
+    return CountAggregation(match.group(1) or None, match.group(2))
+
+def keyed_state_size(limit: int, keys: int, keyed: bool = True, distinct: bool = False) -> int:
+    """Number of state values of a keyed count monitor, all 0 initially"""
+    per_slot = (1 if keyed else 0) + 2 + (max(1, limit) if distinct else 0)
+    return (max(1, keys) if keyed else 1) * per_slot
+
+def keyed_count_monitor(name: str, hit: str, other: str, verdict: str, operator: str, limit: int,
+                        timeframe_ms: int, keys: int, keyed: bool = True, distinct: bool = False) -> str:
+    """Definition of a keyed count monitor
+
+    hit is the event type for a matching event, binding ts, then key when keyed and
+    value when distinct; other and verdict are as in the tumbling monitor. keys is the
+    number of slots, forced to 1 when not keyed.
+    """
+    slots = range(1, (max(1, keys) if keyed else 1) + 1)
+    stored = max(1, limit) if distinct else 0
+
+    def slot(i):
+        # State of slot i: key, window start, count, then the distinct values
+        return ([f"k{i}"] if keyed else []) + [f"t{i}", f"n{i}"] + [f"v{i}_{j}" for j in range(1, stored + 1)]
+
+    state = [slot(i) for i in slots]
+    parameters = ", ".join(value for values in state for value in values)
+
+    def step(i, counted, values):
+        # Limit check on this slot's count plus this event, then the state with slot i replaced
+        replaced = ", ".join(value for j, old in zip(slots, state) for value in (values if j == i else old))
+        return f"if ({counted} {operator} {limit}) {verdict} else {name}<{replaced}>"
+
+    def values(key, start, count, i=None):
+        # A slot's new state; a distinct value goes first, pushing out the oldest one
+        kept = [f"v{i}_{j}" for j in range(1, stored)] if i else ["0"] * (stored - 1)
+        return ([key] if keyed else []) + [start, count] + (["value"] + kept if distinct else [])
+
+    def started(i):
+        return step(i, "1", values("key", "ts", "1"))
+
+    cases = []
+    for i in slots:
+        # This key's window is still open
+        guard = f"ts - t{i} <= {timeframe_ms}" + (f" && key == k{i}" if keyed else "")
+        counted = step(i, f"n{i}+1", values(f"k{i}", f"t{i}", f"n{i}+1", i))
+        if distinct:
+            seen = " || ".join(f"value == v{i}_{j}" for j in range(1, stored + 1))
+            counted = f"if ({seen}) {name}<{parameters}> else ({counted})"
+        cases.append((guard, counted))
+    # Otherwise the first slot idle for a whole timeframe, or the last one
+    cases.extend((f"ts - t{i} > {timeframe_ms}", started(i)) for i in slots if keyed)
+    cases.append((None, started(slots[-1])))
+    body = "\n            else ".join(
+        [f"if ({guard}) ({action})" for guard, action in cases[:-1]] + [f"({cases[-1][1]})"]
+    )
+
+    bound = ", ".join(["ts"] + (["key"] if keyed else []) + (["value"] if distinct else []))
+    return f"""{name}<{parameters}> =
+    {{let {bound}; {hit}
+        (
+            {body}
+        )
+    }}
+    \\/
+    {{let ts; {other} {name}<{parameters}>}};"""
@@ -0,0 +1,272 @@
+"""
+Minimal Prometheus metrics: counters, histograms and scrape-time collectors,
+rendered in the text exposition format (version 0.0.4).
+
+Hot paths only do a dict lookup and an addition under a lock. Numbers kept
+elsewhere (cache and queue statistics) are read at scrape time by collectors,
+so they cost nothing between scrapes. Set `enabled = False` to turn counters,
+stage timers and HTTP timing into no-ops (used by the overhead benchmark and
+the pre-fork warmup).
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import deque
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; transpiler stages run in microseconds, HTTP requests in milliseconds
+STAGE_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+enabled = True
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, *labelvalues):
+        if not enabled:
+            return
+        with self.lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labelvalues, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labelvalues)
+            if series is None:
+                # Per-bucket counts (not cumulative) plus +Inf, sum
+                series = self.series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self, *labelvalues):
+        """(bucket bounds, per-bucket counts, sum) of one series, or None"""
+        with self.lock:
+            series = self.series.get(labelvalues)
+            if series is None:
+                return None
+            return self.buckets, list(series[0]), series[1]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = sorted((k, (list(v[0]), v[1])) for k, v in self.series.items())
+        for labelvalues, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _labels(self.labelnames, labelvalues, f'le="{_number(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Window:
+    """The most recent observations, for percentiles that follow current load"""
+
+    def __init__(self, size=256):
+        self.values = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.values.append(value)
+
+    def percentile(self, q):
+        """Nearest-rank percentile (q in 0..1) of the window, or None while it is empty"""
+        with self.lock:
+            values = sorted(self.values)
+        if not values:
+            return None
+        return values[max(0, math.ceil(q * len(values)) - 1)]
+
+    def __len__(self):
+        return len(self.values)
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """collector() returns [(name, type, help, [(labels dict, value), ...]), ...] at scrape time"""
+        with self.lock:
+            self.collectors.append(collector)
+        return collector
+
+    def render(self):
+        with self.lock:
+            metrics, collectors = list(self.metrics), list(self.collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+transpile_stage_seconds = registry.register(Histogram(
+    "sigma2rml_transpile_stage_seconds", "Time spent in each transpiler stage", ("stage",)))
+rules_processed = registry.register(Counter(
+    "sigma2rml_rules_processed_total", "Rules transpiled, by kind", ("kind",)))
+transpile_errors = registry.register(Counter(
+    "sigma2rml_transpile_errors_total", "Transpilation errors, by exception type", ("type",)))
+http_request_seconds = registry.register(Histogram(
+    "sigma2rml_http_request_duration_seconds", "HTTP request latency until the response starts",
+    ("method", "route", "status"), buckets=HTTP_BUCKETS))
+
+# Whole-rule transpile latency over the last few hundred rules, reported by /ready
+recent_transpile_seconds = Window(256)
+
+class timed:
+    """Context manager adding the elapsed time of its block to a Window"""
+    __slots__ = ("window", "start")
+
+    def __init__(self, window):
+        self.window = window
+
+    def __enter__(self):
+        self.start = time.perf_counter() if enabled else None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            self.window.observe(time.perf_counter() - self.start)
+        return False
+
+# Per-thread stage recorders for request profiling (see app.core.profiling);
+# the counter keeps the common case (nobody profiling) to one global lookup
+_local = threading.local()
+_recording = 0
+_recording_lock = threading.Lock()
+
+class record_stages:
+    """Context manager sending this thread's stage timings to recorder.add(name, wall, cpu)"""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def __enter__(self):
+        global _recording
+        self.previous = getattr(_local, "recorder", None)
+        _local.recorder = self.recorder
+        with _recording_lock:
+            _recording += 1
+        return self.recorder
+
+    def __exit__(self, exc_type, exc, tb):
+        global _recording
+        _local.recorder = self.previous
+        with _recording_lock:
+            _recording -= 1
+        return False
+
+class stage:
+    """Context manager timing one transpiler stage"""
+    __slots__ = ("name", "start", "cpu_start", "recorder")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.recorder = getattr(_local, "recorder", None) if _recording else None
+        if self.recorder is not None:
+            self.cpu_start = time.thread_time()
+            self.start = time.perf_counter()
+        else:
+            self.start = time.perf_counter() if enabled else None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            elapsed = time.perf_counter() - self.start
+            if enabled:
+                transpile_stage_seconds.observe(elapsed, self.name)
+            if self.recorder is not None:
+                self.recorder.add(self.name, elapsed, time.thread_time() - self.cpu_start)
+        return False
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        recorded = []
+
+        def record(status):
+            # Route templates keep the label set bounded
+            path = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            http_request_seconds.observe(time.perf_counter() - start, scope["method"], path, str(status))
+            recorded.append(status)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
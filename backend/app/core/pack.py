@@ -0,0 +1,207 @@
+"""
+Pack many rules into one RML specification with shared monitors.
+
+Most temporal rules are `X | count() > N` or `A | near B`: on their own
+each one carries a full copy of the count or near monitor, differing only
+in its event types, window and limit. In a pack each of those shapes is
+written once as a parametric monitor (CountAbove, CountBelow, Near), and
+each rule becomes one line instantiating it with its own number and
+constants:
+
+    Rule3 = source0 >> CountAbove<3, 300000, 5, 0, 0>!;
+
+The event types a shared monitor reads take the rule number as an extra
+argument, and each rule adds a clause for its own number
+(`count_hit(ts, rule) matches {...} with rule == 3`). Identical log source
+filters are declared once. Main is the conjunction of every packed rule.
+
+With a transpiler that slides count windows (count_buckets), the count
+monitors are SlidingCountAbove and SlidingCountBelow, parameterized by
+bucket width instead of window.
+
+Output therefore grows with the number of distinct shapes plus one short
+line per rule. Rules with any other monitor are reported as unpacked and
+keep their own translation.
+"""
+
+import io
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+from .emitter import RMLEmitter
+from .sliding_count import bucket_width, sliding_count_monitor
+from .transpiler_refactored import MonitorShape, RefactoredTranspiler
+
+COUNT_TEMPLATE = """{name}<rule, window, limit, start_ts, count> =
+    {{let ts; count_hit(ts, rule)
+        (
+            if (start_ts == 0 || ts - start_ts > window) (
+                {name}<rule, window, limit, ts, 1>
+            )
+            else if (count+1 {operator} limit) count_safe(rule) else {name}<rule, window, limit, start_ts, count+1>
+        )
+    }}
+    \\/
+    {{let ts; timed_other_events(ts)
+        (
+            if (start_ts > 0 && ts - start_ts > window)
+                {name}<rule, window, limit, 0, 0>
+            else
+                {name}<rule, window, limit, start_ts, count>
+        )
+    }};"""
+
+NEAR_TEMPLATE = """Near<rule, window, start_ts, s1, s2> =
+{
+    let ts; near_first(ts, rule) (
+        if (start_ts == 0 || ts - start_ts > window)
+            Near<rule, window, ts, 1, 0>
+        else (
+            if (s2 == 1) empty else Near<rule, window, start_ts, 1, s2>
+        )
+    )
+}
+/\\
+{
+    let ts; near_second(ts, rule) (
+        if (start_ts == 0 || ts - start_ts > window)
+            Near<rule, window, ts, 0, 1>
+        else (
+            if (s1 == 1) empty else Near<rule, window, start_ts, s1, 1>
+        )
+    )
+}
+/\\
+{
+    let ts; timed_other_events(ts) (
+        if (start_ts > 0 && ts - start_ts > window)
+            Near<rule, window, 0, 0, 0>
+        else (
+            Near<rule, window, start_ts, s1, s2>
+        )
+    )
+};"""
+
+# Monitor name for each count comparison
+COUNT_MONITORS = {'>': "CountAbove", '<': "CountBelow"}
+
+# Event types read by the shared monitors, numbered by rule
+EVENT_TYPES = ["timed_other_events", "count_hit", "count_match", "count_safe", "near_first", "near_second"]
+
+class PackWriter:
+    """Writes the shared-monitor pack for a set of rules"""
+
+    def __init__(self, transpiler: Optional[RefactoredTranspiler] = None):
+        self.transpiler = transpiler or RefactoredTranspiler()
+        # Count rules slide like the transpiler's own count monitors when it uses buckets
+        self.buckets = self.transpiler.count_buckets
+
+    def _template_name(self, shape: MonitorShape) -> str:
+        if shape.template != 'count':
+            return "Near"
+        name = COUNT_MONITORS[shape.comparison[0]]
+        return f"Sliding{name}" if self.buckets else name
+
+    def _template(self, template: str) -> str:
+        """Definition of a shared monitor"""
+        if template == "Near":
+            return NEAR_TEMPLATE
+        operator = next(op for op, monitor in COUNT_MONITORS.items() if template.endswith(monitor))
+        if self.buckets:
+            return sliding_count_monitor(
+                template, "count_hit(ts, rule)", "timed_other_events(ts)", "count_safe(rule)", operator,
+                "limit", "width", self.buckets, ["rule", "width", "limit"]
+            )
+        return COUNT_TEMPLATE.format(name=template, operator=operator)
+
+    def _instance(self, shape: MonitorShape, number: int) -> str:
+        """Arguments of the shared monitor for one rule, initial state included"""
+        name = self._template_name(shape)
+        if shape.template != 'count':
+            return f"Near<{number}, {shape.timeframe_ms}, 0, 0, 0>"
+        if self.buckets:
+            state = ", ".join(["0"] * (self.buckets + 1))
+            return f"{name}<{number}, {bucket_width(shape.timeframe_ms, self.buckets)}, {shape.comparison[1]}, {state}>"
+        return f"{name}<{number}, {shape.timeframe_ms}, {shape.comparison[1]}, 0, 0>"
+
+    def _event_clause(self, event_type: str, number: int, selection_data: Any, timed: bool) -> str:
+        """One rule's clause of a numbered event type"""
+        field_values, _ = self.transpiler.field_extractor.extract_field_values(selection_data, 1)
+        field_pairs = ["timestamp: ts"] if timed else []
+        field_pairs.extend(self.transpiler.field_extractor.format_field_value(fv) for fv in field_values)
+        guard = [f"rule == {number}"] + self.transpiler.rml_generator.field_constraints(field_values)
+        parameters = "ts, rule" if timed else "rule"
+        return f"{event_type}({parameters}) matches {{{', '.join(field_pairs)}}} with {' and '.join(guard)};"
+
+    def write(self, rules: Iterable[Tuple[str, Dict[str, Any]]], out: RMLEmitter) -> Dict[str, Any]:
+        """Write the pack for (name, parsed rule) pairs to out; returns what was packed"""
+        packed: List[Tuple[str, Dict[str, Any], MonitorShape]] = []
+        unpacked = []
+        for name, sigma_rule in rules:
+            try:
+                shape = self.transpiler.monitor_shape(sigma_rule)
+            except Exception as e:
+                unpacked.append({"name": name, "reason": f"Transpilation failed: {str(e)}"})
+                continue
+            if shape is None:
+                unpacked.append({"name": name, "reason": "No shared monitor for this condition"})
+                continue
+            packed.append((name, sigma_rule, shape))
+
+        templates: Dict[str, int] = {}
+        for _, _, shape in packed:
+            name = self._template_name(shape)
+            templates[name] = templates.get(name, 0) + 1
+        report = {"rules": len(packed), "templates": templates, "packed": [name for name, _, _ in packed], "unpacked": unpacked}
+        if not packed:
+            return report
+
+        out.alias(*EVENT_TYPES, *templates)
+
+        # Identical log source filters are declared once
+        sources: Dict[str, str] = {}
+        for _, sigma_rule, _ in packed:
+            pattern = self.transpiler.rml_generator.logsource_pattern(sigma_rule.get('logsource', {}))
+            sources.setdefault(pattern, f"source{len(sources)}")
+        out.comment("log sources")
+        for pattern, source in sources.items():
+            out.line(f"{source} matches {pattern};")
+        out.blank()
+
+        out.comment("event types")
+        out.line("timed_other_events(ts) matches {timestamp: ts};")
+        if any(shape.template == 'count' for _, _, shape in packed):
+            out.line("count_safe(rule) not matches count_match(rule);")
+        for number, (name, sigma_rule, shape) in enumerate(packed):
+            detection = sigma_rule['detection']
+            if shape.template == 'count':
+                selection_data = detection[shape.selections[0]]
+                out.line(self._event_clause("count_hit", number, selection_data, timed=True))
+                out.line(self._event_clause("count_match", number, selection_data, timed=False))
+            else:
+                first, second = shape.selections
+                out.line(self._event_clause("near_first", number, detection[first], timed=True))
+                out.line(self._event_clause("near_second", number, detection[second], timed=True))
+        out.blank()
+
+        out.comment("shared monitors")
+        for template in templates:
+            out.line(self._template(template))
+        out.blank()
+
+        out.comment("rules")
+        for number, (name, sigma_rule, shape) in enumerate(packed):
+            source = sources[self.transpiler.rml_generator.logsource_pattern(sigma_rule.get('logsource', {}))]
+            out.line(f"Rule{number} = {source} >> {self._instance(shape, number)}!; // {name}")
+        out.line(f"Main = {' /\\ '.join(f'Rule{number}' for number in range(len(packed)))};")
+        return report
+
+def write_pack(rules: Iterable[Tuple[str, Dict[str, Any]]], sink: TextIO, compact: bool = False,
+               transpiler: Optional[RefactoredTranspiler] = None) -> Dict[str, Any]:
+    """Write the pack for (name, parsed rule) pairs to sink; returns what was packed"""
+    return PackWriter(transpiler).write(rules, RMLEmitter(sink, compact))
+
+def build_pack(rules: Iterable[Tuple[str, Dict[str, Any]]], compact: bool = False,
+               transpiler: Optional[RefactoredTranspiler] = None) -> Tuple[str, Dict[str, Any]]:
+    """The pack for (name, parsed rule) pairs as a string, with what was packed"""
+    buffer = io.StringIO()
+    report = write_pack(rules, buffer, compact, transpiler)
+    return buffer.getvalue(), report
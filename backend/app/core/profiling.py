@@ -0,0 +1,214 @@
+"""
+On-demand profiling of a single transpilation.
+
+profile_call() runs a function under a deterministic profiler and returns its
+result with a report: total wall and CPU time, a wall/CPU breakdown of the
+transpiler stages (recorded through app.core.metrics.stage), and the hottest
+functions by own time. The run can also be saved for offline flame graphs,
+either as a pstats file (cProfile; snakeviz, gprof2dot) or as a speedscope
+file (evented profile, open at https://www.speedscope.app).
+
+Profiler overhead is included in every number; compare stages with each
+other, not with unprofiled latencies. cProfile and pstats are imported on
+the first profiled request.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from .metrics import record_stages
+
+DUMP_FORMATS = ("pstats", "speedscope")
+
+# Since Python 3.12 cProfile registers a process-wide sys.monitoring tool and a
+# second active profiler is refused, so profiled requests run one at a time
+_profile_lock = threading.Lock()
+
+class StageRecorder:
+    """Accumulates wall and CPU time per stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, wall, cpu):
+        entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += wall
+        entry[2] += cpu
+
+    def report(self):
+        return [
+            {"stage": name, "calls": calls, "wall_ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3)}
+            for name, (calls, wall, cpu) in self.stages.items()
+        ]
+
+def _function_name(code_or_name):
+    if isinstance(code_or_name, str):
+        return code_or_name
+    return getattr(code_or_name, "co_qualname", code_or_name.co_name)
+
+class EventedTracer:
+    """sys.setprofile tracer recording open/close events for speedscope"""
+
+    def __init__(self):
+        self.frames = []
+        self.frame_index = {}
+        self.events = []
+        self.stack = []
+        self.start = None
+
+    def _frame(self, key, name, filename, line):
+        index = self.frame_index.get(key)
+        if index is None:
+            index = self.frame_index[key] = len(self.frames)
+            self.frames.append({"name": name, "file": filename, "line": line})
+        return index
+
+    def _trace(self, frame, event, arg):
+        now = time.perf_counter()
+        if event == "call":
+            code = frame.f_code
+            index = self._frame(code, _function_name(code), code.co_filename, code.co_firstlineno)
+        elif event == "c_call":
+            name = f"{getattr(arg, '__module__', None) or 'builtins'}.{getattr(arg, '__qualname__', repr(arg))}"
+            index = self._frame(("c", name), name, "~", 0)
+        elif self.stack:
+            # return, c_return, c_exception: close the innermost open frame
+            self.events.append({"type": "C", "frame": self.stack.pop(), "at": now})
+            return
+        else:
+            # Returning from a frame entered before tracing started
+            return
+        self.stack.append(index)
+        self.events.append({"type": "O", "frame": index, "at": now})
+
+    def run(self, fn, *args):
+        self.start = time.perf_counter()
+        sys.setprofile(self._trace)
+        try:
+            return fn(*args)
+        finally:
+            sys.setprofile(None)
+            end = time.perf_counter()
+            # Close whatever is still open, innermost first
+            while self.stack:
+                self.events.append({"type": "C", "frame": self.stack.pop(), "at": end})
+            self.end = end
+
+    def hot_functions(self, limit):
+        """Own and cumulative time per frame, from the event stream"""
+        totals = {}
+        open_at = []
+        for event in self.events:
+            if event["type"] == "O":
+                open_at.append([event["frame"], event["at"], 0.0])
+                continue
+            frame, opened, child_time = open_at.pop()
+            elapsed = event["at"] - opened
+            entry = totals.setdefault(frame, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed - child_time
+            # Recursive frames would double count cumulative time; only count the outermost
+            if not any(f == frame for f, _, _ in open_at):
+                entry[2] += elapsed
+            if open_at:
+                open_at[-1][2] += elapsed
+        ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {
+                "function": self.frames[frame]["name"],
+                "file": self.frames[frame]["file"],
+                "line": self.frames[frame]["line"],
+                "calls": calls,
+                "own_ms": round(own * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for frame, (calls, own, cumulative) in ranked
+        ]
+
+    def to_speedscope(self, name):
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "evented",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round((self.end - self.start) * 1000, 6),
+                "events": [
+                    {"type": e["type"], "frame": e["frame"], "at": round((e["at"] - self.start) * 1000, 6)}
+                    for e in self.events
+                ],
+            }],
+            "name": name,
+            "exporter": "sigma2rml",
+        }
+
+def _cprofile_hot_functions(profiler, limit):
+    import pstats
+    stats = pstats.Stats(profiler)
+    ranked = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            "function": _function_name(function),
+            "file": filename,
+            "line": line,
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, function), (_, calls, own, cumulative, _) in ranked
+    ]
+
+def _dump_path(directory, label, extension):
+    os.makedirs(directory, exist_ok=True)
+    safe_label = "".join(c if c.isalnum() or c in "-_." else "_" for c in label)[:80]
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"{safe_label}-{stamp}-{uuid.uuid4().hex[:8]}.{extension}")
+
+def profile_call(fn, *args, label="transpile", dump=None, directory="profiles", top=15):
+    """
+    Run fn(*args) under the profiler and return (result, report).
+
+    dump is None, "pstats" or "speedscope"; the file is written to directory
+    and its path returned as report["dump_path"].
+    """
+    if dump is not None and dump not in DUMP_FORMATS:
+        raise ValueError(f"Unsupported profile dump format: {dump}. Supported: {', '.join(DUMP_FORMATS)}")
+
+    recorder = StageRecorder()
+    with _profile_lock:
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        with record_stages(recorder):
+            if dump == "speedscope":
+                tracer = EventedTracer()
+                result = tracer.run(fn, *args)
+            else:
+                import cProfile
+                profiler = cProfile.Profile()
+                result = profiler.runcall(fn, *args)
+        wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+
+    report = {
+        "profiler": "evented" if dump == "speedscope" else "cProfile",
+        "wall_ms": round(wall * 1000, 3),
+        "cpu_ms": round(cpu * 1000, 3),
+        "stages": recorder.report(),
+    }
+    if dump == "speedscope":
+        report["hot_functions"] = tracer.hot_functions(top)
+        path = _dump_path(directory, label, "speedscope.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(tracer.to_speedscope(label), f)
+        report["dump_path"] = path
+    else:
+        report["hot_functions"] = _cprofile_hot_functions(profiler, top)
+        if dump == "pstats":
+            path = _dump_path(directory, label, "pstats")
+            profiler.dump_stats(path)
+            report["dump_path"] = path
+    return result, report
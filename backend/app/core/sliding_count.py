@@ -0,0 +1,73 @@
+"""
+Sliding-window count monitors with bounded state.
+
+The default count monitor is a tumbling window: it anchors on the first
+matching event and starts over once that event is more than the timeframe
+old, so a burst that straddles the anchor's window is split in two and
+missed. The sliding encoding here splits the timeframe into `buckets`
+sub-windows of equal width and keeps one counter per bucket:
+
+    Monitor<head, c1, ..., cB>
+
+head is where the newest bucket starts and c1 counts its events, c2 the
+bucket before, and so on. A matching event k buckets after head shifts the
+counters by k (dropping the oldest ones) and the limit is checked against
+their sum. Events more than the whole span after head start over.
+
+State is B + 1 numbers whatever the event rate. The sum covers the current
+bucket and the B - 1 before it, a window between timeframe * (B - 1) / B
+and timeframe long, so a burst can be undercounted by at most one bucket's
+worth of events. More buckets mean more precision and a larger monitor,
+quadratic in B. `benchmarks/bench_sliding_count.py` measures the tradeoff.
+"""
+
+from typing import List
+
+def bucket_width(timeframe_ms: int, buckets: int) -> int:
+    """Width of each bucket; the buckets never span more than the timeframe"""
+    return max(1, timeframe_ms // buckets)
+
+def sliding_count_monitor(name: str, hit: str, other: str, verdict: str, operator: str, limit: str,
+                          width: str, buckets: int, fixed: List[str] = ()) -> str:
+    """Definition of a sliding count monitor
+
+    hit, other and verdict are the event types for a matching event, any event and
+    the outcome once the limit is crossed, as in the tumbling monitor. limit and width
+    are numbers or parameter names; fixed parameters are passed through unchanged.
+    """
+    counters = [f"c{i}" for i in range(1, buckets + 1)]
+    parameters = ", ".join(list(fixed) + ["head"] + counters)
+
+    def scaled(multiple):
+        # multiple * width, folded when the width is a number
+        if width.isdigit():
+            return str(multiple * int(width))
+        return width if multiple == 1 else f"{multiple} * {width}"
+
+    def step(kept, start, values):
+        # Limit check on the counters kept plus this event, then the shifted state
+        state = ", ".join(list(fixed) + [start] + values)
+        return f"if ({' + '.join(kept + ['1'])} {operator} {limit}) {verdict} else {name}<{state}>"
+
+    # (guard, action) per case: start over, same bucket, then 1 to B - 1 buckets later
+    cases = [
+        (f"ts - head >= {scaled(buckets)}", step([], "ts", ["1"] + ["0"] * (buckets - 1))),
+        (f"ts - head < {scaled(1)}", step(counters, "head", ["c1+1"] + counters[1:])),
+    ]
+    for shift in range(1, buckets):
+        kept = counters[:buckets - shift]
+        values = ["1"] + ["0"] * (shift - 1) + kept
+        cases.append((f"ts - head < {scaled(shift + 1)}", step(kept, f"head + {scaled(shift)}", values)))
+    # The last case needs no guard
+    body = "\n            else ".join(
+        [f"if ({guard}) ({action})" for guard, action in cases[:-1]] + [f"({cases[-1][1]})"]
+    )
+
+    return f"""{name}<{parameters}> =
+    {{let ts; {hit}
+        (
+            {body}
+        )
+    }}
+    \\/
+    {{let ts; {other} {name}<{parameters}>}};"""
@@ -0,0 +1,127 @@
+"""
+Translate a registered Sigma rule file and store its RML.
+
+Shared by the synchronous translate endpoint and the background job workers.
+Errors are plain exceptions so each caller can map them: FileNotFoundError
+for a missing record or file, ValueError for invalid input, RuntimeError
+when the transpiler produced nothing.
+
+Each translation records the source hash, transpiler version and output
+options (count window settings) it was made from, so is_stale() can tell which
+records need translating again.
+"""
+
+import os
+import threading
+from app import config
+from app.core.metrics import stage
+from app.core.transpiler_refactored import RefactoredTranspiler, TRANSPILER_VERSION
+from app.storage.db import get_file_record, load_db, update_file_record
+from app.storage.layout import content_hash, resolve_path, translations
+from app.utils.file_responses import file_digest, forget_file, warm_text
+
+_local = threading.local()
+
+def get_transpiler() -> RefactoredTranspiler:
+    """Return this thread's transpiler (RefactoredTranspiler keeps per-run state)"""
+    transpiler = getattr(_local, "transpiler", None)
+    if transpiler is None:
+        transpiler = _local.transpiler = RefactoredTranspiler(
+            config.CONDITION_MAX_DEPTH, config.CONDITION_MAX_LENGTH, config.COUNT_BUCKETS, config.COUNT_KEYS,
+            config.COUNT_MAX_DISTINCT
+        )
+    return transpiler
+
+def translate_file(filename: str, transpiler: RefactoredTranspiler = None) -> dict:
+    """Translate one registered file and record the result; returns the stored RML details"""
+    import yaml
+    if not filename or not filename.strip():
+        raise ValueError("Invalid filename")
+
+    record = get_file_record(filename)
+    if not record:
+        raise FileNotFoundError("File not found")
+
+    # Resolve the stored path to actual file system path
+    actual_path = resolve_path(record["path"])
+    if not os.path.exists(actual_path):
+        raise FileNotFoundError(f"File not found on disk: {actual_path}")
+
+    # Read and validate Sigma rule
+    with open(actual_path, "rb") as f:
+        source = f.read()
+    sigma_text = source.decode("utf-8")
+
+    if not sigma_text.strip():
+        raise ValueError("File is empty")
+
+    try:
+        with stage("yaml_load"):
+            yaml_content = yaml.safe_load(sigma_text)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML format: {str(e)}")
+    if not yaml_content:
+        raise ValueError("Invalid YAML format")
+
+    # Transpile to RML
+    transpiler = transpiler or get_transpiler()
+    rml_output = transpiler.transpile(yaml_content)
+    if not rml_output:
+        raise RuntimeError("Transpilation failed - no output generated")
+
+    # Save translated RML into its content-hash shard
+    rml_filename = filename.rsplit('.', 1)[0] + ".rml"
+    normalized_rml_path, rml_sha256 = translations.write(rml_filename, rml_output.encode("utf-8"))
+
+    # Drop the previous translation if its content (and so its location) changed
+    previous_rml_path = record.get("rml_path")
+    if previous_rml_path and previous_rml_path != normalized_rml_path:
+        translations.remove(previous_rml_path)
+        forget_file(resolve_path(previous_rml_path))
+
+    actual_rml_path = resolve_path(normalized_rml_path)
+    warm_text(actual_rml_path, rml_output)
+
+    # Update database record with normalized path and what it was built from
+    update_file_record(
+        filename,
+        durable=True,
+        translated=True,
+        rml_path=normalized_rml_path,
+        source_sha256=content_hash(source),
+        transpiler_version=TRANSPILER_VERSION,
+        transpiler_options=transpiler.output_options()
+    )
+
+    return {
+        "filename": filename,
+        "rml_text": rml_output,
+        "rml_path": normalized_rml_path,
+        "actual_rml_path": actual_rml_path,
+        "rml_sha256": rml_sha256,
+    }
+
+def is_stale(record: dict, options: dict = None) -> bool:
+    """True when a record has no usable RML, or its RML predates the source, the transpiler or its options"""
+    if not record.get("translated") or not record.get("rml_path"):
+        return True
+    if not os.path.exists(resolve_path(record["rml_path"])):
+        return True
+    if record.get("transpiler_version") != TRANSPILER_VERSION:
+        return True
+    if record.get("transpiler_options") != (options or get_transpiler().output_options()):
+        return True
+
+    source_sha256 = record.get("sha256")
+    if not source_sha256:
+        # Records registered before uploads were hashed
+        actual_path = resolve_path(record["path"])
+        if not os.path.exists(actual_path):
+            return False
+        source_sha256 = file_digest(actual_path)
+    return record.get("source_sha256") != source_sha256
+
+def stale_filenames() -> list:
+    """Filenames of every registry record whose RML is missing or stale"""
+    options = get_transpiler().output_options()
+    return [record["filename"] for record in load_db() if is_stale(record, options)]
@@ -4,10 +4,29 @@ Refactored Sigma to RML Transpiler
 Clean, scalable architecture that handles all Sigma rule patterns systematically
 """
 
+import io
 import re
-from typing import Dict, List, Any, Tuple, Optional, Union
+from typing import Dict, List, Any, Tuple, Optional, TextIO, Union
 from dataclasses import dataclass
 from enum import Enum
+from .metrics import stage, timed, recent_transpile_seconds, rules_processed, transpile_errors
+from .emitter import RMLEmitter, render
+from .condition_minimizer import BoolExpr, Formula, minimize_condition, polarities
+from .intervals import BOUND_MODIFIERS, Interval
+from .keyed_count import keyed_count_monitor, keyed_state_size, parse_count
+from .sliding_count import bucket_width, sliding_count_monitor
+from .value_sets import ValueSet, compress_values, format_alternation, membership_guard
+
+# Bump whenever generated RML changes for the same input
+TRANSPILER_VERSION = "1.5.1"
+
+# Conditions longer or more deeply nested than this are rejected before parsing
+MAX_CONDITION_LENGTH = 100_000
+MAX_CONDITION_DEPTH = 64
+
+_PARENTHESIS = re.compile(r'[()]')
+# Prefix of the placeholders that stand for parenthesized groups while a condition is simplified
+_GROUP = '\x00'
 
 class ConditionType(Enum):
     """Types of conditions that can be processed"""
@@ -22,6 +41,8 @@ class FieldValue:
     value: Any
     modifier: Optional[str] = None
     variable_name: Optional[str] = None
+    value_set: Optional[ValueSet] = None
+    interval: Optional[Interval] = None
 
 @dataclass
 class Selection:
@@ -30,6 +51,14 @@ class Selection:
     fields: Dict[str, FieldValue]
     negated: bool = False
 
+@dataclass
+class MonitorShape:
+    """A temporal rule whose monitor is one of the shared shapes, with what varies per rule"""
+    template: str  # 'count' or 'near'
+    selections: List[str]  # selections the monitor reads, in order
+    timeframe_ms: int
+    comparison: Optional[Tuple[str, int]] = None  # count: operator and limit that count+1 is compared with
+
 @dataclass
 class ConditionNode:
     """Represents a parsed condition structure"""
@@ -41,44 +70,104 @@ class ConditionNode:
 class ConditionSimplifier:
     """Handles condition simplification using De Morgan's laws and other optimizations"""
     
-    @staticmethod
-    def simplify_condition(condition: str) -> str:
+    def __init__(self, max_depth: int = MAX_CONDITION_DEPTH, max_length: int = MAX_CONDITION_LENGTH):
+        self.max_depth = max_depth
+        self.max_length = max_length
+    
+    def simplify_condition(self, condition: str) -> str:
         """Simplify the condition string by applying De Morgan's laws and removing unnecessary parentheses"""
+        if len(condition) > self.max_length:
+            raise ValueError(f"Condition is too long: {len(condition)} characters (limit {self.max_length})")
+        
         # Remove extra spaces
         condition = re.sub(r'\s+', ' ', condition.strip())
         
         # Use the user's elegant parentheses parsing and De Morgan's law logic
-        newcondition, par_map = ConditionSimplifier._parse_condition(condition)
+        newcondition, par_map = ConditionSimplifier._parse_condition(condition, self.max_depth)
         simplified = ConditionSimplifier._regenerate_condition(newcondition, par_map)
         
         return ' '.join(simplified)
     
     @staticmethod
-    def _parse_condition(condition: str, last_idx: int = 0, par_map: dict = None):
-        """Parse parentheses and map them to indices"""
-        if par_map is None:
-            par_map = {}
-        
-        pattern = r'\([^()]*\)'
-        matches = re.findall(pattern, condition)
-        
-        for p in matches:
-            par_map[str(last_idx)] = p
-            condition = condition.replace(p, str(last_idx))
-            last_idx += 1
-            
-        if len(matches) > 0:
-            condition, par_map = ConditionSimplifier._parse_condition(condition, last_idx, par_map)
-        
-        return condition, par_map
+    def _parse_condition(condition: str, max_depth: int = MAX_CONDITION_DEPTH):
+        """Replace every parenthesized group by a placeholder, in one pass over the condition
+        
+        Returns the top-level condition and a map from placeholder to group text, in the
+        order groups close (inner groups before the groups that contain them). Identical
+        groups share a placeholder. Calls such as count() are not groups and stay as written.
+        """
+        par_map = {}
+        keys = {}
+        # Pieces of the group being read; stack holds the enclosing groups and whether each is a call
+        pieces = []
+        stack = []
+        in_call = False
+        last = 0
+        for match in _PARENTHESIS.finditer(condition):
+            position = match.start()
+            pieces.append(condition[last:position])
+            last = position + 1
+            if match.group() == '(':
+                if len(stack) >= max_depth:
+                    raise ValueError(f"Condition nests parentheses deeper than {max_depth} levels")
+                stack.append((pieces, in_call))
+                in_call = in_call or ConditionSimplifier._is_call(condition, position)
+                pieces = ['(']
+                continue
+            if not stack:
+                raise ValueError(f"Unbalanced parentheses in condition: unexpected ')' at position {position}")
+            pieces.append(')')
+            group = ''.join(pieces)
+            pieces, call = stack.pop()
+            if in_call:
+                pieces.append(group)
+            else:
+                key = keys.get(group)
+                if key is None:
+                    key = keys[group] = f"{_GROUP}{len(par_map)}"
+                    par_map[key] = group
+                pieces.append(f" {key} ")
+            in_call = call
+        if stack:
+            raise ValueError(f"Unbalanced parentheses in condition: {len(stack)} unclosed '('")
+        pieces.append(condition[last:])
+        return ''.join(pieces), par_map
+    
+    @staticmethod
+    def _is_call(condition: str, position: int) -> bool:
+        """Whether the '(' at position follows a name, as in count(), rather than an operator"""
+        end = position
+        while end > 0 and condition[end - 1] == ' ':
+            end -= 1
+        if end != position:
+            return False
+        start = end
+        while start > 0 and (condition[start - 1].isalnum() or condition[start - 1] == '_'):
+            start -= 1
+        return start != end and condition[start:end] not in ('and', 'or', 'not')
     
     @staticmethod
-    def _regenerate_condition(condition: str, parse_map: dict, flag: bool = False, operation: str = 'none', level: int = 0):
-        """Regenerate condition with proper De Morgan's law application"""
-        token_list = condition.split()
+    def _regenerate_condition(condition: str, parse_map: dict):
+        """Regenerate condition with proper De Morgan's law application
+        
+        Groups are resolved innermost first, under both polarities, so every group is
+        read once and nesting depth costs no recursion. A resolved group is kept as
+        (opening, tokens, closing) and only joined into text at the end.
+        """
+        resolved = {}
+        for key, group in parse_map.items():
+            tokens = group[1:-1].split()
+            innermost = _GROUP not in group
+            for flag in (False, True):
+                resolved[key, flag] = ConditionSimplifier._regenerate_tokens(tokens, resolved, flag), innermost
+        return [ConditionSimplifier._render(item) for item in ConditionSimplifier._regenerate_tokens(condition.split(), resolved)]
+    
+    @staticmethod
+    def _regenerate_tokens(token_list: List[str], resolved: dict, flag: bool = False):
         new_list = []
+        operation = 'none'
         
-        for idx, token in enumerate(token_list):
+        for token in token_list:
             if token == 'and':
                 if flag:
                     new_list.append('or')
@@ -94,34 +183,53 @@ class ConditionSimplifier:
                     new_list.append('or')
                     operation = 'or'
             elif token == 'not':
-                if flag:
-                    flag = False
+                flag = not flag
+            elif token[0] == _GROUP and (token, flag) in resolved:
+                val, innermost = resolved[token, flag]
+                
+                # Check if parentheses are needed based on operator precedence
+                if operation == 'and' and 'and' in val and 'or' not in val:
+                    opening, closing = '', ''
+                elif operation == 'or' and 'or' in val and 'and' not in val:
+                    opening, closing = '', ''
                 else:
-                    if level > 0:
-                        new_list.append(token)
-                    flag = True
+                    opening, closing = '(', ')'
+                
+                # Innermost groups are joined right away; joining the others at every
+                # level would copy the inner text once per enclosing level
+                if innermost:
+                    new_list.append(opening + ' '.join(val) + closing)
+                else:
+                    new_list.append((opening, val, closing))
+                flag = False
             else:
-                try:
-                    val = parse_map[token]
-                    val = ConditionSimplifier._regenerate_condition(val[1:-1], parse_map, flag, level + 1)
-                    
-                    # Check if parentheses are needed based on operator precedence
-                    if operation == 'and' and 'and' in val and 'or' not in val:
-                        s = ' '.join(val)
-                    elif operation == 'or' and 'or' in val and 'and' not in val:
-                        s = ' '.join(val)
-                    else:
-                        s = '(' + ' '.join(val) + ')'
-                    
-                    new_list.append(s)
-                    flag = False
-                except KeyError:
-                    if flag:
-                        new_list.append('not')
-                    new_list.append(token)
+                if flag:
+                    new_list.append('not')
+                new_list.append(token)
         
         return new_list
     
+    @staticmethod
+    def _render(item) -> str:
+        """Text of a regenerated token or group, without recursion"""
+        if isinstance(item, str):
+            return item
+        parts = []
+        pending = [item]
+        while pending:
+            entry = pending.pop()
+            if isinstance(entry, str):
+                parts.append(entry)
+                continue
+            opening, tokens, closing = entry
+            pending.append(closing)
+            for index in range(len(tokens) - 1, -1, -1):
+                pending.append(tokens[index])
+                if index:
+                    pending.append(' ')
+            pending.append(opening)
+        return ''.join(parts)
+    
     @staticmethod
     def _is_selection_negated(selection_name: str, condition: str) -> bool:
         """Determine if a selection is negated in the simplified condition"""
@@ -228,51 +336,80 @@ class FieldValueExtractor:
     def extract_field_values(field_data: Any, variable_counter: int = 1) -> List[FieldValue]:
         """Extract field values from detection data"""
         field_values = []
-        counter = variable_counter
+        intervals = {}
         
         if isinstance(field_data, dict):
             for field_name, value in field_data.items():
                 if '|' in field_name:
                     # Handle modifiers like |gte, |lte, etc.
                     base_name, modifier = field_name.split('|', 1)
+                    base_name = base_name.lower()  # Convert to lowercase to match examples
+                    if modifier in BOUND_MODIFIERS:
+                        # All numeric bounds on a field share one interval and one variable
+                        if base_name not in intervals:
+                            intervals[base_name] = FieldValue(
+                                field_name=base_name,
+                                value=value,
+                                modifier=modifier,
+                                interval=Interval()
+                            )
+                            field_values.append(intervals[base_name])
+                        intervals[base_name].interval.narrow(modifier, value)
+                    else:
+                        field_values.append(FieldValue(
+                            field_name=base_name,
+                            value=value,
+                            modifier=modifier
+                        ))
+                elif isinstance(value, list):
+                    # Integer runs become range checks on a bound variable
                     field_values.append(FieldValue(
-                        field_name=base_name.lower(),  # Convert to lowercase to match examples
+                        field_name=field_name.lower(),
                         value=value,
-                        modifier=modifier,
-                        variable_name=f"x{counter}"
+                        value_set=compress_values(value)
                     ))
-                    counter += 1
                 else:
                     field_values.append(FieldValue(
                         field_name=field_name.lower(),  # Convert to lowercase to match examples
                         value=value
                     ))
         
+        # Number variables in field order, once merging has settled which fields need one
+        counter = variable_counter
+        for field_value in field_values:
+            if FieldValueExtractor._needs_variable(field_value):
+                field_value.variable_name = f"x{counter}"
+                counter += 1
+        
         return field_values, counter
     
+    @staticmethod
+    def _needs_variable(field_value: FieldValue) -> bool:
+        if field_value.interval is not None:
+            return field_value.interval.point() is None
+        if field_value.value_set is not None:
+            return bool(field_value.value_set.ranges)
+        return field_value.modifier is not None
+    
     @staticmethod
     def format_field_value(field_value: FieldValue) -> str:
         """Format a field value for RML output"""
-        if field_value.modifier:
-            # Handle numerical modifiers
-            if field_value.modifier == 'gte':
-                return f"{field_value.field_name}: {field_value.variable_name}"
-            elif field_value.modifier == 'lte':
-                return f"{field_value.field_name}: {field_value.variable_name}"
-            elif field_value.modifier == 'gt':
-                return f"{field_value.field_name}: {field_value.variable_name}"
-            elif field_value.modifier == 'lt':
-                return f"{field_value.field_name}: {field_value.variable_name}"
-            else:
-                return f"{field_value.field_name}: {field_value.value}"
+        if field_value.interval is not None:
+            # A single-value interval needs no variable
+            point = field_value.interval.point()
+            if point is not None:
+                return f"{field_value.field_name}: {point}"
+            return f"{field_value.field_name}: {field_value.variable_name}"
+        elif field_value.modifier:
+            return f"{field_value.field_name}: {field_value.value}"
         else:
             # Handle regular values
             if isinstance(field_value.value, list):
-                if all(isinstance(v, str) for v in field_value.value):
-                    quoted_values = [f"'{v}'" for v in field_value.value]
-                    return f"{field_value.field_name}: {' | '.join(quoted_values)}"
-                else:
-                    return f"{field_value.field_name}: {' | '.join(str(v) for v in field_value.value)}"
+                value_set = field_value.value_set or compress_values(field_value.value)
+                if value_set.ranges and field_value.variable_name:
+                    # Membership is checked by the guard from field_constraints
+                    return f"{field_value.field_name}: {field_value.variable_name}"
+                return f"{field_value.field_name}: {format_alternation(value_set.values())}"
             elif isinstance(field_value.value, str):
                 return f"{field_value.field_name}: '{field_value.value}'"
             else:
@@ -284,8 +421,13 @@ class RMLLineGenerator:
     @staticmethod
     def generate_logsource_filter(logsource: Dict[str, Any]) -> str:
         """Generate logsource filter line"""
+        return f"logsource matches {RMLLineGenerator.logsource_pattern(logsource)};"
+    
+    @staticmethod
+    def logsource_pattern(logsource: Dict[str, Any]) -> str:
+        """Pattern the log source filter matches"""
         if not logsource:
-            return "logsource matches {product: 'windows', service: 'security'};"
+            return "{product: 'windows', service: 'security'}"
         
         fields = []
         for key, value in logsource.items():
@@ -294,28 +436,44 @@ class RMLLineGenerator:
             else:
                 fields.append(f"{key}: {value}")
         
-        return f"logsource matches {{{', '.join(fields)}}};"
+        return f"{{{', '.join(fields)}}}"
+    
+    @staticmethod
+    def field_constraints(field_values: List[FieldValue]) -> List[str]:
+        """Guards on the variables bound by numerical modifiers and compressed lists"""
+        constraints = []
+        for field_value in field_values:
+            if not field_value.variable_name:
+                continue
+            if field_value.interval is not None:
+                constraints.extend(field_value.interval.constraints(field_value.variable_name))
+            elif field_value.value_set and field_value.value_set.ranges:
+                constraints.append(membership_guard(field_value.variable_name, field_value.value_set))
+        return constraints
+    
+    @staticmethod
+    def bound_constraints(field_value: FieldValue, variable: str) -> List[str]:
+        """Guards on variable for the value field_value requires, when its field is bound to variable"""
+        if field_value.interval is not None and field_value.interval.point() is None:
+            return field_value.interval.constraints(variable)
+        if field_value.interval is None and isinstance(field_value.value, list):
+            return [membership_guard(variable, field_value.value_set or compress_values(field_value.value))]
+        literal = FieldValueExtractor.format_field_value(field_value).split(": ", 1)[1]
+        return [f"{variable} == {literal}"]
+    
+    @staticmethod
+    def never_matches(field_values: List[FieldValue]) -> List[str]:
+        """Fields whose merged bounds leave no value"""
+        return [fv.field_name for fv in field_values if fv.interval is not None and fv.interval.is_empty()]
     
     @staticmethod
     def generate_selection_definition(selection: Selection) -> str:
         """Generate a selection definition line"""
-        field_pairs = []
-        constraints = []
-        
-        for field_name, field_value in selection.fields.items():
-            formatted_value = FieldValueExtractor.format_field_value(field_value)
-            field_pairs.append(formatted_value)
-            
-            # Collect constraints for numerical modifiers
-            if field_value.modifier and field_value.variable_name:
-                if field_value.modifier == 'gte':
-                    constraints.append(f"{field_value.variable_name} >= {field_value.value}")
-                elif field_value.modifier == 'lte':
-                    constraints.append(f"{field_value.variable_name} <= {field_value.value}")
-                elif field_value.modifier == 'gt':
-                    constraints.append(f"{field_value.variable_name} > {field_value.value}")
-                elif field_value.modifier == 'lt':
-                    constraints.append(f"{field_value.variable_name} < {field_value.value}")
+        field_pairs = [
+            FieldValueExtractor.format_field_value(field_value)
+            for field_value in selection.fields.values()
+        ]
+        constraints = RMLLineGenerator.field_constraints(list(selection.fields.values()))
         
         if field_pairs:
             field_str = f"{{{', '.join(field_pairs)}}}"
@@ -328,12 +486,19 @@ class RMLLineGenerator:
         else:
             constraint_str = ""
         
+        # Contradictory bounds keep their guard, which no event satisfies
+        empty_fields = RMLLineGenerator.never_matches(list(selection.fields.values()))
+        if empty_fields:
+            constraint_str += f"; // never matches: empty range for {', '.join(empty_fields)}"
+        else:
+            constraint_str += ";"
+        
         # Sigma semantics: detect A means RML should filter out A (not matches)
         # Sigma semantics: not A means RML should ensure A is present (matches)
         if selection.negated:
-            return f"safe_{selection.name} matches {field_str}{constraint_str};"
+            return f"safe_{selection.name} matches {field_str}{constraint_str}"
         else:
-            return f"safe_{selection.name} not matches {field_str}{constraint_str};"
+            return f"safe_{selection.name} not matches {field_str}{constraint_str}"
     
     @staticmethod
     def generate_main_expression() -> str:
@@ -343,21 +508,26 @@ class RMLLineGenerator:
     @staticmethod
     def generate_monitor_expression(condition: str, selections: List[str]) -> str:
         """Generate the monitor expression based on the actual condition structure"""
+        return '\n'.join(RMLLineGenerator.monitor_statements(condition, selections))
+    
+    @staticmethod
+    def monitor_statements(condition: str, selections: List[str]) -> List[str]:
+        """The monitor statement, followed by the definitions it refers to"""
         safe_selections = [f"safe_{s}" for s in selections]
         
         # Check for unsupported patterns first
         if 'UNSUPPORTED_' in condition:
-            return f"Monitor = UNSUPPORTED_PATTERN; // {condition}"
+            return [f"Monitor = UNSUPPORTED_PATTERN; // {condition}"]
         
         # Check if the condition contains the expanded quantifier
         if 'selection1 and selection2' in condition and len(selections) == 2:
             # This is likely a "2 of selection*" case
-            return f"Monitor = UNSUPPORTED_PATTERN; // 2 of selection* not supported"
+            return [f"Monitor = UNSUPPORTED_PATTERN; // 2 of selection* not supported"]
         
         # Analyze the original condition structure more carefully
         # For single selection, just use the selection directly
         if len(selections) == 1:
-            return f"Monitor = {safe_selections[0]}*;"
+            return [f"Monitor = {safe_selections[0]}*;"]
         
         # For multiple selections, we need to determine the logical operator
         # Look at the original condition before expansion
@@ -365,34 +535,51 @@ class RMLLineGenerator:
         
         # Check for quantifier patterns
         if 'any of selection*' in original_condition:
-            return f"Monitor = ({' /\\ '.join(safe_selections)})*;"
+            return [f"Monitor = ({' /\\ '.join(safe_selections)})*;"]
         elif 'all of selection*' in original_condition:
-            return f"Monitor = ({' \\/ '.join(safe_selections)})*;"
+            return [f"Monitor = ({' \\/ '.join(safe_selections)})*;"]
         elif '1 of selection*' in original_condition:
-            return f"Monitor = ({' /\\ '.join(safe_selections)})*;"
+            return [f"Monitor = ({' /\\ '.join(safe_selections)})*;"]
         elif '2 of selection*' in original_condition or '3 of selection*' in original_condition:
-            return f"Monitor = UNSUPPORTED_PATTERN; // {original_condition} not supported"
+            return [f"Monitor = UNSUPPORTED_PATTERN; // {original_condition} not supported"]
         
         # Handle complex conditions with parentheses and mixed operators
         # This is the key fix for the bug you identified
         if '(' in original_condition and ')' in original_condition:
-            return RMLLineGenerator._generate_complex_monitor_expression(original_condition, safe_selections)
+            return RMLLineGenerator._complex_monitor_statements(original_condition, safe_selections)
         
         # Handle simple mixed operators without parentheses
         if ' and ' in original_condition and ' or ' in original_condition:
             # Complex mixed condition - use AND for safety
-            return f"Monitor = ({' /\\ '.join(safe_selections)})*;"
+            return [f"Monitor = ({' /\\ '.join(safe_selections)})*;"]
         elif ' and ' in original_condition:
-            return f"Monitor = ({' \\/ '.join(safe_selections)})*;"
+            return [f"Monitor = ({' \\/ '.join(safe_selections)})*;"]
         elif ' or ' in original_condition:
-            return f"Monitor = ({' /\\ '.join(safe_selections)})*;"
+            return [f"Monitor = ({' /\\ '.join(safe_selections)})*;"]
         
         # Default case: assume AND for multiple selections
-        return f"Monitor = ({' /\\ '.join(safe_selections)})*;"
+        return [f"Monitor = ({' /\\ '.join(safe_selections)})*;"]
     
     @staticmethod
-    def _generate_complex_monitor_expression(condition: str, safe_selections: List[str]) -> str:
-        """Generate monitor expression for complex conditions with parentheses"""
+    def generate_formula_monitor(formula: Formula) -> str:
+        """Monitor for a minimized condition: Sigma and becomes \\/, or becomes /\\ (see generate_monitor_expression)"""
+        def render(node, nested):
+            if isinstance(node, str):
+                return f"safe_{node}"
+            if node.operator == "not":
+                # Negation is carried by the event type (matches instead of not matches)
+                return render(node.operands[0], nested)
+            joined = (' \\/ ' if node.operator == 'and' else ' /\\ ').join(render(operand, True) for operand in node.operands)
+            return f"({joined})" if nested else joined
+        
+        expression = render(formula, False)
+        if isinstance(formula, BoolExpr) and formula.operator != "not":
+            return f"Monitor = ({expression})*;"
+        return f"Monitor = {expression}*;"
+    
+    @staticmethod
+    def _complex_monitor_statements(condition: str, safe_selections: List[str]) -> List[str]:
+        """Monitor and group definitions for complex conditions with parentheses"""
         # Find all parenthesized expressions
         import re
         paren_pattern = r'\(([^)]+)\)'
@@ -400,7 +587,7 @@ class RMLLineGenerator:
         
         if not paren_matches:
             # Fallback to simple case
-            return f"Monitor = ({' /\\ '.join(safe_selections)})*;"
+            return [f"Monitor = ({' /\\ '.join(safe_selections)})*;"]
         
         # Create definitions for parenthesized expressions
         definitions = []
@@ -464,34 +651,74 @@ class RMLLineGenerator:
             simplified_condition = simplified_condition.replace('not ', '').strip()
             monitor_expr = f"Monitor = {simplified_condition}*;"
         
-        # Combine definitions and monitor expression
         # Put Monitor first, then definitions for better readability
-        if definitions:
-            return '\n'.join([monitor_expr] + definitions)
-        else:
-            return monitor_expr
+        return [monitor_expr] + definitions
 
 class RefactoredTranspiler:
     """Main transpiler class with clean, modular architecture"""
     
-    def __init__(self):
-        self.condition_simplifier = ConditionSimplifier()
+    def __init__(self, max_condition_depth: int = MAX_CONDITION_DEPTH, max_condition_length: int = MAX_CONDITION_LENGTH,
+                 count_buckets: int = 0, count_keys: int = 8, count_max_distinct: int = 32):
+        self.condition_simplifier = ConditionSimplifier(max_condition_depth, max_condition_length)
+        # count() monitors: 0 for a tumbling window, otherwise a sliding window of this many buckets
+        self.count_buckets = max(0, count_buckets)
+        # count() by field monitors: keys tracked at once, in slots recycled once idle for a timeframe
+        self.count_keys = max(1, count_keys)
+        # count(field) monitors keep up to limit values per key; above this they count every event
+        self.count_max_distinct = max(1, count_max_distinct)
         self.quantifier_expander = QuantifierExpander()
         self.field_extractor = FieldValueExtractor()
         self.rml_generator = RMLLineGenerator()
-        self.variable_counter = 1  # Global counter for variable names
+        self.variable_counter = 1  # Counter for variable names, restarted for every rule
     
-    def transpile(self, sigma_rule: Union[str, Dict[str, Any]]) -> str:
+    def output_options(self) -> Dict[str, int]:
+        """Settings besides TRANSPILER_VERSION that change the generated RML"""
+        return {"count_buckets": self.count_buckets, "count_keys": self.count_keys,
+                "count_max_distinct": self.count_max_distinct}
+    
+    def transpile(self, sigma_rule: Union[str, Dict[str, Any]], compact: bool = False) -> str:
         """Main transpilation method"""
+        with timed(recent_transpile_seconds):
+            buffer = io.StringIO()
+            error = self._transpile(sigma_rule, RMLEmitter(buffer, compact))
+            return error or buffer.getvalue()
+    
+    def transpile_with_source_map(self, sigma_rule: Union[str, Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """Compact RML and its source map back to the pretty layout (an empty map when transpilation fails)"""
+        with timed(recent_transpile_seconds):
+            buffer = io.StringIO()
+            out = RMLEmitter(buffer, compact=True)
+            error = self._transpile(sigma_rule, out)
+            if error:
+                return error, {}
+            return buffer.getvalue(), out.source_map()
+    
+    def transpile_to(self, sigma_rule: Union[str, Dict[str, Any]], sink: TextIO, compact: bool = False) -> bool:
+        """Write the RML to sink as it is generated; on failure the error comment comes last and False is returned"""
+        with timed(recent_transpile_seconds):
+            out = RMLEmitter(sink, compact)
+            error = self._transpile(sigma_rule, out)
+            if error:
+                if out.written:
+                    sink.write("\n")
+                sink.write(error)
+            return error is None
+    
+    def _transpile(self, sigma_rule: Union[str, Dict[str, Any]], out: RMLEmitter) -> Optional[str]:
+        """Write the RML for a rule to out; returns an error comment instead when it fails"""
+        # Transpilers are reused across requests; numbering must not depend on earlier rules
+        self.variable_counter = 1
         try:
             # Handle both string (YAML) and dict inputs
             if isinstance(sigma_rule, str):
                 import yaml
                 try:
-                    sigma_rule = yaml.safe_load(sigma_rule)
+                    with stage("yaml_load"):
+                        sigma_rule = yaml.safe_load(sigma_rule)
                     if not sigma_rule:
                         return "// Error: Invalid or empty YAML content"
                 except yaml.YAMLError as e:
+                    transpile_errors.inc(1, type(e).__name__)
                     return f"// Error: Invalid YAML format: {str(e)}"
             
             # Extract components
@@ -503,22 +730,52 @@ class RefactoredTranspiler:
             selections = [k for k in detection.keys() if k not in ['condition', 'timeframe']]
             
             # Simplify condition
-            simplified_condition = self.condition_simplifier.simplify_condition(condition)
+            with stage("simplify_condition"):
+                simplified_condition = self.condition_simplifier.simplify_condition(condition)
             
             # Expand quantifiers
-            expanded_condition = self.quantifier_expander.expand_quantifiers(simplified_condition, selections)
+            with stage("expand_quantifiers"):
+                expanded_condition = self.quantifier_expander.expand_quantifiers(simplified_condition, selections)
             
             # Determine if temporal
             is_temporal = self._is_temporal_condition(expanded_condition, detection)
             
             if is_temporal:
-                return self._generate_temporal_rml(sigma_rule, expanded_condition)
+                with stage("temporal_generation"):
+                    self._generate_temporal_rml(sigma_rule, expanded_condition, out)
+                rules_processed.inc(1, "temporal")
             else:
-                return self._generate_basic_rml(sigma_rule, expanded_condition, selections)
+                self._generate_basic_rml(sigma_rule, expanded_condition, selections, out)
+                rules_processed.inc(1, "basic")
+            return None
                 
         except Exception as e:
+            transpile_errors.inc(1, type(e).__name__)
             return f"// Error during transpilation: {str(e)}"
     
+    def monitor_shape(self, sigma_rule: Dict[str, Any]) -> Optional[MonitorShape]:
+        """The shared monitor shape (count, or near over two selections) of a rule, or None for any other rule"""
+        detection = sigma_rule.get('detection', {})
+        condition = detection.get('condition', '')
+        selections = [k for k in detection.keys() if k not in ['condition', 'timeframe']]
+        
+        # Same path as transpile(): only temporal rules get these monitors
+        simplified_condition = self.condition_simplifier.simplify_condition(condition)
+        expanded_condition = self.quantifier_expander.expand_quantifiers(simplified_condition, selections)
+        if not selections or not self._is_temporal_condition(expanded_condition, detection):
+            return None
+        
+        timeframe_ms = self._convert_timeframe_to_ms(detection.get('timeframe', '10s'))
+        aggregation = parse_count(condition)
+        if aggregation is not None:
+            # Keyed counts keep per-key state of their own
+            if aggregation.keyed:
+                return None
+            return MonitorShape('count', selections[:1], timeframe_ms, self._count_comparison(condition))
+        if '| near' in condition and len(selections) == 2:
+            return MonitorShape('near', selections, timeframe_ms)
+        return None
+    
     def _is_temporal_condition(self, condition: str, detection: Dict[str, Any]) -> bool:
         """Determine if the condition is temporal"""
         # Check for explicit temporal operators
@@ -536,7 +793,7 @@ class RefactoredTranspiler:
         
         return False
     
-    def _generate_basic_rml(self, sigma_rule: Dict[str, Any], expanded_condition: str, selections: List[str]) -> str:
+    def _generate_basic_rml(self, sigma_rule: Dict[str, Any], expanded_condition: str, selections: List[str], out: RMLEmitter):
         """Generate RML for basic (non-temporal) conditions"""
         logsource = sigma_rule.get('logsource', {})
         detection = sigma_rule.get('detection', {})
@@ -545,50 +802,70 @@ class RefactoredTranspiler:
         # Generate logsource filter
         logsource_line = self.rml_generator.generate_logsource_filter(logsource)
         
-        # Generate selection definitions
-        selection_lines = []
-        for selection_name in selections:
-            selection_data = detection[selection_name]
-            field_values, new_counter = self.field_extractor.extract_field_values(selection_data, self.variable_counter)
-            self.variable_counter = new_counter  # Update the global counter
-            
-            # Check if this selection is negated in the condition
-            # Use the original condition for negation detection, not the expanded/simplified one
-            is_negated = ConditionSimplifier._is_selection_negated(selection_name, original_condition)
-            
-            selection = Selection(
-                name=selection_name,
-                fields={fv.field_name: fv for fv in field_values},
-                negated=is_negated
+        # Replace the condition by its minimal equivalent when that is smaller and
+        # every selection keeps a single polarity (each has one event type)
+        with stage("minimize_condition"):
+            minimized = minimize_condition(
+                self.quantifier_expander.expand_quantifiers(original_condition, selections), selections
             )
-            
-            selection_lines.append(self.rml_generator.generate_selection_definition(selection))
+        formula = None
+        if minimized is not None and minimized.reduced and minimized.constant is None:
+            signs = polarities(minimized.formula)
+            if all(len(sign) == 1 for sign in signs.values()):
+                formula = minimized.formula
+                # Selections absorbed by the minimization need no event type
+                selections = [name for name in selections if name in signs]
+        
+        out.alias("Monitor", *(f"safe_{name}" for name in selections))
+        out.comment("log source filter")
+        out.line(logsource_line)
+        out.blank()
+        
+        # Generate selection definitions
+        out.comment("event types")
+        with stage("selection_generation"):
+            for selection_name in selections:
+                selection_data = detection[selection_name]
+                field_values, new_counter = self.field_extractor.extract_field_values(selection_data, self.variable_counter)
+                self.variable_counter = new_counter  # Update the global counter
+                
+                # Check if this selection is negated in the condition
+                # Use the original condition for negation detection, not the expanded/simplified one
+                if formula is not None:
+                    is_negated = True in signs[selection_name]
+                else:
+                    is_negated = ConditionSimplifier._is_selection_negated(selection_name, original_condition)
+                
+                selection = Selection(
+                    name=selection_name,
+                    fields={fv.field_name: fv for fv in field_values},
+                    negated=is_negated
+                )
+                
+                out.line(self.rml_generator.generate_selection_definition(selection))
+        out.blank()
         
         # Generate main expression
-        main_line = self.rml_generator.generate_main_expression()
+        out.comment("property section")
+        out.line(self.rml_generator.generate_main_expression())
         
         # Generate monitor expression using original condition for structure analysis
-        monitor_expression = self.rml_generator.generate_monitor_expression(original_condition, selections)
-        
-        # Split monitor expression into lines (it might contain definitions + monitor)
-        monitor_lines = monitor_expression.split('\n')
-        
-        # Assemble RML
-        rml_lines = [
-            "// log source filter",
-            logsource_line,
-            "",
-            "// event types",
-            *selection_lines,
-            "",
-            "// property section",
-            main_line,
-            *monitor_lines
-        ]
-        
-        return '\n'.join(rml_lines)
+        with stage("monitor_generation"):
+            if formula is not None:
+                out.line(self.rml_generator.generate_formula_monitor(formula))
+            else:
+                # The monitor, then the definitions it refers to
+                statements = self.rml_generator.monitor_statements(original_condition, selections)
+                out.alias(*(statement.split(" = ", 1)[0] for statement in statements[1:]))
+                for statement in statements:
+                    out.line(statement)
+            if minimized is not None and minimized.constant is not None:
+                out.comment(
+                    "condition is always true: every event is reported" if minimized.constant
+                    else "condition is always false: no event is reported"
+                )
     
-    def _generate_temporal_rml(self, sigma_rule: Dict[str, Any], condition: str) -> str:
+    def _generate_temporal_rml(self, sigma_rule: Dict[str, Any], condition: str, out: RMLEmitter):
         """Generate RML for temporal conditions"""
         logsource = sigma_rule.get('logsource', {})
         detection = sigma_rule.get('detection', {})
@@ -606,28 +883,56 @@ class RefactoredTranspiler:
         # Generate logsource filter
         logsource_line = self.rml_generator.generate_logsource_filter(logsource)
         
+        aggregation = parse_count(original_condition)
+        keyed_count = self._keyed_count(original_condition)
+        out.alias("Monitor", *(f"timed_{name}" for name in selections), "timed_other_events")
+        if aggregation is not None:
+            out.alias(*(f"safe_{name}" for name in selections))
+        out.comment("log source filter")
+        out.line(logsource_line)
+        out.blank()
+        
         # Generate timed event type definitions
-        event_lines = []
+        out.comment("event types")
         for selection_name in selections:
             selection_data = detection[selection_name]
             field_values, _ = self.field_extractor.extract_field_values(selection_data, 1)
             
+            # Keyed counts also bind the group key and the counted value
+            parameters = ["ts"]
+            bound_fields = {}
+            if keyed_count and selection_name == selections[0]:
+                for parameter, field, bound in (("key", aggregation.group_by, keyed_count[0]),
+                                                ("value", aggregation.field, keyed_count[1])):
+                    if bound:
+                        parameters.append(parameter)
+                        bound_fields[field.lower()] = parameter
+            
             # Create timed event definition
             field_pairs = []
             field_pairs.append("timestamp: ts")  # Always include timestamp
+            bound_constraints = []
             
             for field_value in field_values:
-                formatted_value = self.field_extractor.format_field_value(field_value)
-                field_pairs.append(formatted_value)
+                parameter = bound_fields.pop(field_value.field_name, None)
+                if parameter is None:
+                    field_pairs.append(self.field_extractor.format_field_value(field_value))
+                else:
+                    # A field the selection already constrains is bound once, its value checked by the guard
+                    field_pairs.append(f"{field_value.field_name}: {parameter}")
+                    bound_constraints.extend(self.rml_generator.bound_constraints(field_value, parameter))
+                    field_value.variable_name = None
+            field_pairs.extend(f"{field}: {parameter}" for field, parameter in bound_fields.items())
             
             field_str = f"{{{', '.join(field_pairs)}}}"
-            event_lines.append(f"timed_{selection_name}(ts) matches {field_str};")
+            guard = self._guard(field_values, bound_constraints)
+            out.line(f"timed_{selection_name}({', '.join(parameters)}) matches {field_str}{guard};")
         
         # Add other events handler
-        event_lines.append("timed_other_events(ts) matches {timestamp: ts};")
+        out.line("timed_other_events(ts) matches {timestamp: ts};")
         
         # For count operations, also add safe_selection definition
-        if '| count()' in original_condition:
+        if aggregation is not None:
             for selection_name in selections:
                 selection_data = detection[selection_name]
                 field_values, _ = self.field_extractor.extract_field_values(selection_data, 1)
@@ -640,34 +945,40 @@ class RefactoredTranspiler:
                 
                 if field_pairs:
                     field_str = f"{{{', '.join(field_pairs)}}}"
-                    event_lines.append(f"safe_{selection_name} not matches {field_str};")
+                    out.line(f"safe_{selection_name} not matches {field_str}{self._guard(field_values)};")
+        
+        out.blank()
         
         # Generate main expression with state parameters
-        if '| count()' in original_condition:
-            # For count operations, use <start_ts, count> state
-            main_line = "Main = logsource >> Monitor<0, 0>!;"
+        if keyed_count:
+            # <key, start, count> per slot, with the values seen for distinct counts
+            size = keyed_state_size(self._count_comparison(original_condition)[1], self.count_keys, *keyed_count)
+            state_params = ", ".join(["0"] * size)
+            main_line = f"Main = logsource >> Monitor<{state_params}>!;"
+        elif aggregation is not None:
+            # For count operations, use <start_ts, count> state, or <head, c1, ..., cB> for sliding windows
+            state_params = ", ".join(["0"] * (self.count_buckets + 1 if self.count_buckets else 2))
+            main_line = f"Main = logsource >> Monitor<{state_params}>!;"
         else:
             # For other temporal operations, use selection-based state
             state_params = ", ".join(["0"] * len(selections))
             main_line = f"Main = logsource >> Monitor<{state_params}>!;"
         
-        # Generate monitor expression using original condition for pattern detection
-        monitor_line = self._generate_temporal_monitor(original_condition, selections, timeframe_ms)
-        
-        # Assemble RML
-        rml_lines = [
-            "// log source filter",
-            logsource_line,
-            "",
-            "// event types",
-            *event_lines,
-            "",
-            "// property section",
-            main_line,
-            monitor_line
-        ]
+        out.comment("property section")
+        if keyed_count and aggregation.field and not keyed_count[1]:
+            out.comment(
+                f"warning: count({aggregation.field}) limit is above {self.count_max_distinct} distinct values, "
+                f"every matching event is counted"
+            )
+        out.line(main_line)
         
-        return '\n'.join(rml_lines)
+        # Generate monitor expression using original condition for pattern detection
+        self._generate_temporal_monitor(original_condition, selections, timeframe_ms, out)
+    
+    def _guard(self, field_values: List[FieldValue], extra: List[str] = ()) -> str:
+        """' with ...' clause for merged bounds and compressed list values, then extra, or an empty string"""
+        constraints = self.rml_generator.field_constraints(field_values) + list(extra)
+        return f" with {' and '.join(constraints)}" if constraints else ""
     
     def _convert_timeframe_to_ms(self, timeframe: str) -> int:
         """Convert timeframe string to milliseconds"""
@@ -700,49 +1011,37 @@ class RefactoredTranspiler:
             except ValueError:
                 return 10000  # Default 10 seconds
     
-    def _generate_temporal_monitor(self, condition: str, selections: List[str], timeframe_ms: int) -> str:
+    def _generate_temporal_monitor(self, condition: str, selections: List[str], timeframe_ms: int, out: RMLEmitter):
         """Generate temporal monitor expression"""
         # Handle count operations first
-        if '| count()' in condition:
-            return self._generate_count_monitor(condition, selections[0], timeframe_ms)
+        if parse_count(condition) is not None:
+            out.line(self._generate_count_monitor(condition, selections[0], timeframe_ms))
         
         # Handle near operations
-        if '| near' in condition:
-            return self._generate_near_monitor(selections, timeframe_ms)
+        elif '| near' in condition:
+            out.line(self._generate_near_monitor(selections, timeframe_ms))
         
         # Handle general temporal conditions (with timeframe)
-        return self._generate_general_temporal_monitor(condition, selections, timeframe_ms)
+        else:
+            self._emit_general_temporal_monitor(condition, selections, timeframe_ms, out)
     
     def _generate_count_monitor(self, condition: str, selection: str, timeframe_ms: int) -> str:
         """Generate monitor for count operations"""
-        # Parse the count condition to extract operator and threshold
-        import re
-        
-        # Extract count condition: selection | count() > 100, selection | count() <= 50, etc.
-        count_pattern = r'count\(\)\s*([<>=]+)\s*(\d+)'
-        count_match = re.search(count_pattern, condition)
-        
-        if count_match:
-            operator = count_match.group(1)
-            threshold = int(count_match.group(2))
-            
-            # Adjust threshold based on operator for count+1 comparison
-            if operator in ['>', '>=']:
-                # For count() > 100, we check count+1 > 100
-                # For count() >= 100, we check count+1 > 99
-                adjusted_threshold = threshold if operator == '>' else threshold - 1
-                comparison = f"count+1 > {adjusted_threshold}"
-            elif operator in ['<', '<=']:
-                # For count() < 100, we check count+1 < 100
-                # For count() <= 100, we check count+1 < 101
-                adjusted_threshold = threshold if operator == '<' else threshold + 1
-                comparison = f"count+1 < {adjusted_threshold}"
-            else:
-                # Fallback for unknown operators
-                comparison = f"count+1 > {threshold}"
-        else:
-            # Default fallback if pattern not found
-            comparison = "count+1 > 4"
+        operator, limit = self._count_comparison(condition)
+        keyed_count = self._keyed_count(condition)
+        if keyed_count:
+            keyed, distinct = keyed_count
+            hit = f"timed_{selection}({', '.join(['ts'] + (['key'] if keyed else []) + (['value'] if distinct else []))})"
+            return keyed_count_monitor(
+                "Monitor", hit, "timed_other_events(ts)", f"safe_{selection}", operator, limit, timeframe_ms,
+                self.count_keys, keyed, distinct
+            )
+        if self.count_buckets:
+            return sliding_count_monitor(
+                "Monitor", f"timed_{selection}(ts)", "timed_other_events(ts)", f"safe_{selection}", operator, str(limit),
+                str(bucket_width(timeframe_ms, self.count_buckets)), self.count_buckets
+            )
+        comparison = f"count+1 {operator} {limit}"
         
         return f"""Monitor<start_ts, count> =
     {{let ts; timed_{selection}(ts)
@@ -763,6 +1062,43 @@ class RefactoredTranspiler:
         )
     }};"""
     
+    def _keyed_count(self, condition: str) -> Optional[Tuple[bool, bool]]:
+        """(by a field, distinct values) for a keyed count() condition, None for a plain count() or no count
+
+        Distinct counts need limit values per key; above count_max_distinct every event is counted instead.
+        """
+        aggregation = parse_count(condition)
+        if aggregation is None or not aggregation.keyed:
+            return None
+        distinct = aggregation.field is not None and self._count_comparison(condition)[1] <= self.count_max_distinct
+        return aggregation.group_by is not None, distinct
+    
+    def _count_comparison(self, condition: str) -> Tuple[str, int]:
+        """Operator and limit that count+1 is compared with for a count() condition"""
+        # Extract count condition: selection | count() > 100, selection | count(field) by host <= 50, etc.
+        count_pattern = r'count\s*\([^)]*\)(?:\s+by\s+\w+)?\s*([<>=]+)\s*(\d+)'
+        count_match = re.search(count_pattern, condition)
+        
+        if count_match:
+            operator = count_match.group(1)
+            threshold = int(count_match.group(2))
+            
+            # Adjust threshold based on operator for count+1 comparison
+            if operator in ['>', '>=']:
+                # For count() > 100, we check count+1 > 100
+                # For count() >= 100, we check count+1 > 99
+                return '>', threshold if operator == '>' else threshold - 1
+            elif operator in ['<', '<=']:
+                # For count() < 100, we check count+1 < 100
+                # For count() <= 100, we check count+1 < 101
+                return '<', threshold if operator == '<' else threshold + 1
+            else:
+                # Fallback for unknown operators
+                return '>', threshold
+        
+        # Default fallback if pattern not found
+        return '>', 4
+    
     def _generate_near_monitor(self, selections: List[str], timeframe_ms: int) -> str:
         """Generate monitor for near operations"""
         if len(selections) != 2:
@@ -803,22 +1139,16 @@ class RefactoredTranspiler:
     
     def _generate_general_temporal_monitor(self, condition: str, selections: List[str], timeframe_ms: int) -> str:
         """Generate monitor for general temporal conditions"""
+        return render(lambda out: self._emit_general_temporal_monitor(condition, selections, timeframe_ms, out))
+    
+    def _emit_general_temporal_monitor(self, condition: str, selections: List[str], timeframe_ms: int, out: RMLEmitter):
+        """Write the monitor for general temporal conditions, one case at a time"""
         if len(selections) == 0:
-            return "Monitor = empty;"
+            out.line("Monitor = empty;")
+            return
         
         # Create state parameters
         state_vars = ", ".join([f"s{i+1}" for i in range(len(selections))])
-        initial_states = ", ".join(["0"] * len(selections))
-        
-        # Generate monitor cases for each selection
-        monitor_cases = []
-        for i, selection in enumerate(selections):
-            case = self._generate_selection_case(selection, i, selections, timeframe_ms)
-            monitor_cases.append(case)
-        
-        # Add other events case
-        other_events_case = self._generate_other_events_case(selections, timeframe_ms)
-        monitor_cases.append(other_events_case)
         
         # Determine operator based on condition logic
         # If condition contains 'and', use AND (/\)
@@ -831,11 +1161,14 @@ class RefactoredTranspiler:
             # Default to AND for single conditions
             operator = "/\\"
         
-        # Join all cases with appropriate operator
-        monitor_body = f"\n{operator}\n".join(monitor_cases)
-        
-        return f"""Monitor<start_ts, {state_vars}> = 
-{monitor_body};"""
+        # One case per selection, then the other events case, joined with the operator
+        with out.statement():
+            out.write(f"Monitor<start_ts, {state_vars}> = \n")
+            for i, selection in enumerate(selections):
+                out.write(self._generate_selection_case(selection, i, selections, timeframe_ms))
+                out.write(f"\n{operator}\n")
+            out.write(self._generate_other_events_case(selections, timeframe_ms))
+            out.write(";")
     
     def _generate_selection_case(self, selection: str, index: int, all_selections: List[str], timeframe_ms: int) -> str:
         """Generate monitor case for a specific selection"""
@@ -0,0 +1,101 @@
+"""
+Compression of list values in generated event types.
+
+A Sigma list value becomes an alternation in the event type pattern, which
+the runtime tests one alternative at a time. Before formatting, values are
+deduplicated and sorted; runs of consecutive integers are collapsed into
+range checks on a bound variable ({eventid: x1} with x1 >= 4728 and
+x1 <= 4758), so a rule listing a thousand event IDs costs a handful of
+comparisons instead of a thousand. RML has no set literal, so large sets
+that cannot be collapsed stay an alternation, written without the padding
+around each separator.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, List, Tuple
+
+# Shortest run of consecutive integers worth a range check; shorter runs read
+# better as literals and cost about as much to match
+RANGE_MIN_RUN = 8
+
+# Alternations with more values than this are written without spaces around "|"
+COMPACT_SET_SIZE = 64
+
+@dataclass
+class ValueSet:
+    """Deduplicated, sorted list values: inclusive integer ranges plus the remaining literals"""
+    literals: List[Any] = field(default_factory=list)
+    ranges: List[Tuple[int, int]] = field(default_factory=list)
+
+    def values(self) -> List[Any]:
+        """Every value, ranges expanded, in sorted order"""
+        if not self.ranges:
+            return list(self.literals)
+        expanded = list(self.literals)
+        for low, high in self.ranges:
+            expanded.extend(range(low, high + 1))
+        return sorted(expanded, key=_sort_key)
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _sort_key(value):
+    # Numbers first, then strings, then anything else; 4624 and '4624' are different values
+    if _is_int(value) or isinstance(value, float):
+        return (0, value, "")
+    if isinstance(value, str):
+        return (1, 0, value)
+    return (2, 0, repr(value))
+
+def compress_values(values: List[Any], min_run: int = RANGE_MIN_RUN) -> ValueSet:
+    """
+    Deduplicate and sort values, collapsing runs of at least min_run consecutive integers.
+
+    Lists too short to hold a run keep their order, so hand-written rules read as written.
+    """
+    unique = {}
+    for value in values:
+        try:
+            unique.setdefault((type(value), value), value)
+        except TypeError:
+            unique.setdefault((type(value), repr(value)), value)
+    if len(unique) < min_run:
+        return ValueSet(literals=list(unique.values()))
+    ordered = sorted(unique.values(), key=_sort_key)
+
+    value_set = ValueSet()
+    integers = [value for value in ordered if _is_int(value)]
+    value_set.literals = [value for value in ordered if not _is_int(value)]
+
+    run_start = 0
+    for i in range(1, len(integers) + 1):
+        if i < len(integers) and integers[i] == integers[i - 1] + 1:
+            continue
+        run = integers[run_start:i]
+        if len(run) >= min_run:
+            value_set.ranges.append((run[0], run[-1]))
+        else:
+            value_set.literals.extend(run)
+        run_start = i
+    value_set.literals.sort(key=_sort_key)
+    return value_set
+
+def format_literal(value) -> str:
+    return f"'{value}'" if isinstance(value, str) else str(value)
+
+def format_alternation(values: List[Any]) -> str:
+    """values as an event type alternation: 4624 | 4625 | 'text'"""
+    separator = "|" if len(values) > COMPACT_SET_SIZE else " | "
+    return separator.join(format_literal(value) for value in values)
+
+def membership_guard(variable: str, value_set: ValueSet, and_op: str = "and", or_op: str = "or") -> str:
+    """Guard testing variable against the ranges, then the literals, of value_set"""
+    checks = [
+        f"{variable} >= {low} {and_op} {variable} <= {high}"
+        for low, high in value_set.ranges
+    ]
+    checks.extend(f"{variable} == {format_literal(value)}" for value in value_set.literals)
+    if len(checks) == 1:
+        return checks[0]
+    wrapped = [f"({check})" if f" {and_op} " in check else check for check in checks]
+    return f"({f' {or_op} '.join(wrapped)})"
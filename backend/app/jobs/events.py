@@ -0,0 +1,162 @@
+"""
+Progress events for translation jobs.
+
+Workers publish one event per finished file to the subscribers of its job.
+Every subscriber has a bounded queue: a worker waits briefly for a slow
+consumer (backpressure) and then drops the event and marks the subscription
+as lagging instead of buffering without limit. A lagging stream catches up
+from the job queue, which is the source of truth, so no completion is lost.
+
+Streams are async generators woken with call_soon_threadsafe, so an open
+stream holds no thread of the server's threadpool while it waits.
+"""
+
+import asyncio
+import json
+import queue
+import threading
+import anyio
+from app import config
+from app.jobs.queue import FINISHED
+
+class Subscription:
+    """Bounded event queue of one stream, read from the event loop that subscribed"""
+
+    def __init__(self, job_id, maxsize):
+        self.job_id = job_id
+        self.events = queue.Queue(maxsize=maxsize)
+        self.lagging = threading.Event()
+        self.loop = asyncio.get_running_loop()
+        self.ready = asyncio.Event()
+
+    def notify(self):
+        """Wake the stream, from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            # The loop is closed: the stream is gone
+            pass
+
+    def get_nowait(self):
+        try:
+            return self.events.get_nowait()
+        except queue.Empty:
+            return None
+
+    async def get(self, timeout):
+        """Next event, or None when nothing arrived within timeout or the stream lagged behind"""
+        # Cleared before looking, so an event put after the look sets it again
+        self.ready.clear()
+        event = self.get_nowait()
+        if event is not None or self.lagging.is_set():
+            return event
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.get_nowait()
+
+class EventBroker:
+    """Fan-out of job events to the streams subscribed in this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.dropped = 0
+
+    def subscribe(self, job_id, maxsize=None):
+        """Subscribe a stream running in the current event loop"""
+        subscription = Subscription(job_id, maxsize or config.JOB_EVENTS_QUEUE_SIZE)
+        with self.lock:
+            self.subscriptions.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.job_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.job_id]
+
+    def publish(self, job_id, event):
+        """Deliver event to every stream of job_id, waiting at most JOB_EVENTS_PUT_TIMEOUT_S per slow stream"""
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(job_id, ()))
+        for subscription in subscriptions:
+            if subscription.lagging.is_set():
+                continue
+            try:
+                subscription.events.put(event, timeout=config.JOB_EVENTS_PUT_TIMEOUT_S)
+            except queue.Full:
+                subscription.lagging.set()
+                with self.lock:
+                    self.dropped += 1
+            subscription.notify()
+
+job_events = EventBroker()
+
+def format_event(event, data):
+    """Serialize one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def job_event_stream(job_queue, job_id, broker=job_events, keepalive=None, request=None):
+    """
+    Yield server-sent events for a job: one `item` event per finished file and
+    a final `done` event with the job summary.
+
+    Live events come from the broker; the job queue is read (in a worker
+    thread) at start, when the stream lagged behind, and on every keepalive,
+    which also picks up files finished by other worker processes. With a
+    request, the stream stops as soon as its client has disconnected.
+    """
+    keepalive = keepalive or config.JOB_EVENTS_KEEPALIVE_S
+    subscription = broker.subscribe(job_id)
+    emitted = set()
+    state = {"total": 0, "finished": False}
+
+    def item_event(item):
+        emitted.add(item["id"])
+        return format_event("item", dict(item, completed=len(emitted), total=state["total"]))
+
+    def reconcile():
+        job = job_queue.get(job_id)
+        state["total"] = job["total"]
+        events = [item_event(item) for item in job["items"]
+                  if item["status"] in FINISHED and item["id"] not in emitted]
+        if job["status"] in FINISHED:
+            summary = {k: job[k] for k in ("job_id", "status", "total", "counts")}
+            events.append(format_event("done", summary))
+            state["finished"] = True
+        return "".join(events)
+
+    async def caught_up():
+        return await anyio.to_thread.run_sync(reconcile)
+
+    try:
+        chunk = await caught_up()
+        while True:
+            if chunk:
+                yield chunk
+            if state["finished"] or (request is not None and await request.is_disconnected()):
+                break
+            event = await subscription.get(keepalive)
+            if subscription.lagging.is_set():
+                # Drop what is buffered and catch up from the queue once
+                while subscription.get_nowait() is not None:
+                    pass
+                subscription.lagging.clear()
+                chunk = await caught_up()
+            elif event is None:
+                chunk = ": keepalive\n\n" + await caught_up()
+            elif event.get("id") is None:
+                # Job-level notification (e.g. cancellation)
+                chunk = await caught_up()
+            elif event["id"] not in emitted:
+                chunk = item_event(event)
+                if len(emitted) >= state["total"]:
+                    chunk += await caught_up()
+            else:
+                chunk = ""
+    finally:
+        broker.unsubscribe(subscription)
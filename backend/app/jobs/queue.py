@@ -0,0 +1,255 @@
+"""
+Persistent translation job queue backed by SQLite.
+
+A job covers one or more registered files; each file is a separate item so
+the worker pool can translate the files of one job in parallel. Items are
+claimed inside BEGIN IMMEDIATE transactions, so several worker processes
+can share one queue file. Items left running by a process that died are
+put back in the queue by requeue_orphans().
+
+PIDs are reused, notably after a container restart where the app is PID 1
+again, so a claimed item records a token generated once per process
+alongside owner_pid, and every process using the queue registers its own
+(pid, token). An item whose token is not the one registered for its PID
+was left by an earlier process and is orphaned.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+_token = {"pid": None, "value": None}
+
+def _boot_token():
+    """Token identifying this process, regenerated after a fork"""
+    if _token["pid"] != os.getpid():
+        _token["pid"], _token["value"] = os.getpid(), uuid.uuid4().hex
+    return _token["value"]
+
+def _pid_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobQueue:
+    """Jobs and their per-file items, stored in one SQLite database (WAL mode)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        # Last known number of queued items, kept current by this process's
+        # writes so readiness checks never have to query the database
+        self.queued = 0
+        self._init_schema()
+        self.queued = self.pending()
+
+    def _connect(self):
+        """One connection per thread and per process"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _write_transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _init_schema(self):
+        with self._write_transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, "
+                "created_at REAL NOT NULL, "
+                "cancel_requested INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_items ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "job_id TEXT NOT NULL REFERENCES jobs(id), "
+                "filename TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "owner_pid INTEGER, "
+                "owner_token TEXT, "
+                "result TEXT, "
+                "error TEXT, "
+                "started_at REAL, "
+                "finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS job_items_status ON job_items(status, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS job_items_job ON job_items(job_id)")
+            # Queues created before owner tokens were recorded
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(job_items)")}
+            if "owner_token" not in columns:
+                conn.execute("ALTER TABLE job_items ADD COLUMN owner_token TEXT")
+            conn.execute("CREATE TABLE IF NOT EXISTS owners (pid INTEGER PRIMARY KEY, token TEXT NOT NULL)")
+
+    def submit(self, filenames):
+        """Queue a job translating `filenames`; returns the job id"""
+        job_id = uuid.uuid4().hex
+        with self._write_transaction() as conn:
+            conn.execute("INSERT INTO jobs (id, created_at) VALUES (?, ?)", (job_id, time.time()))
+            conn.executemany(
+                "INSERT INTO job_items (job_id, filename, status) VALUES (?, ?, ?)",
+                [(job_id, filename, QUEUED) for filename in filenames]
+            )
+            self.queued = _count_queued(conn)
+        return job_id
+
+    def claim(self):
+        """Take the oldest queued item for this process, or None when the queue is empty"""
+        with self._write_transaction() as conn:
+            row = conn.execute(
+                "SELECT id, job_id, filename FROM job_items WHERE status = ? ORDER BY id LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                self.queued = 0
+                return None
+            _register(conn)
+            conn.execute(
+                "UPDATE job_items SET status = ?, owner_pid = ?, owner_token = ?, started_at = ? WHERE id = ?",
+                (RUNNING, os.getpid(), _boot_token(), time.time(), row["id"])
+            )
+        # Counting on every claim would cost O(queued); submissions recount
+        self.queued = max(0, self.queued - 1)
+        return {"id": row["id"], "job_id": row["job_id"], "filename": row["filename"]}
+
+    def finish(self, item_id, status, result=None, error=None):
+        """Record the outcome of a claimed item; returns its public view"""
+        with self._write_transaction() as conn:
+            conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), item_id)
+            )
+            row = conn.execute("SELECT * FROM job_items WHERE id = ?", (item_id,)).fetchone()
+        return _item(row)
+
+    def cancel(self, job_id):
+        """Cancel the job's queued items; items already running are left to finish"""
+        with self._write_transaction() as conn:
+            if not conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone():
+                return False
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            conn.execute(
+                "UPDATE job_items SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED)
+            )
+            self.queued = _count_queued(conn)
+        return True
+
+    def requeue_orphans(self):
+        """Put back items whose worker process is gone; returns how many"""
+        with self._write_transaction() as conn:
+            # Registering first takes this PID over from any earlier process that had it
+            _register(conn)
+            owners = {row["pid"]: row["token"] for row in conn.execute("SELECT pid, token FROM owners")}
+            rows = conn.execute(
+                "SELECT id, owner_pid, owner_token FROM job_items WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            orphans = [
+                row["id"] for row in rows
+                if owners.get(row["owner_pid"]) != row["owner_token"] or not _pid_alive(row["owner_pid"])
+            ]
+            conn.executemany(
+                "UPDATE job_items SET status = ?, owner_pid = NULL, owner_token = NULL, started_at = NULL WHERE id = ?",
+                [(QUEUED, item_id) for item_id in orphans]
+            )
+            self.queued = _count_queued(conn)
+        return len(orphans)
+
+    def active_filenames(self):
+        """Filenames queued or being translated right now"""
+        rows = self._connect().execute(
+            "SELECT DISTINCT filename FROM job_items WHERE status IN (?, ?)", (QUEUED, RUNNING)
+        ).fetchall()
+        return {row["filename"] for row in rows}
+
+    def pending(self):
+        """Number of items waiting for a worker"""
+        self.queued = _count_queued(self._connect())
+        return self.queued
+
+    def get(self, job_id):
+        """Return the job with its items and an overall status, or None"""
+        conn = self._connect()
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        rows = conn.execute(
+            "SELECT * FROM job_items WHERE job_id = ? ORDER BY id", (job_id,)
+        ).fetchall()
+
+        items = []
+        counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED}
+        for row in rows:
+            counts[row["status"]] += 1
+            items.append(_item(row))
+
+        return {
+            "job_id": job["id"],
+            "status": _job_status(counts, bool(job["cancel_requested"])),
+            "created_at": job["created_at"],
+            "total": len(items),
+            "counts": counts,
+            "items": items,
+        }
+
+def _register(conn):
+    """Record this process's token as the owner of its PID"""
+    conn.execute("INSERT OR REPLACE INTO owners (pid, token) VALUES (?, ?)", (os.getpid(), _boot_token()))
+
+def _count_queued(conn):
+    return conn.execute("SELECT COUNT(*) FROM job_items WHERE status = ?", (QUEUED,)).fetchone()[0]
+
+def _item(row):
+    """Public view of a job item row"""
+    item = {"id": row["id"], "filename": row["filename"], "status": row["status"]}
+    if row["started_at"] and row["finished_at"]:
+        item["duration_ms"] = round((row["finished_at"] - row["started_at"]) * 1000, 3)
+    if row["result"]:
+        result = json.loads(row["result"])
+        item["rml_path"] = result.get("rml_path")
+        item["rml_sha256"] = result.get("rml_sha256")
+    if row["error"]:
+        item["error"] = row["error"]
+    return item
+
+def _job_status(counts, cancel_requested):
+    """Overall status of a job from its item counts"""
+    if counts[RUNNING]:
+        return RUNNING
+    if counts[QUEUED]:
+        return RUNNING if counts[SUCCEEDED] or counts[FAILED] else QUEUED
+    if cancel_requested:
+        return CANCELLED
+    return FAILED if counts[FAILED] else SUCCEEDED
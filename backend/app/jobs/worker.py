@@ -0,0 +1,157 @@
+"""
+Worker pool that drains the translation job queue.
+
+Each worker thread claims one item at a time and translates it with its own
+RefactoredTranspiler, so throughput is bounded by the pool size and not by
+how many requests clients keep open. Workers sleep on a condition and are
+woken on submission; they also poll the queue so jobs submitted by other
+processes sharing the queue file are picked up.
+"""
+
+import os
+import threading
+from app import config
+from app.core.translation import get_transpiler, stale_filenames, translate_file
+from app.jobs.events import job_events
+from app.jobs.queue import JobQueue, SUCCEEDED, FAILED
+
+class JobRunner:
+    """Fixed-size pool of worker threads bound to one JobQueue"""
+
+    def __init__(self, queue: JobQueue, workers: int):
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.stopping = False
+        self.active = 0
+        # True from a startup warmup until the queue is seen empty
+        self.warming = False
+
+    def start(self):
+        """Requeue items orphaned by a previous process and start the workers"""
+        with self.lock:
+            if self.threads:
+                return
+            self.stopping = False
+            self.queue.requeue_orphans()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"translate-worker-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Let running items finish and stop the workers"""
+        with self.lock:
+            self.stopping = True
+            self.wakeup.notify_all()
+            threads, self.threads = self.threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def notify(self):
+        """Wake the workers after a submission"""
+        with self.lock:
+            self.wakeup.notify_all()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if self.stopping:
+                    return
+
+            item = None
+            try:
+                item = self.queue.claim()
+            except Exception as e:
+                print(f"Job queue claim failed: {str(e)}")
+
+            if item is None:
+                with self.lock:
+                    # Items submitted since this claim keep the warmup going
+                    if not self.queue.queued:
+                        self.warming = False
+                    if not self.stopping:
+                        self.wakeup.wait(config.JOB_POLL_INTERVAL_S)
+                continue
+
+            with self.lock:
+                self.active += 1
+            try:
+                self._process(item)
+            finally:
+                with self.lock:
+                    self.active -= 1
+
+    def snapshot(self) -> dict:
+        """Pool and queue state from memory, for readiness checks"""
+        with self.lock:
+            return {
+                "size": self.workers,
+                "busy": self.active,
+                "alive": sum(1 for thread in self.threads if thread.is_alive()),
+                "queued": self.queue.queued,
+                "warming": self.warming,
+            }
+
+    def _process(self, item):
+        try:
+            result = translate_file(item["filename"], get_transpiler())
+        except (FileNotFoundError, ValueError, RuntimeError) as e:
+            finished = self.queue.finish(item["id"], FAILED, error=str(e))
+        except Exception as e:
+            print(f"Error translating {item['filename']}: {str(e)}")
+            finished = self.queue.finish(item["id"], FAILED, error=f"Translation failed: {str(e)}")
+        else:
+            result.pop("rml_text", None)
+            finished = self.queue.finish(item["id"], SUCCEEDED, result=result)
+
+        # May wait briefly for slow event streams, see app.jobs.events
+        job_events.publish(item["job_id"], finished)
+
+_runners = {}
+_runners_lock = threading.Lock()
+
+def get_runner() -> JobRunner:
+    """Return the started runner for the configured queue file (relative to the working directory)"""
+    path = os.path.abspath(config.JOBS_DB_PATH)
+    with _runners_lock:
+        runner = _runners.get(path)
+        if runner is None:
+            runner = _runners[path] = JobRunner(JobQueue(path), config.JOB_WORKERS)
+    runner.start()
+    return runner
+
+def current_runner():
+    """The runner for the configured queue file if one was started, without starting it"""
+    with _runners_lock:
+        return _runners.get(os.path.abspath(config.JOBS_DB_PATH))
+
+def stop_runners(timeout=None):
+    """Stop every runner, used on application shutdown"""
+    with _runners_lock:
+        runners = list(_runners.values())
+    for runner in runners:
+        runner.stop(timeout)
+
+def submit_job(filenames) -> str:
+    """Queue a translation job for filenames and wake the workers; returns the job id"""
+    runner = get_runner()
+    job_id = runner.queue.submit(filenames)
+    runner.notify()
+    return job_id
+
+def warmup():
+    """Queue every record whose RML is missing or stale; returns the job id, or None if all are fresh"""
+    runner = get_runner()
+    # Other workers may be warming up the same registry
+    active = runner.queue.active_filenames()
+    filenames = [name for name in stale_filenames() if name not in active]
+    if not filenames:
+        return None
+    print(f"Warmup: translating {len(filenames)} missing or stale records")
+    job_id = submit_job(filenames)
+    with runner.lock:
+        runner.warming = True
+    return job_id
@@ -1,15 +1,77 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from app.api import upload, transpile, files, translate
+from fastapi.responses import JSONResponse, Response
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from app.api import upload, transpile, files, translate, admin
+from app import config
+from app.core import metrics
+from app.jobs.worker import current_runner, get_runner, stop_runners, warmup
+from app.storage.layout import UPLOAD_DIR, TRANSLATED_DIR
+from app.utils.admission import admission_stats
+from app.storage.db import registry_latency
+from app.utils.file_responses import TEXT_CACHE_SIZE, text_cache_stats
+from app.utils.memory import start_tracing
+import gc
 import os
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.TRACEMALLOC_FRAMES > 0:
+        start_tracing(config.TRACEMALLOC_FRAMES)
+    # Resume translation jobs left behind by a previous run
+    get_runner()
+    if config.WARMUP_ON_STARTUP:
+        warmup()
+    yield
+    stop_runners(timeout=5)
+
+# One rule per transpiler code path (plain, numeric modifiers, quantifiers, temporal)
+_WARMUP_RULES = (
+    {"logsource": {"product": "windows"},
+     "detection": {"selection": {"EventID": 4624, "Image|endswith": "\\cmd.exe"},
+                   "filter": {"LogonType|gte": 3, "User": ["SYSTEM", "LOCAL SERVICE"]},
+                   "condition": "selection and not filter"}},
+    {"detection": {"selection_a": {"EventID": 1}, "selection_b": {"EventID": 2},
+                   "condition": "1 of selection_* or not (selection_a and selection_b)"}},
+    {"detection": {"selection1": {"EventID": 4625}, "selection2": {"EventID": 4624},
+                   "timeframe": "30s", "condition": "selection1 | near selection2"}},
+    {"detection": {"selection": {"EventID": 4625}, "timeframe": "5m", "condition": "selection | count() > 5"}},
+)
+
+def prefork_warmup():
+    """
+    Pre-fork hook for servers that import the app once and fork workers
+    (gunicorn --preload). Imports the modules the app loads on first use,
+    runs the transpiler over each code path, then moves everything into
+    the permanent GC generation so the garbage collector never writes to
+    these pages and the forked workers keep sharing them copy-on-write.
+
+    Opens no files, connections or threads, which must not cross a fork.
+    """
+    import yaml
+    from app.core.translation import get_transpiler
+
+    # Warmup rules are not traffic
+    metrics_enabled, metrics.enabled = metrics.enabled, False
+    try:
+        transpiler = get_transpiler()
+        yaml.safe_load("warmup: [1, 'a', {b: 2.5}]")
+        for rule in _WARMUP_RULES:
+            transpiler.transpile(rule)
+    finally:
+        metrics.enabled = metrics_enabled
+
+    gc.collect()
+    gc.freeze()
+
 app = FastAPI(
     title="Sigma to RML Transpiler API",
     description="API for converting Sigma security rules to Runtime Monitoring Language (RML)",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -21,11 +83,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route, exposed at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(upload.router, prefix="/upload", tags=["Upload"])
 app.include_router(transpile.router, prefix="/transpile", tags=["Transpile"])
 app.include_router(files.file_router, prefix="/files", tags=["File Management"])
 app.include_router(translate.router, prefix="/translate", tags=["Translate"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 @app.get("/")
 def root():
@@ -39,6 +105,8 @@ def root():
             "transpile": "/transpile", 
             "files": "/files",
             "translate": "/translate",
+            "metrics": "/metrics",
+            "ready": "/ready",
             "docs": "/docs"
         }
     }
@@ -48,7 +116,7 @@ def health_check():
     """Health check endpoint"""
     try:
         # Check if required directories exist
-        required_dirs = ["uploaded_files", "translated_files"]
+        required_dirs = [UPLOAD_DIR, TRANSLATED_DIR]
         dir_status = {}
         
         for dir_name in required_dirs:
@@ -64,7 +132,7 @@ def health_check():
             "status": "healthy",
             "directories": dir_status,
             "database": db_status,
-            "timestamp": "2024-01-01T00:00:00Z"  # You can add actual timestamp here
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
         }
     except Exception as e:
         return JSONResponse(
@@ -72,6 +140,67 @@ def health_check():
             content={"status": "unhealthy", "error": str(e)}
         )
 
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness for load balancers: answers 503 while this worker is saturated,
+    its translation workers are down or its startup warmup is still running.
+    Built from in-memory counters only, no filesystem or database access.
+    """
+    reasons = []
+
+    admission = admission_stats()
+    handlers = {}
+    for name, stats in admission.items():
+        handlers[name] = {
+            "active": stats["active"],
+            "limit": stats["limit"],
+            "queue_depth": stats["queue_depth"],
+            "queue_size": stats["queue_size"],
+            "utilization": round(stats["active"] / stats["limit"], 3),
+        }
+        threshold = max(1, stats["queue_size"] * config.READY_QUEUE_THRESHOLD)
+        if stats["active"] >= stats["limit"] and stats["queue_depth"] >= threshold:
+            reasons.append(f"{name} saturated")
+
+    runner = current_runner()
+    if runner is None:
+        translate_pool = None
+        reasons.append("translation workers not started")
+    else:
+        translate_pool = runner.snapshot()
+        translate_pool["utilization"] = round(translate_pool["busy"] / translate_pool["size"], 3)
+        if translate_pool["alive"] < translate_pool["size"]:
+            reasons.append("translation workers down")
+        if translate_pool.pop("warming"):
+            reasons.append("warming up")
+
+    cache = text_cache_stats()
+    lookups = cache["hits"] + cache["misses"]
+    transpile_p95 = metrics.recent_transpile_seconds.percentile(0.95)
+
+    body = {
+        "ready": not reasons,
+        "reasons": reasons,
+        "workers": {"admission": handlers, "translate": translate_pool},
+        "queue": {
+            "admission_waiting": sum(stats["queue_depth"] for stats in admission.values()),
+            "translation_pending": translate_pool["queued"] if translate_pool else None,
+        },
+        "cache": {
+            "hit_ratio": round(cache["hits"] / lookups, 3) if lookups else None,
+            "size": cache["size"],
+            "capacity": TEXT_CACHE_SIZE,
+            "warm": "warming up" not in reasons,
+        },
+        "registry": {"backend": config.REGISTRY_BACKEND, "latency_ms": registry_latency()},
+        "transpile": {
+            "p95_ms": round(transpile_p95 * 1000, 3) if transpile_p95 is not None else None,
+            "samples": len(metrics.recent_transpile_seconds),
+        },
+    }
+    return JSONResponse(status_code=200 if not reasons else 503, content=body)
+
 @app.get("/stats")
 def get_stats():
     """Get API usage statistics"""
@@ -93,11 +222,39 @@ def get_stats():
             "translated_files": translated_files,
             "pending_files": total_files - translated_files,
             "file_types": file_types,
-            "translation_rate": round((translated_files / total_files * 100) if total_files > 0 else 0, 2)
+            "translation_rate": round((translated_files / total_files * 100) if total_files > 0 else 0, 2),
+            "transpile_coalescing": transpile.transpile_flight.snapshot(),
+            "admission": admission_stats()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
+@metrics.registry.add_collector
+def collect_runtime_metrics():
+    """Cache, coalescing and admission numbers, read at scrape time"""
+    cache = text_cache_stats()
+    flight = transpile.transpile_flight.snapshot()
+    admission = admission_stats()
+    return [
+        ("sigma2rml_output_cache_requests_total", "counter", "RML output cache lookups, by result",
+         [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])]),
+        ("sigma2rml_transpile_coalesced_total", "counter", "Transpile requests served by another request's computation",
+         [({}, flight["coalesced"])]),
+        ("sigma2rml_admission_queue_depth", "gauge", "Requests waiting for admission",
+         [({"handler": name}, stats["queue_depth"]) for name, stats in admission.items()]),
+        ("sigma2rml_admission_active", "gauge", "Requests currently admitted",
+         [({"handler": name}, stats["active"]) for name, stats in admission.items()]),
+        ("sigma2rml_admission_rejected_total", "counter", "Requests shed with 503 (queue full or timed out)",
+         [({"handler": name}, stats["rejected"] + stats["timed_out"]) for name, stats in admission.items()]),
+        ("sigma2rml_admission_wait_seconds_total", "counter", "Total time admitted requests spent queued",
+         [({"handler": name}, stats["wait_seconds_total"]) for name, stats in admission.items()]),
+    ]
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics in text exposition format"""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -1,65 +1,320 @@
+import atexit
+import functools
 import json
 import os
+import tempfile
+import threading
+import time
+from app import config
 
 DB_PATH = "file_registry.json"
 
+class WriteBehindRegistry:
+    """
+    In-memory copy of the JSON registry with group-commit persistence.
+
+    Mutations are applied in memory and acknowledged immediately. A background
+    thread writes the whole registry once per batch (temp file, fsync, rename),
+    either when the flush interval elapses or when enough mutations are pending.
+    Callers that need durability wait on the sequence number of their mutation.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = None
+        self.seq = 0            # last mutation applied in memory
+        self.flushed_seq = 0    # last mutation known to be on disk
+        self.flush_count = 0
+        self.disk_stat = None
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.flushing = threading.Lock()
+        self.thread = None
+
+    def _load(self):
+        """Load from disk on first use, or again if someone else rewrote the file"""
+        try:
+            stat_result = os.stat(self.path)
+        except FileNotFoundError:
+            stat_result = None
+
+        current = (stat_result.st_mtime_ns, stat_result.st_size) if stat_result else None
+        if self.records is not None and (self.seq != self.flushed_seq or current == self.disk_stat):
+            return
+
+        if stat_result is None:
+            self.records = []
+            self._write(json.dumps([]))
+            return
+
+        with open(self.path, "r") as f:
+            self.records = json.load(f)
+        self.disk_stat = current
+
+    def _write(self, payload):
+        """Atomically replace the registry file: temp file, fsync, rename"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".registry-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+        stat_result = os.stat(self.path)
+        self.disk_stat = (stat_result.st_mtime_ns, stat_result.st_size)
+
+    def all(self):
+        """Return a copy of all records"""
+        with self.lock:
+            self._load()
+            return [dict(r) for r in self.records]
+
+    def mutate(self, change):
+        """Apply change(records) in memory and schedule a flush; returns the mutation's sequence number"""
+        write_through = config.REGISTRY_FLUSH_INTERVAL_MS <= 0
+        with self.lock:
+            self._load()
+            change(self.records)
+            self.seq += 1
+            seq = self.seq
+
+            if not write_through:
+                self._ensure_thread()
+                if self.seq - self.flushed_seq >= config.REGISTRY_FLUSH_BATCH:
+                    self.changed.notify_all()
+
+        # Flushing takes self.flushing before self.lock, so never flush while holding self.lock
+        if write_through:
+            self.flush()
+        return seq
+
+    def flush(self):
+        """Write pending mutations to disk now"""
+        with self.flushing:
+            with self.lock:
+                if self.records is None or self.flushed_seq >= self.seq:
+                    return
+                seq = self.seq
+                payload = json.dumps(self.records, indent=2)
+
+            # The disk write happens outside the registry lock so readers and
+            # writers keep going; self.flushing serializes concurrent flushes
+            self._write(payload)
+
+            with self.lock:
+                self.flushed_seq = max(self.flushed_seq, seq)
+                self.flush_count += 1
+                self.changed.notify_all()
+
+    def wait_durable(self, seq=None, timeout=None):
+        """Block until mutation `seq` (default: every mutation so far) is on disk"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            if seq is None:
+                seq = self.seq
+            if self.flushed_seq >= seq:
+                return True
+        # Don't make a caller that asked for durability wait out the interval
+        self.flush()
+        with self.lock:
+            while self.flushed_seq < seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.changed.wait(remaining)
+            return True
+
+    def get(self, filename):
+        with self.lock:
+            self._load()
+            return next((dict(f) for f in self.records if f["filename"] == filename), None)
+
+    def add(self, record):
+        def add(db):
+            # Enforce uniqueness
+            if any(f["filename"] == record["filename"] for f in db):
+                raise ValueError("A file with this filename already exists.")
+            if any(f["title"] == record["title"] for f in db if record["title"]):
+                raise ValueError("A file with this title already exists.")
+            db.append(dict(record))
+        return self.mutate(add)
+
+    def remove(self, filename):
+        def delete(db):
+            db[:] = [f for f in db if f["filename"] != filename]
+        return self.mutate(delete)
+
+    def update(self, filename, fields):
+        def update(db):
+            for f in db:
+                if f["filename"] == filename:
+                    f.update(fields)
+                    break
+        return self.mutate(update)
+
+    def replace_all(self, records):
+        def replace_all(db):
+            db[:] = [dict(r) for r in records]
+        return self.mutate(replace_all)
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="registry-flusher", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while self.flushed_seq >= self.seq:
+                    self.changed.wait()
+                # Group commit: give other mutations a short window to join this batch
+                self.changed.wait_for(
+                    lambda: self.seq - self.flushed_seq >= config.REGISTRY_FLUSH_BATCH,
+                    timeout=config.REGISTRY_FLUSH_INTERVAL_MS / 1000.0
+                )
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Registry flush failed: {str(e)}")
+                time.sleep(config.REGISTRY_FLUSH_INTERVAL_MS / 1000.0)
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_registry():
+    """
+    Return the registry for the configured backend and DB_PATH (relative to the working directory).
+
+    The default JSON backend is single-process only. Multi-worker deployments
+    (uvicorn --workers N) must use SIGMA2RML_REGISTRY_BACKEND=sqlite.
+    """
+    backend = config.REGISTRY_BACKEND
+    if backend == "sqlite":
+        path = os.path.abspath(os.path.splitext(DB_PATH)[0] + ".db")
+    else:
+        path = os.path.abspath(DB_PATH)
+
+    with _registries_lock:
+        registry = _registries.get((backend, path))
+        if registry is None:
+            if backend == "sqlite":
+                from app.storage.sqlite_registry import SqliteRegistry
+                registry = SqliteRegistry(path, import_from=os.path.abspath(DB_PATH))
+            else:
+                registry = WriteBehindRegistry(path)
+            _registries[(backend, path)] = registry
+        return registry
+
+def flush_all():
+    """Flush every registry, used at interpreter exit"""
+    with _registries_lock:
+        registries = list(_registries.values())
+    for registry in registries:
+        registry.flush()
+
+atexit.register(flush_all)
+
+# Recent latency of registry calls as seen by callers, by kind, reported by /ready
+_latency = {}
+_latency_lock = threading.Lock()
+
+def _timed(kind):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                op = "durable_write" if kind == "write" and kwargs.get("durable") else kind
+                with _latency_lock:
+                    previous = _latency.get(op)
+                    _latency[op] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+        return wrapper
+    return decorate
+
+def registry_latency():
+    """Exponentially weighted recent latency in milliseconds per kind of call (read, write, durable_write)"""
+    with _latency_lock:
+        return {op: round(seconds * 1000, 3) for op, seconds in _latency.items()}
+
+def wait_durable(seq=None, timeout=None):
+    return get_registry().wait_durable(seq, timeout)
+
+def _finish(seq, durable):
+    if durable:
+        wait_durable(seq)
+    return seq
+
+@_timed("read")
 def load_db():
-    if not os.path.exists(DB_PATH):
-        with open(DB_PATH, "w") as f:
-            json.dump([], f)
-    with open(DB_PATH, "r") as f:
-        return json.load(f)
+    return get_registry().all()
 
-def save_db(data):
-    with open(DB_PATH, "w") as f:
-        json.dump(data, f, indent=2)
+@_timed("write")
+def save_db(data, durable=False):
+    return _finish(get_registry().replace_all(data), durable)
 
-def add_file_record(filename, path, title=""):
+@_timed("write")
+def add_file_record(filename, path, title="", sha256=None, durable=False, fingerprint=None, fingerprint_version=None):
     # Validate inputs
     if not filename or not filename.strip():
         raise ValueError("Filename cannot be empty")
     if not path or not path.strip():
         raise ValueError("File path cannot be empty")
-    
-    db = load_db()
-    # Enforce uniqueness
-    if any(f["filename"] == filename for f in db):
-        raise ValueError("A file with this filename already exists.")
-    if any(f["title"] == title for f in db if title):
-        raise ValueError("A file with this title already exists.")
-    db.append({
+
+    seq = get_registry().add({
         "filename": filename,
         "path": path,
         "title": title,
         "translated": False,
-        "rml_path": None
+        "rml_path": None,
+        "sha256": sha256,
+        "fingerprint": fingerprint,
+        "fingerprint_version": fingerprint_version
     })
-    save_db(db)
+    return _finish(seq, durable)
 
-def delete_file_record(filename):
+@_timed("write")
+def delete_file_record(filename, durable=False):
     if not filename or not filename.strip():
         raise ValueError("Filename cannot be empty")
-        
-    db = load_db()
-    db = [f for f in db if f["filename"] != filename]
-    save_db(db)
 
+    return _finish(get_registry().remove(filename), durable)
+
+@_timed("read")
 def get_file_record(filename):
     if not filename or not filename.strip():
         return None
-        
-    return next((f for f in load_db() if f["filename"] == filename), None)
 
-def update_translation_status(filename, rml_path):
+    return get_registry().get(filename)
+
+@_timed("write")
+def update_translation_status(filename, rml_path, durable=False):
     if not filename or not filename.strip():
         raise ValueError("Filename cannot be empty")
     if not rml_path or not rml_path.strip():
         raise ValueError("RML path cannot be empty")
-        
-    db = load_db()
-    for f in db:
-        if f["filename"] == filename:
-            f["translated"] = True
-            f["rml_path"] = rml_path
-            break
-    save_db(db)
+
+    seq = get_registry().update(filename, {"translated": True, "rml_path": rml_path})
+    return _finish(seq, durable)
+
+@_timed("write")
+def update_file_record(filename, durable=False, **fields):
+    if not filename or not filename.strip():
+        raise ValueError("Filename cannot be empty")
+
+    return _finish(get_registry().update(filename, fields), durable)
@@ -0,0 +1,147 @@
+"""
+On-disk storage layout for uploaded and translated files.
+
+Files are sharded by the prefix of their content hash:
+    uploaded_files/3f/a2/rule.yml
+so no single directory grows past a few hundred entries. The registry keeps
+the filename-to-location mapping, callers never build paths themselves.
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+
+UPLOAD_DIR = "uploaded_files"
+TRANSLATED_DIR = "translated_files"
+
+def normalize_path(path):
+    """Normalize path to use forward slashes for consistency"""
+    return path.replace('\\', '/')
+
+def resolve_path(stored_path):
+    """Resolve stored path to actual file system path"""
+    # Convert forward slashes back to OS-specific separators for file operations
+    if os.name == 'nt':  # Windows
+        return stored_path.replace('/', '\\')
+    else:  # Unix-like systems
+        return stored_path
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 hex digest used for sharding and change detection"""
+    return hashlib.sha256(content).hexdigest()
+
+class ShardedStorage:
+    """Stores files under <root>/<shard>/<shard>/<name> using the content hash prefix"""
+
+    def __init__(self, root: str, depth: int = 2, width: int = 2):
+        self.root = root
+        self.depth = depth
+        self.width = width
+
+    def location_for(self, name: str, digest: str) -> str:
+        """Return the normalized stored path for a file name and content digest"""
+        shards = [digest[i * self.width:(i + 1) * self.width] for i in range(self.depth)]
+        return normalize_path(os.path.join(self.root, *shards, name))
+
+    def is_sharded(self, stored_path: str) -> bool:
+        """Check whether a stored path already follows the sharded layout"""
+        parts = normalize_path(stored_path).split('/')
+        return len(parts) == self.depth + 2 and parts[0] == self.root
+
+    def write(self, name: str, content: bytes):
+        """
+        Atomically write content to its sharded location.
+        Returns (stored_path, digest).
+        """
+        digest = content_hash(content)
+        stored_path = self.location_for(name, digest)
+        actual_path = resolve_path(stored_path)
+        directory = os.path.dirname(actual_path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, actual_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return stored_path, digest
+
+    def move_into_place(self, stored_path: str):
+        """
+        Move an existing file into its sharded location.
+        Returns (new_stored_path, digest).
+        """
+        actual_path = resolve_path(stored_path)
+        digest = hashlib.sha256()
+        with open(actual_path, "rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+
+        new_stored_path = self.location_for(os.path.basename(actual_path), digest)
+        new_actual_path = resolve_path(new_stored_path)
+        if new_actual_path != actual_path:
+            os.makedirs(os.path.dirname(new_actual_path), exist_ok=True)
+            os.replace(actual_path, new_actual_path)
+
+        return new_stored_path, digest
+
+    def remove(self, stored_path: str) -> bool:
+        """Remove a stored file and prune shard directories left empty"""
+        actual_path = resolve_path(stored_path)
+        if not os.path.exists(actual_path):
+            return False
+
+        os.remove(actual_path)
+
+        root = os.path.abspath(self.root)
+        directory = os.path.dirname(os.path.abspath(actual_path))
+        while directory != root and directory.startswith(root):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+        return True
+
+uploads = ShardedStorage(UPLOAD_DIR)
+translations = ShardedStorage(TRANSLATED_DIR)
+
+def migrate_flat_layout():
+    """
+    One-shot migration of registry entries stored in the old flat layout.
+    Safe to run more than once, already sharded entries are left alone.
+    Returns the number of files moved.
+    """
+    from app.storage.db import load_db, update_file_record
+
+    moved = 0
+    for record in load_db():
+        changes = {}
+
+        path = record.get("path")
+        if path and not uploads.is_sharded(path) and os.path.exists(resolve_path(path)):
+            changes["path"], changes["sha256"] = uploads.move_into_place(path)
+            moved += 1
+
+        rml_path = record.get("rml_path")
+        if rml_path and not translations.is_sharded(rml_path) and os.path.exists(resolve_path(rml_path)):
+            changes["rml_path"], _ = translations.move_into_place(rml_path)
+            moved += 1
+
+        if changes:
+            update_file_record(record["filename"], **changes)
+
+    return moved
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        print(f"Moved {migrate_flat_layout()} files into the sharded layout")
+    else:
+        print("Usage: python -m app.storage.layout migrate")
@@ -0,0 +1,124 @@
+"""
+Local change notifications between worker processes.
+
+Every worker on the host appends one JSON line per change to a shared event
+file (O_APPEND keeps small writes atomic). Each process remembers how far it
+has read and, when polled, hands events published by other processes to the
+callbacks registered with subscribe(). Polling costs one stat() when nothing
+changed, so caches simply poll before serving.
+"""
+
+import json
+import os
+import threading
+
+# Once the event file grows past this size the next publisher rotates it
+MAX_FEED_SIZE = 1024 * 1024
+# Read position marker for a feed whose file does not exist yet
+NO_FILE = -1
+
+class ChangeFeed:
+    """File-based invalidation channel shared by all workers on one host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.inode = None
+        self.offset = 0
+        self.pid = os.getpid()
+
+    def subscribe(self, callback):
+        """Register callback(filename, event); filename is None when everything must be dropped"""
+        with self.lock:
+            self.callbacks.append(callback)
+        # Establish the read position so later polls only report newer events
+        self.poll()
+        return callback
+
+    def publish(self, filename: str, event: str):
+        """Tell the other workers that a record changed"""
+        line = json.dumps({"pid": os.getpid(), "filename": filename, "event": event}) + "\n"
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+        if size > MAX_FEED_SIZE:
+            self._rotate()
+
+    def _rotate(self):
+        """Swap in an empty file; readers notice the new inode and drop all cached state"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w"):
+            pass
+        os.replace(tmp_path, self.path)
+
+    def poll(self) -> int:
+        """Deliver events published by other processes since the last poll; returns how many"""
+        try:
+            stat_result = os.stat(self.path)
+        except FileNotFoundError:
+            stat_result = None
+
+        with self.lock:
+            # A forked worker inherits the parent's position but not its identity
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+
+            if stat_result is None:
+                # Nothing published yet, read the file from the start once it appears
+                if self.inode is None:
+                    self.inode = NO_FILE
+                return 0
+
+            if self.inode is None:
+                # First poll: start from the current end, there is nothing cached yet
+                self.inode, self.offset = stat_result.st_ino, stat_result.st_size
+                return 0
+
+            events = []
+            if self.inode == NO_FILE:
+                self.inode, self.offset = stat_result.st_ino, 0
+            elif stat_result.st_ino != self.inode or stat_result.st_size < self.offset:
+                # The feed was rotated, events may have been missed
+                self.inode, self.offset = stat_result.st_ino, 0
+                events.append({"pid": None, "filename": None, "event": "reset"})
+
+            if stat_result.st_size > self.offset:
+                with open(self.path, "rb") as f:
+                    f.seek(self.offset)
+                    data = f.read(stat_result.st_size - self.offset)
+                # Only consume complete lines, a writer may be mid-append
+                complete = data.rfind(b"\n") + 1
+                self.offset += complete
+                for raw in data[:complete].splitlines():
+                    try:
+                        events.append(json.loads(raw))
+                    except ValueError:
+                        continue
+
+            callbacks = list(self.callbacks)
+
+        delivered = 0
+        for event in events:
+            if event.get("pid") == self.pid:
+                continue
+            for callback in callbacks:
+                callback(event.get("filename"), event.get("event"))
+            delivered += 1
+        return delivered
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+def get_feed(path: str) -> ChangeFeed:
+    """Return the process-wide feed for an event file"""
+    path = os.path.abspath(path)
+    with _feeds_lock:
+        feed = _feeds.get(path)
+        if feed is None:
+            feed = _feeds[path] = ChangeFeed(path)
+        return feed
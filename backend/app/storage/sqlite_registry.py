@@ -0,0 +1,170 @@
+"""
+SQLite-backed file registry for multi-worker deployments.
+
+WAL mode lets every worker read concurrently while BEGIN IMMEDIATE transactions
+serialize writers across processes, so concurrent uploads no longer overwrite
+each other's records. Each process keeps a cached copy of the registry and
+drops it when another worker announces a change on the shared change feed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from app import config
+from app.storage.notify import get_feed
+
+class SqliteRegistry:
+    """Registry stored in SQLite (WAL mode), safe to share between worker processes"""
+
+    def __init__(self, path, import_from=None):
+        self.path = path
+        self.import_from = import_from
+        self.local = threading.local()
+        self.seq = 0
+        self.cache = None
+        self.generation = 0
+        self.cache_lock = threading.Lock()
+        self._init_schema()
+        self.feed = get_feed(config.REGISTRY_EVENTS_PATH)
+        self.feed.subscribe(self._on_change)
+
+    def _connect(self):
+        """One connection per thread and per process (connections must not cross a fork)"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _write_transaction(self):
+        """Cross-process write lock: BEGIN IMMEDIATE takes the database's reserved lock"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _init_schema(self):
+        with self._write_transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "filename TEXT NOT NULL UNIQUE, "
+                "title TEXT NOT NULL DEFAULT '', "
+                "data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS files_title ON files(title)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+            # First start: take over the records of the JSON registry, exactly once
+            imported = conn.execute("SELECT value FROM meta WHERE key = 'imported_json'").fetchone()
+            if not imported:
+                if self.import_from and os.path.exists(self.import_from):
+                    with open(self.import_from, "r") as f:
+                        for record in json.load(f):
+                            conn.execute(
+                                "INSERT OR IGNORE INTO files (filename, title, data) VALUES (?, ?, ?)",
+                                (record["filename"], record.get("title") or "", json.dumps(record))
+                            )
+                conn.execute("INSERT INTO meta (key, value) VALUES ('imported_json', '1')")
+
+    def _on_change(self, filename, event):
+        self._invalidate()
+
+    def _invalidate(self):
+        with self.cache_lock:
+            self.cache = None
+            self.generation += 1
+
+    def _changed(self, filename, event):
+        """Drop our own cache and tell the other workers"""
+        with self.cache_lock:
+            self.cache = None
+            self.generation += 1
+            self.seq += 1
+            seq = self.seq
+        self.feed.publish(filename, event)
+        return seq
+
+    def _records(self):
+        self.feed.poll()
+        with self.cache_lock:
+            if self.cache is not None:
+                return self.cache
+            generation = self.generation
+
+        rows = self._connect().execute("SELECT data FROM files ORDER BY id").fetchall()
+        records = [json.loads(row[0]) for row in rows]
+        cache = (records, {r["filename"]: r for r in records})
+
+        with self.cache_lock:
+            # Don't cache a snapshot that a concurrent change already made stale
+            if self.generation == generation:
+                self.cache = cache
+        return cache
+
+    def all(self):
+        records, _ = self._records()
+        return [dict(r) for r in records]
+
+    def get(self, filename):
+        _, by_name = self._records()
+        record = by_name.get(filename)
+        return dict(record) if record else None
+
+    def add(self, record):
+        with self._write_transaction() as conn:
+            # Enforce uniqueness
+            if conn.execute("SELECT 1 FROM files WHERE filename = ?", (record["filename"],)).fetchone():
+                raise ValueError("A file with this filename already exists.")
+            if record["title"] and conn.execute("SELECT 1 FROM files WHERE title = ?", (record["title"],)).fetchone():
+                raise ValueError("A file with this title already exists.")
+            conn.execute(
+                "INSERT INTO files (filename, title, data) VALUES (?, ?, ?)",
+                (record["filename"], record["title"] or "", json.dumps(record))
+            )
+        return self._changed(record["filename"], "add")
+
+    def remove(self, filename):
+        with self._write_transaction() as conn:
+            conn.execute("DELETE FROM files WHERE filename = ?", (filename,))
+        return self._changed(filename, "delete")
+
+    def update(self, filename, fields):
+        with self._write_transaction() as conn:
+            row = conn.execute("SELECT data FROM files WHERE filename = ?", (filename,)).fetchone()
+            if row:
+                record = json.loads(row[0])
+                record.update(fields)
+                conn.execute(
+                    "UPDATE files SET title = ?, data = ? WHERE filename = ?",
+                    (record.get("title") or "", json.dumps(record), filename)
+                )
+        return self._changed(filename, "update")
+
+    def replace_all(self, records):
+        with self._write_transaction() as conn:
+            conn.execute("DELETE FROM files")
+            for record in records:
+                conn.execute(
+                    "INSERT INTO files (filename, title, data) VALUES (?, ?, ?)",
+                    (record["filename"], record.get("title") or "", json.dumps(record))
+                )
+        return self._changed(None, "reset")
+
+    def wait_durable(self, seq=None, timeout=None):
+        # Every write is committed (synchronous=FULL) before the call returns
+        return True
+
+    def flush(self):
+        pass
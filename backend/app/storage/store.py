@@ -1,16 +1,11 @@
 import os
-from app.storage.db import add_file_record
-import yaml
-
-UPLOAD_DIR = "uploaded_files"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-def normalize_path(path):
-    """Normalize path to use forward slashes for consistency"""
-    return path.replace('\\', '/')
+from app import config
+from app.storage.db import add_file_record, get_file_record
+from app.storage.layout import normalize_path, uploads
 
 def store_uploaded_file(file, filename):
     """Store an uploaded file and register it in the database"""
+    import yaml
     try:
         # Validate filename
         if not filename or not filename.strip():
@@ -22,13 +17,9 @@ def store_uploaded_file(file, filename):
         
         # Create safe filename
         safe_filename = os.path.basename(filename)
-        path = os.path.join(UPLOAD_DIR, safe_filename)
-        
-        # Normalize path for consistent storage
-        normalized_path = normalize_path(path)
         
-        # Check if file already exists
-        if os.path.exists(path):
+        # Check if file already exists (the registry maps filenames to locations)
+        if get_file_record(safe_filename):
             raise ValueError(f"A file with the name '{safe_filename}' already exists")
         
         # Read file content
@@ -44,12 +35,13 @@ def store_uploaded_file(file, filename):
         if len(content) > max_size:
             raise ValueError(f"File too large. Maximum size: {max_size // (1024*1024)}MB")
         
-        # Save file
-        with open(path, "wb") as f:
-            f.write(content)
+        # Save file into its content-hash shard
+        normalized_path, sha256 = uploads.write(safe_filename, content)
         
         # Try to extract YAML title and validate format
         title = ""
+        fingerprint = None
+        fingerprint_version = None
         try:
             # Reset file pointer for reading
             file.seek(0)
@@ -65,6 +57,14 @@ def store_uploaded_file(file, filename):
                 detection = yaml_content.get("detection", {})
                 if not detection or "condition" not in detection:
                     raise ValueError("File does not appear to be a valid Sigma rule (missing 'condition' in detection)")
+                
+                # Structural fingerprint for duplicate detection; a condition we cannot parse just has none
+                from app.core.canonical import FINGERPRINT_VERSION, rule_fingerprint
+                try:
+                    fingerprint = rule_fingerprint(yaml_content)
+                    fingerprint_version = FINGERPRINT_VERSION
+                except ValueError:
+                    fingerprint = None
                     
         except yaml.YAMLError:
             # Not valid YAML, but we'll still store it
@@ -74,21 +74,28 @@ def store_uploaded_file(file, filename):
             raise ValueError(f"Sigma rule validation failed: {str(ve)}")
         
         # Register in database with normalized path
-        add_file_record(safe_filename, normalized_path, title)
+        add_file_record(safe_filename, normalized_path, title, sha256, durable=True,
+                        fingerprint=fingerprint, fingerprint_version=fingerprint_version)
+        
+        # Eager mode: translate in the background so the first view is served precomputed
+        if config.EAGER_TRANSLATE:
+            from app.jobs.worker import submit_job
+            submit_job([safe_filename])
         
         return normalized_path
         
     except Exception as e:
         # Clean up any partially created files
-        if 'path' in locals() and os.path.exists(path):
+        if 'normalized_path' in locals():
             try:
-                os.remove(path)
+                uploads.remove(normalized_path)
             except:
                 pass
         raise e
 
 def get_file_info(filepath):
     """Get information about a stored file"""
+    import yaml
     try:
         # Normalize path for consistency
         normalized_path = normalize_path(filepath)
@@ -0,0 +1,167 @@
+"""
+Admission control for expensive handlers.
+
+Each controller lets at most `limit` requests run at once and parks up to
+`queue_size` more in FIFO order. A request that finds the queue full, or
+waits longer than the queue timeout, is shed right away with 503 and a
+Retry-After estimated from recent service times. Limits are read from
+app.config on every request unless given explicitly.
+
+Controllers are shared by every event loop of the process, so the state is
+guarded by a thread lock and waiters are woken with call_soon_threadsafe.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from fastapi import HTTPException
+from app import config
+
+class _Waiter:
+    __slots__ = ("loop", "future", "granted", "abandoned")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+        self.abandoned = False
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+class AdmissionController:
+    """Concurrency limit plus a bounded FIFO queue with load shedding"""
+
+    def __init__(self, name, limit=None, queue_size=None, queue_timeout=None):
+        self.name = name
+        self._limit = limit
+        self._queue_size = queue_size
+        self._queue_timeout = queue_timeout
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiters = deque()
+        self.service_time_ewma = 0.0
+        self.stats = {
+            "admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0,
+            "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+        }
+
+    @property
+    def limit(self):
+        return max(1, self._limit if self._limit is not None else config.ADMISSION_MAX_CONCURRENCY)
+
+    @property
+    def queue_size(self):
+        return max(0, self._queue_size if self._queue_size is not None else config.ADMISSION_QUEUE_SIZE)
+
+    @property
+    def queue_timeout(self):
+        return self._queue_timeout if self._queue_timeout is not None else config.ADMISSION_QUEUE_TIMEOUT_S
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to be free, from the queue depth and recent service times"""
+        service_time = self.service_time_ewma or 1.0
+        return max(1, math.ceil(service_time * (len(self.waiters) + 1) / self.limit))
+
+    def _overloaded(self, reason):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is busy ({self.name}: {reason}), retry later",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    def _admitted(self, waited):
+        self.stats["admitted"] += 1
+        self.stats["wait_seconds_total"] += waited
+        self.stats["wait_seconds_max"] = max(self.stats["wait_seconds_max"], waited)
+
+    async def acquire(self):
+        """Take a slot, waiting in the queue if needed; raises a 503 HTTPException when shedding"""
+        start = time.monotonic()
+        with self.lock:
+            if self.active < self.limit and not self.waiters:
+                self.active += 1
+                self._admitted(0.0)
+                return start
+            if len(self.waiters) >= self.queue_size:
+                self.stats["rejected"] += 1
+                self._overloaded("queue full")
+            waiter = _Waiter(asyncio.get_running_loop())
+            self.waiters.append(waiter)
+            self.stats["queued"] += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self.lock:
+                if not waiter.granted:
+                    waiter.abandoned = True
+                    try:
+                        self.waiters.remove(waiter)
+                    except ValueError:
+                        pass
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.stats["timed_out"] += 1
+            if waiter.granted:
+                # The slot was handed over just as we gave up
+                if isinstance(e, asyncio.CancelledError):
+                    self.release(start)
+                    raise
+            elif isinstance(e, asyncio.TimeoutError):
+                self._overloaded("queue timeout")
+            else:
+                raise
+
+        with self.lock:
+            self._admitted(time.monotonic() - start)
+        return time.monotonic()
+
+    def release(self, started=None):
+        """Free a slot, handing it straight to the oldest waiter if there is one"""
+        with self.lock:
+            if started is not None:
+                elapsed = time.monotonic() - started
+                self.service_time_ewma = elapsed if not self.service_time_ewma else 0.8 * self.service_time_ewma + 0.2 * elapsed
+            while self.waiters:
+                waiter = self.waiters.popleft()
+                if waiter.abandoned:
+                    continue
+                try:
+                    waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                except RuntimeError:
+                    # The waiter's event loop is gone
+                    continue
+                waiter.granted = True
+                return
+            self.active -= 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(
+                self.stats,
+                active=self.active,
+                queue_depth=len(self.waiters),
+                limit=self.limit,
+                queue_size=self.queue_size,
+                service_time_ewma=round(self.service_time_ewma, 6),
+            )
+
+def admit(controller: AdmissionController):
+    """FastAPI dependency holding a slot of controller for the duration of the request"""
+    async def dependency():
+        started = await controller.acquire()
+        try:
+            yield
+        finally:
+            controller.release(started)
+    return dependency
+
+transpile_admission = AdmissionController("transpile")
+translate_admission = AdmissionController("translate")
+upload_admission = AdmissionController("upload")
+
+def admission_stats() -> dict:
+    return {c.name: c.snapshot() for c in (transpile_admission, translate_admission, upload_admission)}
@@ -0,0 +1,96 @@
+"""
+Streaming archive writers
+Build zip, tar and NDJSON archives on the fly without holding the archive in memory
+"""
+
+import io
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+class _StreamSink(io.RawIOBase):
+    """Unseekable write-only sink, the generator drains it after every write"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _manifest_bytes(manifest: Dict[str, Any]) -> bytes:
+    return json.dumps(manifest, indent=2).encode("utf-8")
+
+def stream_zip(manifest: Dict[str, Any], entries: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Yield a zip archive containing manifest.json followed by every entry.
+    Each entry is a dict with 'arcname', 'path' and 'modified' keys.
+    """
+    import zipfile
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        info = zipfile.ZipInfo("manifest.json", time.localtime(manifest["generated_at"])[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        archive.writestr(info, _manifest_bytes(manifest))
+        yield sink.drain()
+
+        for entry in entries:
+            info = zipfile.ZipInfo(entry["arcname"], time.localtime(entry["modified"])[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(entry["path"], "rb") as src, archive.open(info, mode="w") as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+def stream_tar(manifest: Dict[str, Any], entries: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Yield an uncompressed tar archive containing manifest.json followed by every entry"""
+    import tarfile
+    sink = _StreamSink()
+    with tarfile.open(fileobj=sink, mode="w|") as archive:
+        manifest_data = _manifest_bytes(manifest)
+        info = tarfile.TarInfo("manifest.json")
+        info.size = len(manifest_data)
+        info.mtime = int(manifest["generated_at"])
+        archive.addfile(info, io.BytesIO(manifest_data))
+        yield sink.drain()
+
+        for entry in entries:
+            info = tarfile.TarInfo(entry["arcname"])
+            info.size = entry["size"]
+            info.mtime = int(entry["modified"])
+            with open(entry["path"], "rb") as src:
+                archive.addfile(info, src)
+            yield sink.drain()
+    yield sink.drain()
+
+def stream_ndjson(manifest: Dict[str, Any], entries: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Yield one JSON object per line: the manifest first, then one line per entry with its content"""
+    yield (json.dumps({"type": "manifest", **manifest}) + "\n").encode("utf-8")
+
+    for entry in entries:
+        with open(entry["path"], "r", encoding="utf-8") as f:
+            content = f.read()
+        line = {
+            "type": "rule",
+            "filename": entry["filename"],
+            "arcname": entry["arcname"],
+            "source_sha256": entry["source_sha256"],
+            "rml_sha256": entry["rml_sha256"],
+            "modified": entry["modified"],
+            "rml": content,
+        }
+        yield (json.dumps(line) + "\n").encode("utf-8")
@@ -0,0 +1,210 @@
+"""
+Raw file responses with strong ETags, conditional requests, Range and compression,
+plus an in-memory cache of translated RML text
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Files above this size are never compressed in memory, they are streamed as-is
+MAX_COMPRESS_SIZE = 8 * 1024 * 1024
+# Small bodies don't benefit from compression
+MIN_COMPRESS_SIZE = 256
+# Number of compressed bodies kept around, keyed by (etag, encoding)
+COMPRESSED_CACHE_SIZE = 128
+# Number of RML texts kept in memory, keyed by path and validated by mtime and size
+TEXT_CACHE_SIZE = 512
+
+_digest_cache = {}
+_compressed_cache = OrderedDict()
+_text_cache = OrderedDict()
+_text_cache_stats = {"hits": 0, "misses": 0}
+_cache_lock = threading.Lock()
+
+def file_digest(path: str) -> str:
+    """Return the sha256 hex digest of a file, cached by path, mtime and size"""
+    stat_result = os.stat(path)
+    key = (stat_result.st_mtime_ns, stat_result.st_size)
+
+    with _cache_lock:
+        cached = _digest_cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _cache_lock:
+        _digest_cache[path] = (key, digest)
+    return digest
+
+def _remember_text(path, key, text):
+    with _cache_lock:
+        _text_cache[path] = (key, text)
+        _text_cache.move_to_end(path)
+        while len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+
+def read_text(path: str) -> str:
+    """Read a UTF-8 file through the text cache; a changed mtime or size is a miss"""
+    stat_result = os.stat(path)
+    key = (stat_result.st_mtime_ns, stat_result.st_size)
+
+    with _cache_lock:
+        cached = _text_cache.get(path)
+        if cached and cached[0] == key:
+            _text_cache.move_to_end(path)
+            _text_cache_stats["hits"] += 1
+            return cached[1]
+        _text_cache_stats["misses"] += 1
+
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    _remember_text(path, key, text)
+    return text
+
+def warm_text(path: str, text: str):
+    """Put freshly written output in the text cache so the first view is a hit"""
+    stat_result = os.stat(path)
+    _remember_text(path, (stat_result.st_mtime_ns, stat_result.st_size), text)
+
+def text_cache_stats() -> dict:
+    with _cache_lock:
+        return dict(_text_cache_stats, size=len(_text_cache))
+
+def forget_file(path: str):
+    """Drop cached digests, compressed bodies and text for a path"""
+    with _cache_lock:
+        _text_cache.pop(path, None)
+        cached = _digest_cache.pop(path, None)
+        if cached:
+            etag_prefix = f'"{cached[1]}'
+            for cache_key in [k for k in _compressed_cache if k[0].startswith(etag_prefix)]:
+                del _compressed_cache[cache_key]
+
+def strong_etag(digest: str, encoding: str = None) -> str:
+    """Build a strong ETag, each content-encoding gets its own validator"""
+    if encoding:
+        return f'"{digest}-{encoding}"'
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: str, etags) -> bool:
+    """Check an If-None-Match header against a set of current ETags"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = set()
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        # If-None-Match uses weak comparison
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        candidates.add(tag)
+    return any(etag in candidates for etag in etags)
+
+def negotiate_encoding(accept_encoding: str):
+    """Pick the preferred content-encoding we can produce, or None for identity"""
+    if not accept_encoding:
+        return None
+
+    offered = {}
+    for part in accept_encoding.split(","):
+        pieces = part.strip().split(";")
+        coding = pieces[0].strip().lower()
+        quality = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            offered[coding] = quality
+
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = offered.get(coding, offered.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def _compress(path: str, etag: str, encoding: str) -> bytes:
+    """Compress a file body, reusing a previous result for the same ETag"""
+    cache_key = (etag, encoding)
+    with _cache_lock:
+        body = _compressed_cache.get(cache_key)
+        if body is not None:
+            _compressed_cache.move_to_end(cache_key)
+            return body
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    if encoding == "br":
+        body = brotli.compress(raw)
+    else:
+        body = gzip.compress(raw, mtime=0)
+
+    with _cache_lock:
+        _compressed_cache[cache_key] = body
+        while len(_compressed_cache) > COMPRESSED_CACHE_SIZE:
+            _compressed_cache.popitem(last=False)
+    return body
+
+def build_file_response(request: Request, path: str, media_type: str, filename: str = None) -> Response:
+    """
+    Serve a file straight from disk.
+
+    Identity responses go through FileResponse, which streams the file (or uses
+    the server's pathsend extension) and handles Range/If-Range itself.
+    """
+    digest = file_digest(path)
+    size = os.path.getsize(path)
+    identity_etag = strong_etag(digest)
+
+    # Range requests are always served against the identity representation
+    encoding = None
+    if "range" not in request.headers and MIN_COMPRESS_SIZE <= size <= MAX_COMPRESS_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    etag = strong_etag(digest, encoding)
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), {etag, identity_etag}):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        body = _compress(path, etag, encoding)
+        headers["Content-Encoding"] = encoding
+        if filename:
+            headers["Content-Disposition"] = f'inline; filename="{filename}"'
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers=headers,
+        filename=filename,
+        content_disposition_type="inline",
+    )
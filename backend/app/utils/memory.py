@@ -0,0 +1,114 @@
+"""
+Process memory introspection: resident set size and tracemalloc allocation sites.
+
+Tracing costs CPU and memory on every allocation, so it is off unless started
+at startup (SIGMA2RML_TRACEMALLOC_FRAMES) or through the admin API. Starting it
+records a baseline snapshot; reports can then show growth since that baseline,
+which is what points at a leak. tracemalloc itself is imported on first use.
+"""
+
+import gc
+import os
+import sys
+import threading
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+_lock = threading.Lock()
+_baseline = None
+
+def rss_bytes():
+    """Current resident set size, or the peak where the current value is unavailable"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def _snapshot():
+    import tracemalloc
+    # Allocations made by the tracing machinery itself are noise
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+def start_tracing(frames=1):
+    """Start tracemalloc (if needed) and take the baseline snapshot"""
+    global _baseline
+    import tracemalloc
+    if frames < 1:
+        raise ValueError("frames must be at least 1")
+    with _lock:
+        if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+            tracemalloc.stop()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _baseline = _snapshot()
+        return tracing_status()
+
+def stop_tracing():
+    global _baseline
+    import tracemalloc
+    with _lock:
+        _baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return tracing_status()
+
+def tracing_status():
+    # The builtin C module answers without importing tracemalloc (tracing may
+    # also have been started with -X tracemalloc)
+    import _tracemalloc
+    if not _tracemalloc.is_tracing():
+        return {"tracing": False}
+    import tracemalloc
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+    }
+
+def _site(traceback, group_by):
+    frames = [{"file": frame.filename, "line": frame.lineno} for frame in traceback]
+    if group_by == "traceback":
+        return {"traceback": frames}
+    if group_by == "filename":
+        return {"file": frames[0]["file"]}
+    return frames[0]
+
+def top_allocations(limit=20, group_by="lineno", since_baseline=False):
+    """Largest allocation sites, or the largest growth since the baseline"""
+    if group_by not in GROUP_BY:
+        raise ValueError(f"Unsupported group_by: {group_by}. Supported: {', '.join(GROUP_BY)}")
+    with _lock:
+        if not tracing_status()["tracing"]:
+            return []
+        snapshot = _snapshot()
+        baseline = _baseline
+    if since_baseline and baseline is not None:
+        stats = snapshot.compare_to(baseline, group_by)
+        return [
+            dict(_site(stat.traceback, group_by), size_bytes=stat.size, count=stat.count,
+                 size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+            for stat in stats[:limit]
+        ]
+    return [
+        dict(_site(stat.traceback, group_by), size_bytes=stat.size, count=stat.count)
+        for stat in snapshot.statistics(group_by)[:limit]
+    ]
+
+def memory_report(limit=20, group_by="lineno", since_baseline=False):
+    return {
+        "rss_bytes": rss_bytes(),
+        "gc": {"counts": list(gc.get_count()), "collections": [s["collections"] for s in gc.get_stats()]},
+        "tracemalloc": dict(tracing_status(), top=top_allocations(limit, group_by, since_baseline)),
+    }
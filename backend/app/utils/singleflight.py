@@ -0,0 +1,65 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+The first caller for a key starts the computation in the threadpool; callers
+arriving with the same key while it runs await the same future instead of
+computing again. Each waiter awaits through asyncio.shield, so a caller that
+disconnects is cancelled alone and the shared computation keeps running for
+the others. Nothing is cached: once the computation finishes the key is free.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from starlette.concurrency import run_in_threadpool
+
+def rule_key(parsed_rule) -> str:
+    """Hash of a parsed rule, insensitive to formatting, comments and quoting.
+
+    Key order is kept because it decides the order of the generated RML.
+    """
+    canonical = json.dumps(parsed_rule, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one threadpool execution"""
+
+    def __init__(self):
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "cancelled": 0, "errors": 0}
+
+    async def do(self, key, fn, *args):
+        """Return fn(*args), sharing the execution with concurrent callers of the same key"""
+        # Futures belong to one event loop, so flights are too
+        flight_key = (id(asyncio.get_running_loop()), key)
+        with self.lock:
+            self.stats["calls"] += 1
+            future = self.inflight.get(flight_key)
+            if future is None:
+                self.stats["executions"] += 1
+                future = asyncio.ensure_future(run_in_threadpool(fn, *args))
+                self.inflight[flight_key] = future
+                future.add_done_callback(lambda done: self._finished(flight_key, done))
+            else:
+                self.stats["coalesced"] += 1
+
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            with self.lock:
+                self.stats["cancelled"] += 1
+            raise
+
+    def _finished(self, flight_key, future):
+        with self.lock:
+            if self.inflight.get(flight_key) is future:
+                del self.inflight[flight_key]
+            # Mark the exception as retrieved even if every waiter went away
+            if not future.cancelled() and future.exception() is not None:
+                self.stats["errors"] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.stats, inflight=len(self.inflight))
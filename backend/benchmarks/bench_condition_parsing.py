@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark condition preprocessing on worst-case conditions
+
+Runs ConditionSimplifier over synthetic conditions and compares it with the
+implementation it replaced, which searched for innermost groups with a
+regex, substituted each one over the whole string, recursed once per
+nesting level and joined every group's text again at each level above it
+(quadratic in condition length):
+
+- flat: ~10k tokens of short parenthesized groups;
+- deep: a few selections nested 500 levels deep;
+- deep and wide: 500 levels deep, ~10k tokens.
+
+The previous implementation is skipped (reported as "-") past
+--legacy-limit tokens. A last line shows that the default limits reject the deep
+conditions before any parsing.
+
+Usage (from backend/):
+    python benchmarks/bench_condition_parsing.py [--tokens 10000] [--depth 500] [--repeat 5]
+"""
+
+import sys
+import os
+import argparse
+import re
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.core.transpiler_refactored import ConditionSimplifier, RefactoredTranspiler
+
+def legacy_parse(condition, last_idx=0, par_map=None):
+    # The resolver before the stack-based one: one regex pass and one replace per group, per level
+    if par_map is None:
+        par_map = {}
+    matches = re.findall(r'\([^()]*\)', condition)
+    for p in matches:
+        par_map[str(last_idx)] = p
+        condition = condition.replace(p, str(last_idx))
+        last_idx += 1
+    if matches:
+        condition, par_map = legacy_parse(condition, last_idx, par_map)
+    return condition, par_map
+
+def legacy_regenerate(condition, parse_map, flag=False, operation='none'):
+    # The recursive regeneration it fed, one call per group
+    new_list = []
+    for token in condition.split():
+        if token in ('and', 'or'):
+            operation = {'and': 'or', 'or': 'and'}[token] if flag else token
+            new_list.append(operation)
+        elif token == 'not':
+            flag = not flag
+        elif token in parse_map:
+            val = legacy_regenerate(parse_map[token][1:-1], parse_map, flag)
+            if operation == 'and' and 'and' in val and 'or' not in val:
+                new_list.append(' '.join(val))
+            elif operation == 'or' and 'or' in val and 'and' not in val:
+                new_list.append(' '.join(val))
+            else:
+                new_list.append('(' + ' '.join(val) + ')')
+            flag = False
+        else:
+            if flag:
+                new_list.append('not')
+            new_list.append(token)
+    return new_list
+
+def legacy_simplify(condition):
+    condition = re.sub(r'\s+', ' ', condition.strip())
+    return ' '.join(legacy_regenerate(*legacy_parse(condition)))
+
+def flat_condition(tokens):
+    # "(sel0 and not sel1) or (sel2 and not sel3) or ...": 5 tokens per group
+    groups = [f"(sel{2 * i} and not sel{2 * i + 1})" for i in range(tokens // 5)]
+    return " or ".join(groups)
+
+def deep_condition(depth, tokens):
+    # Each level adds "not ( ... or selN )"; the remaining tokens go in the middle
+    middle = flat_condition(max(tokens - 4 * depth, 6))
+    condition = middle
+    for level in range(depth):
+        condition = f"not ({condition} or lvl{level})"
+    return condition
+
+def best_of(repeat, fn, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=10000, help="tokens in the large conditions")
+    parser.add_argument("--depth", type=int, default=500, help="nesting depth of the deep conditions")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, best is reported")
+    parser.add_argument("--legacy-limit", type=int, default=20000, help="skip the previous implementation above this many tokens")
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * args.depth))
+    cases = {
+        "flat": flat_condition(args.tokens),
+        "deep": deep_condition(args.depth, 4 * args.depth + 6),
+        "deep and wide": deep_condition(args.depth, args.tokens),
+    }
+    # Limits raised so the resolver itself is measured, not the guard
+    simplifier = ConditionSimplifier(max_depth=args.depth + 1, max_length=10 * 1024 * 1024)
+    print(f"{'case':<16}{'tokens':>8}{'chars':>9}{'depth':>7}{'stack ms':>10}{'previous ms':>13}")
+    for name, condition in cases.items():
+        tokens = len(condition.replace("(", " ").replace(")", " ").split())
+        depth = args.depth if name != "flat" else 1
+        stack_ms = best_of(args.repeat, simplifier.simplify_condition, condition)
+        legacy = "-"
+        if tokens <= args.legacy_limit:
+            legacy = f"{best_of(args.repeat, legacy_simplify, condition):.2f}"
+            assert legacy_simplify(condition) == simplifier.simplify_condition(condition)
+        print(f"{name:<16}{tokens:>8}{len(condition):>9}{depth:>7}{stack_ms:>10.2f}{legacy:>13}")
+
+    transpiler = RefactoredTranspiler()
+    rule = {"detection": {"lvl0": {"EventID": 1}, "condition": cases["deep"]}}
+    start = time.perf_counter()
+    result = transpiler.transpile(rule)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"default limits: {result} ({elapsed:.2f} ms)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
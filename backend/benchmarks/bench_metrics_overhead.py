@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark the overhead of the transpiler stage timers
+
+Transpiles every rule under uploaded_files with metrics enabled and disabled,
+alternating the two modes round by round, and reports the median overhead of
+the paired rounds. Because that end-to-end figure is easily swamped by
+machine noise, the pass/fail check (exit code 1 above the budget) uses the
+steadier estimate: timers per rule times the measured cost of one timer,
+relative to the time per rule.
+
+Usage (from backend/):
+    python benchmarks/bench_metrics_overhead.py [--rounds 15] [--repeat 20] [--budget 2.0]
+"""
+
+import sys
+import os
+import argparse
+import glob
+import statistics
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.core import metrics
+from app.core.transpiler_refactored import RefactoredTranspiler
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def load_rules():
+    rules = []
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, "uploaded_files", "**", "*.yml"), recursive=True)):
+        with open(path, "r", encoding="utf-8") as f:
+            rules.append(f.read())
+    return rules
+
+def run_round(rules, repeat, enabled):
+    metrics.enabled = enabled
+    transpiler = RefactoredTranspiler()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for rule in rules:
+            transpiler.transpile(rule)
+    return time.perf_counter() - start
+
+def stage_count():
+    with metrics.transpile_stage_seconds.lock:
+        return sum(sum(series[0]) for series in metrics.transpile_stage_seconds.series.values())
+
+def measure_timer_cost(iterations=200000):
+    """Seconds one enabled stage timer adds, net of the loop itself"""
+    metrics.enabled = True
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with metrics.stage("benchmark"):
+            pass
+    timed = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    empty = time.perf_counter() - start
+    return (timed - empty) / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=2.0, help="maximum overhead in percent")
+    args = parser.parse_args()
+
+    # Rules are given as text so YAML loading is part of the measured pipeline
+    rules = load_rules()
+    if not rules:
+        print("No rules found under uploaded_files")
+        return 1
+
+    # Warm up both paths
+    run_round(rules, 2, True)
+    run_round(rules, 2, False)
+
+    # Rounds alternate between modes; the median of paired ratios is robust to machine noise
+    ratios, timings = [], {True: [], False: []}
+    for _ in range(args.rounds):
+        baseline_round = run_round(rules, args.repeat, False)
+        instrumented_round = run_round(rules, args.repeat, True)
+        timings[False].append(baseline_round)
+        timings[True].append(instrumented_round)
+        ratios.append(instrumented_round / baseline_round)
+    overhead = (statistics.median(ratios) - 1) * 100
+
+    # Deterministic cross-check: timers per rule times the cost of one timer
+    before = stage_count()
+    run_round(rules, 1, True)
+    timers_per_rule = (stage_count() - before) / len(rules)
+    timer_cost = measure_timer_cost()
+    metrics.enabled = True
+
+    baseline = min(timings[False])
+    per_rule = baseline / (args.repeat * len(rules))
+    estimate = timers_per_rule * timer_cost / per_rule * 100
+
+    print(f"Rules: {len(rules)}, {args.repeat} passes per round, {args.rounds} rounds")
+    print(f"Without metrics: {baseline * 1000:.2f} ms per round ({per_rule * 1e6:.1f} us per rule)")
+    print(f"With metrics:    {min(timings[True]) * 1000:.2f} ms per round")
+    print(f"Paired rounds:   {overhead:+.2f}% median overhead")
+    print(f"Timers:          {timers_per_rule:.1f} per rule, {timer_cost * 1e6:.2f} us each")
+    print(f"Overhead:        {estimate:.2f}% estimated (budget {args.budget:.1f}%)")
+    return 0 if estimate <= args.budget else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
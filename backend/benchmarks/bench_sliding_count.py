@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark sliding-window count monitors: state size against accuracy
+
+Replays synthetic event streams through the decisions of each count()
+encoding and compares them with an exact sliding count (matching events in
+[ts - timeframe, ts]):
+
+- tumbling: the default monitor, <start_ts, count>, anchored on the first
+  matching event and started over once that is older than the timeframe;
+- sliding/B: the bucketed monitor, <head, c1, ..., cB> (see
+  app/core/sliding_count.py), for each bucket count B.
+
+Streams mix background matching events with bursts of just over the limit
+spread over up to the whole timeframe at random offsets, so many of them
+straddle a tumbling window. For every encoding it reports the state values
+kept, the RML size of the monitor, the share of exact alerting events that
+also alert (events), the share of bursts caught at least once (bursts) and
+alerts the exact count does not raise (false).
+
+A decision is taken at every matching event and the state carries on after
+an alert, where the monitor would stop at its verdict.
+
+Usage (from backend/):
+    python benchmarks/bench_sliding_count.py [--limit 20] [--timeframe 300] [--bursts 2000]
+                                             [--buckets 2,4,8,16,32] [--seed 7]
+"""
+
+import sys
+import os
+import argparse
+import bisect
+import random
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.core.sliding_count import bucket_width
+from app.core.transpiler_refactored import RefactoredTranspiler
+
+def make_stream(bursts, limit, window_ms, rng):
+    """Matching event timestamps (ms), sorted, and the burst each event belongs to (None for background)"""
+    events = []
+    # Background: on average a quarter of the limit per window
+    clock = 10 ** 12
+    end = clock + bursts * 4 * window_ms
+    background_gap = 4 * window_ms / limit
+    ts = clock
+    while ts < end:
+        ts += rng.expovariate(1 / background_gap)
+        events.append((int(ts), None))
+    for burst in range(bursts):
+        start = rng.randrange(clock, end)
+        spread = rng.randint(window_ms // 10, window_ms)
+        size = rng.randint(limit + 1, limit + limit // 2 + 1)
+        events.extend((start + rng.randrange(spread), burst) for _ in range(size))
+    events.sort(key=lambda event: event[0])
+    return events
+
+def exact(events, limit, window_ms):
+    """Alert at each event: matching events in [ts - window, ts] above the limit"""
+    times = [ts for ts, _ in events]
+    return [i + 1 - bisect.bisect_left(times, ts - window_ms) > limit for i, ts in enumerate(times)]
+
+def tumbling(events, limit, window_ms):
+    """Decisions of the default <start_ts, count> monitor"""
+    decisions = []
+    start_ts, count = 0, 0
+    for ts, _ in events:
+        if start_ts == 0 or ts - start_ts > window_ms:
+            start_ts, count = ts, 1
+            decisions.append(False)
+        else:
+            decisions.append(count + 1 > limit)
+            count += 1
+    return decisions
+
+def sliding(events, limit, window_ms, buckets):
+    """Decisions of the bucketed <head, c1, ..., cB> monitor"""
+    width = bucket_width(window_ms, buckets)
+    decisions = []
+    head, counters = 0, [0] * buckets
+    for ts, _ in events:
+        shift = (ts - head) // width
+        if ts - head >= buckets * width:
+            head, counters = ts, [1] + [0] * (buckets - 1)
+            decisions.append(1 > limit)
+            continue
+        kept = counters[:buckets - shift]
+        decisions.append(sum(kept) + 1 > limit)
+        if shift:
+            head, counters = head + shift * width, [1] + [0] * (shift - 1) + kept
+        else:
+            counters[0] += 1
+    return decisions
+
+def score(events, truth, decisions):
+    alerts = sum(truth)
+    caught = sum(1 for t, d in zip(truth, decisions) if t and d)
+    false = sum(1 for t, d in zip(truth, decisions) if d and not t)
+    # A burst counts when the exact count alerts inside it and so does the encoding
+    alerting = {burst for (_, burst), t in zip(events, truth) if t and burst is not None}
+    found = {burst for (_, burst), t, d in zip(events, truth, decisions) if t and d and burst is not None}
+    return caught / max(alerts, 1), len(found) / max(len(alerting), 1), false
+
+def monitor_size(limit, timeframe, buckets):
+    rule = {"detection": {"selection": {"EventID": 4625}, "timeframe": f"{timeframe}s",
+                          "condition": f"selection | count() > {limit}"}}
+    rml = RefactoredTranspiler(count_buckets=buckets).transpile(rule)
+    return len(rml[rml.index("Monitor<"):])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=20, help="count() > limit")
+    parser.add_argument("--timeframe", type=int, default=300, help="window in seconds")
+    parser.add_argument("--bursts", type=int, default=2000, help="bursts in the stream")
+    parser.add_argument("--buckets", default="2,4,8,16,32", help="bucket counts to compare, comma separated")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    window_ms = args.timeframe * 1000
+    events = make_stream(args.bursts, args.limit, window_ms, random.Random(args.seed))
+    truth = exact(events, args.limit, window_ms)
+    print(f"{len(events)} matching events, {sum(truth)} exact alerts, limit {args.limit}, timeframe {args.timeframe}s")
+
+    encodings = [("tumbling", 2, 0, tumbling(events, args.limit, window_ms))]
+    for buckets in (int(b) for b in args.buckets.split(",")):
+        encodings.append((f"sliding/{buckets}", buckets + 1, buckets, sliding(events, args.limit, window_ms, buckets)))
+
+    print(f"{'encoding':<12}{'state':>7}{'rml bytes':>11}{'events':>9}{'bursts':>9}{'false':>7}")
+    for name, state, buckets, decisions in encodings:
+        events_recall, bursts_recall, false = score(events, truth, decisions)
+        size = monitor_size(args.limit, args.timeframe, buckets)
+        print(f"{name:<12}{state:>7}{size:>11}{events_recall:>9.1%}{bursts_recall:>9.1%}{false:>7}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark list value compression
+
+Transpiles synthetic rules with large value lists (event ID ranges with a few
+stragglers, scattered IDs, and file hashes) and compares the generated RML
+with the plain alternation written before compression:
+
+- output size: bytes of the whole RML and of the largest event type line;
+- matching cost: comparisons per event and time per event for a linear
+  alternation check (how the runtime walks "a | b | c") against the guard
+  of the compressed form (ranges first, then the remaining literals), over
+  a mix of matching and non-matching events.
+
+Usage (from backend/):
+    python benchmarks/bench_value_lists.py [--size 1000] [--events 20000] [--seed 7]
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.core.transpiler_refactored import RefactoredTranspiler
+from app.core.value_sets import compress_values
+
+def plain_alternation(values):
+    # The formatting used before compression: every value, as listed
+    if all(isinstance(v, str) for v in values):
+        return " | ".join(f"'{v}'" for v in values)
+    return " | ".join(str(v) for v in values)
+
+def make_cases(size, rng):
+    runs = []
+    start = 1000
+    while len(runs) < size:
+        length = rng.randint(20, 200)
+        runs.extend(range(start, start + length))
+        start += length + rng.randint(5, 50)
+    ids = runs[:size] + rng.sample(range(100000, 200000), size // 50)
+    rng.shuffle(ids)
+    return {
+        "event id ranges": ids,
+        "scattered event ids": rng.sample(range(1, 10 * size), size),
+        "file hashes": [f"{rng.getrandbits(128):032x}" for _ in range(size)],
+    }
+
+def linear_match(values):
+    def match(value):
+        comparisons = 0
+        for candidate in values:
+            comparisons += 1
+            if value == candidate:
+                return True, comparisons
+        return False, comparisons
+    return match
+
+def guard_match(value_set):
+    ranges, literals = value_set.ranges, value_set.literals
+    def match(value):
+        comparisons = 0
+        for low, high in ranges:
+            comparisons += 2
+            if low <= value <= high:
+                return True, comparisons
+        for candidate in literals:
+            comparisons += 1
+            if value == candidate:
+                return True, comparisons
+        return False, comparisons
+    return match
+
+def measure(match, events):
+    comparisons = 0
+    start = time.perf_counter()
+    for value in events:
+        comparisons += match(value)[1]
+    elapsed = time.perf_counter() - start
+    return comparisons / len(events), elapsed / len(events) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000, help="values per list")
+    parser.add_argument("--events", type=int, default=20000, help="events matched per case")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    transpiler = RefactoredTranspiler()
+    print(f"{'case':<22}{'plain bytes':>13}{'compressed':>12}{'ratio':>8}"
+          f"{'cmp/event':>19}{'us/event':>19}")
+    for name, values in make_cases(args.size, rng).items():
+        rule = {"detection": {"selection": {"EventID": values}, "condition": "selection"}}
+        compressed_rml = transpiler.transpile(rule)
+        value_set = compress_values(values)
+        plain_line = f"safe_selection not matches {{eventid: {plain_alternation(values)}}};"
+        compressed_line = next(line for line in compressed_rml.splitlines() if line.startswith("safe_selection"))
+        plain_size = len(compressed_rml) - len(compressed_line) + len(plain_line)
+
+        # Half the events match, half do not
+        if isinstance(values[0], str):
+            misses = [f"{rng.getrandbits(128):032x}" for _ in range(args.events // 2)]
+        else:
+            misses = [rng.randint(-10 * args.size, -1) for _ in range(args.events // 2)]
+        events = [rng.choice(values) for _ in range(args.events - len(misses))] + misses
+        rng.shuffle(events)
+
+        plain_cmp, plain_us = measure(linear_match(values), events)
+        guard_cmp, guard_us = measure(guard_match(value_set), events)
+        print(f"{name:<22}{plain_size:>13}{len(compressed_rml):>12}{len(compressed_rml) / plain_size:>8.2f}"
+              f"{plain_cmp:>9.1f} ->{guard_cmp:>7.1f}{plain_us:>9.2f} ->{guard_us:>7.2f}")
+        print(f"{'':<22}{len(value_set.ranges)} ranges, {len(value_set.literals)} literals")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Memory soak test
+
+Drives a long mix of transpile, upload, translate, view and delete calls
+through the app in-process (in a scratch directory) and samples RSS and
+tracemalloc's traced memory as it goes. Uploads cycle through a fixed number
+of file slots, so the legitimate working set stays constant: after warmup,
+memory should plateau. The run fails (exit code 1) if RSS or traced memory
+grows past the thresholds, and prints the allocation sites that grew most.
+
+Every call is a distinct rule (event IDs change with the iteration), so
+per-rule state that is never released shows up as growth.
+
+Usage (from backend/):
+    python benchmarks/soak_memory.py [--iterations 200000] [--slots 50] [--sample-every 5000]
+        [--max-rss-growth-mb 32] [--max-traced-growth-mb 8] [--frames 1] [--no-tracemalloc]
+        [--report soak.json] [--keep]
+"""
+
+import sys
+import os
+import argparse
+import gc
+import glob
+import json
+import shutil
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+UPLOAD_TEMPLATE = """title: Soak Rule {slot}
+logsource:
+  product: windows
+  service: security
+detection:
+  selection:
+    EventID: {event_id}
+    Image|endswith: '\\\\soak{slot}.exe'
+  filter:
+    LogonType|gte: {threshold}
+  condition: selection and not filter
+"""
+
+def load_rules():
+    rules = []
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, "uploaded_files", "**", "*.yml"), recursive=True)):
+        with open(path, "r", encoding="utf-8") as f:
+            rules.append(f.read())
+    return rules
+
+def vary(rule, i):
+    # A distinct rule per call without changing its shape
+    return rule.replace("title:", f"# soak {i}\ntitle:", 1).replace("4624", str(4624 + i % 100000), 1)
+
+class Soak:
+    def __init__(self, client, rules, slots):
+        self.client = client
+        self.rules = rules
+        self.slots = slots
+        self.uploaded = set()
+        self.failures = 0
+
+    def check(self, response, *expected):
+        if response.status_code not in expected:
+            self.failures += 1
+            if self.failures <= 5:
+                print(f"  unexpected {response.status_code} for {response.request.method} {response.request.url.path}: {response.text[:200]}")
+
+    def step(self, i):
+        op = i % 5
+        slot = (i // 5) % self.slots
+        filename = f"soak_{slot}.yml"
+        if op in (0, 1):
+            rule = vary(self.rules[i % len(self.rules)], i)
+            self.check(self.client.post("/transpile/", data={"sigma_text": rule}), 200)
+        elif op == 2:
+            if filename in self.uploaded:
+                self.check(self.client.delete(f"/files/{filename}"), 200)
+            content = UPLOAD_TEMPLATE.format(slot=slot, event_id=4000 + i % 100000, threshold=i % 10)
+            self.check(self.client.post("/upload/", files={"file": (filename, content.encode("utf-8"))}), 200)
+            self.uploaded.add(filename)
+        elif op == 3:
+            self.check(self.client.post(f"/translate/{filename}"), 200)
+        else:
+            self.check(self.client.get(f"/files/{filename}/rml"), 200)
+
+def sample(i, started):
+    from app.utils.memory import rss_bytes, tracing_status
+    gc.collect()
+    status = tracing_status()
+    return {
+        "iteration": i,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "rss_bytes": rss_bytes(),
+        "traced_bytes": status.get("traced_bytes"),
+    }
+
+def mb(value):
+    return value / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--warmup", type=int, default=None, help="iterations before the baseline (default: 5%% of the run, at least one slot cycle)")
+    parser.add_argument("--slots", type=int, default=50, help="distinct uploaded files, reused cyclically")
+    parser.add_argument("--sample-every", type=int, default=5000)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=32.0)
+    parser.add_argument("--max-traced-growth-mb", type=float, default=8.0)
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc traceback depth")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="only sample RSS (runs several times faster)")
+    parser.add_argument("--top", type=int, default=10, help="allocation sites to print")
+    parser.add_argument("--report", help="write samples and top growth sites as JSON")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+
+    rules = load_rules()
+    if not rules:
+        print("No rules found under uploaded_files")
+        return 1
+    warmup = args.warmup if args.warmup is not None else max(args.iterations // 20, args.slots * 5 * 2)
+    report_path = os.path.abspath(args.report) if args.report else None
+
+    # The app keeps its registry, uploads and job database relative to cwd
+    origin = os.getcwd()
+    scratch = tempfile.mkdtemp(prefix="sigma2rml-soak-")
+    os.chdir(scratch)
+    try:
+        return run(args, rules, warmup, scratch, report_path)
+    finally:
+        os.chdir(origin)
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+def run(args, rules, warmup, scratch, report_path):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.utils.memory import start_tracing, top_allocations
+
+    print(f"Soak: {args.iterations} calls after {warmup} warmup, {args.slots} slots, scratch dir {scratch}")
+    samples = []
+    with TestClient(app) as client:
+        soak = Soak(client, rules, args.slots)
+        started = time.perf_counter()
+        for i in range(warmup):
+            soak.step(i)
+
+        # Baseline once caches, pools and the registry have reached their working set
+        if not args.no_tracemalloc:
+            start_tracing(args.frames)
+        samples.append(sample(0, started))
+        baseline = samples[0]
+        for i in range(1, args.iterations + 1):
+            soak.step(warmup + i)
+            if i % args.sample_every == 0 or i == args.iterations:
+                current = sample(i, started)
+                samples.append(current)
+                traced = current["traced_bytes"]
+                print(f"  {i:>8} calls  {current['elapsed_s']:>8.1f}s  "
+                      f"RSS {mb(current['rss_bytes']):8.1f} MB ({mb(current['rss_bytes'] - baseline['rss_bytes']):+.1f})"
+                      + (f"  traced {mb(traced):7.2f} MB ({mb(traced - baseline['traced_bytes']):+.2f})" if traced is not None else ""))
+
+        growth_sites = [] if args.no_tracemalloc else top_allocations(args.top, "lineno", since_baseline=True)
+
+    final = samples[-1]
+    rss_growth = mb(final["rss_bytes"] - baseline["rss_bytes"])
+    traced_growth = None if final["traced_bytes"] is None else mb(final["traced_bytes"] - baseline["traced_bytes"])
+
+    if growth_sites:
+        print("Top growth since baseline:")
+        for site in growth_sites:
+            print(f"  {site['size_diff_bytes'] / 1024:+10.1f} KiB {site['count_diff']:+8d} blocks  {site['file']}:{site['line']}")
+
+    failed = []
+    if soak.failures:
+        failed.append(f"{soak.failures} unexpected responses")
+    if rss_growth > args.max_rss_growth_mb:
+        failed.append(f"RSS grew {rss_growth:.1f} MB (limit {args.max_rss_growth_mb:.1f})")
+    if traced_growth is not None and traced_growth > args.max_traced_growth_mb:
+        failed.append(f"traced memory grew {traced_growth:.2f} MB (limit {args.max_traced_growth_mb:.2f})")
+
+    print(f"RSS growth:    {rss_growth:+.1f} MB (limit {args.max_rss_growth_mb:.1f})")
+    if traced_growth is not None:
+        print(f"Traced growth: {traced_growth:+.2f} MB (limit {args.max_traced_growth_mb:.2f})")
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"samples": samples, "growth_sites": growth_sites, "failures": failed}, f, indent=2)
+
+    if failed:
+        print("FAIL: " + "; ".join(failed))
+        return 1
+    print("PASS")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
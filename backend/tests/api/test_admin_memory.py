@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the memory introspection admin endpoint
+- Disabled unless configured
+- RSS and GC counters always, allocation sites while tracemalloc is tracing
+- Growth since the baseline points at the allocating line
+"""
+
+import sys
+import os
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import pytest
+from fastapi.testclient import TestClient
+from app import config
+from app.main import app
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_ENABLED", True)
+    client = TestClient(app)
+    yield client
+    client.delete("/admin/memory/tracing")
+
+def test_admin_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_ENABLED", False)
+    client = TestClient(app)
+    assert client.get("/admin/memory").status_code == 403
+    assert client.post("/admin/memory/tracing").status_code == 403
+
+def test_memory_report_without_tracing(client):
+    client.delete("/admin/memory/tracing")
+    response = client.get("/admin/memory")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["rss_bytes"] > 0
+    assert len(body["gc"]["counts"]) == 3
+    assert body["tracemalloc"] == {"tracing": False, "top": []}
+
+def test_allocation_sites(client):
+    """A deliberate leak shows up as the top growth site"""
+    print("=== Memory Allocation Sites Test ===")
+    status = client.post("/admin/memory/tracing", params={"frames": 2}).json()
+    assert status["tracing"] and status["frames"] == 2
+    assert tracemalloc.is_tracing()
+
+    leak = [bytearray(1024) for _ in range(2000)]
+
+    top = client.get("/admin/memory", params={"limit": 5}).json()["tracemalloc"]["top"]
+    assert 0 < len(top) <= 5
+    assert all({"file", "line", "size_bytes", "count"} <= set(site) for site in top)
+
+    grown = client.get("/admin/memory", params={"since_baseline": "true"}).json()["tracemalloc"]["top"][0]
+    assert grown["file"] == __file__ and grown["size_diff_bytes"] >= 2000 * 1024
+    print(f"PASS top growth {grown['size_diff_bytes']} bytes at line {grown['line']}")
+
+    traceback = client.get("/admin/memory", params={"group_by": "traceback", "limit": 1}).json()["tracemalloc"]["top"][0]
+    assert 1 <= len(traceback["traceback"]) <= 2
+    del leak
+
+    assert client.get("/admin/memory", params={"group_by": "module"}).status_code == 400
+    assert client.get("/admin/memory", params={"limit": 0}).status_code == 400
+    assert client.delete("/admin/memory/tracing").json() == {"tracing": False}
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test admission control and load shedding
+- Requests beyond the limit wait in a bounded FIFO queue
+- A full queue or a queue timeout fails fast with 503 and Retry-After
+- Queue depth and wait times are reported
+"""
+
+import sys
+import os
+import asyncio
+import threading
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import transpile
+from app.utils.admission import AdmissionController, transpile_admission
+
+SIGMA_RULE = """title: Admission Rule
+logsource:
+  product: windows
+detection:
+  selection:
+    EventID: 4625
+  condition: selection
+"""
+
+def test_bounded_queue_sheds_load():
+    """One running, one queued, the next is rejected; the queued one runs after release"""
+    print("=== Admission Queue Test ===")
+    controller = AdmissionController("test", limit=1, queue_size=1, queue_timeout=5)
+
+    async def scenario():
+        started = await controller.acquire()
+        queued = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+        assert controller.snapshot()["queue_depth"] == 1
+
+        with pytest.raises(HTTPException) as rejected:
+            await controller.acquire()
+        assert rejected.value.status_code == 503
+        assert int(rejected.value.headers["Retry-After"]) >= 1
+
+        controller.release(started)
+        controller.release(await queued)
+
+    asyncio.run(scenario())
+    stats = controller.snapshot()
+    assert stats["admitted"] == 2 and stats["rejected"] == 1 and stats["queued"] == 1
+    assert stats["active"] == 0 and stats["queue_depth"] == 0
+    assert stats["wait_seconds_total"] > 0
+    print(f"PASS {stats}")
+
+def test_queue_timeout_and_cancellation():
+    controller = AdmissionController("test", limit=1, queue_size=4, queue_timeout=0.05)
+
+    async def scenario():
+        started = await controller.acquire()
+        with pytest.raises(HTTPException) as timed_out:
+            await controller.acquire()
+        assert timed_out.value.status_code == 503
+
+        cancelled = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.sleep(0.01)
+        assert controller.snapshot()["queue_depth"] == 0
+
+        controller.release(started)
+
+    asyncio.run(scenario())
+    stats = controller.snapshot()
+    assert stats["timed_out"] == 1 and stats["active"] == 0
+
+def test_transpile_endpoint_returns_503_when_saturated(monkeypatch):
+    """A saturated transpile endpoint answers 503 with Retry-After instead of piling up work"""
+    monkeypatch.setattr(transpile_admission, "_limit", 1)
+    monkeypatch.setattr(transpile_admission, "_queue_size", 0)
+    release = threading.Event()
+    entered = threading.Event()
+    original = transpile._transpile
+
+    def slow_transpile(sigma_rule, compact=False):
+        entered.set()
+        release.wait(5)
+        return original(sigma_rule, compact)
+    monkeypatch.setattr(transpile, "_transpile", slow_transpile)
+
+    client = TestClient(app)
+    responses = []
+    first = threading.Thread(target=lambda: responses.append(client.post("/transpile/", data={"sigma_text": SIGMA_RULE})))
+    first.start()
+    assert entered.wait(5)
+
+    shed = client.post("/transpile/", data={"sigma_text": SIGMA_RULE.replace("4625", "4624")})
+    assert shed.status_code == 503
+    assert "Retry-After" in shed.headers
+
+    release.set()
+    first.join(5)
+    assert responses[0].status_code == 200
+    assert client.get("/stats").json()["admission"]["transpile"]["rejected"] >= 1
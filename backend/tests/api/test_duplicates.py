@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test canonical conditions and duplicate detection
+- Operand order, parentheses, De Morgan and quantifiers normalize away
+- Selection names, key order, list order and timeframe units do not change the fingerprint
+- /files/duplicates groups uploads that are the same detection
+- Fingerprints stored by an older canonical form are computed again
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.canonical import FINGERPRINT_VERSION, canonical_condition, rule_fingerprint
+from app.storage.db import get_file_record, update_file_record
+
+SELECTIONS = ["a", "b", "c", "selection1", "selection2"]
+
+RULE_A = """title: Failed Logons
+logsource:
+  product: windows
+  service: security
+detection:
+  selection:
+    EventID: 4625
+    LogonType: [3, 10]
+  filter:
+    User: SYSTEM
+  timeframe: 1m
+  condition: selection and not filter
+"""
+
+RULE_B = """title: Brute Force Attempt
+description: Same rule, spelled differently
+logsource:
+  service: security
+  product: windows
+detection:
+  noise:
+    User: SYSTEM
+  failed:
+    LogonType: [10, 3]
+    EventID: 4625
+  timeframe: 60s
+  condition: not (noise or not failed)
+"""
+
+RULE_C = """title: Successful Logons
+logsource:
+  product: windows
+  service: security
+detection:
+  selection:
+    EventID: 4624
+  condition: selection
+"""
+
+def test_canonical_condition():
+    equal = [
+        ("a and b", "(b) and a"),
+        ("not (a or b)", "not a and not b"),
+        ("not not a", "a"),
+        ("a and (b and c) and a", "c and b and a"),
+        ("all of selection*", "selection2 and selection1"),
+        ("not (all of selection*)", "not selection1 or not selection2"),
+    ]
+    for left, right in equal:
+        assert canonical_condition(left, SELECTIONS) == canonical_condition(right, SELECTIONS)
+    assert canonical_condition("a and b", SELECTIONS) != canonical_condition("a or b", SELECTIONS)
+    with pytest.raises(ValueError):
+        canonical_condition("", SELECTIONS)
+
+def test_rule_fingerprint():
+    import yaml
+    rule_a, rule_b, rule_c = (yaml.safe_load(rule) for rule in (RULE_A, RULE_B, RULE_C))
+    assert rule_fingerprint(rule_a) == rule_fingerprint(rule_b)
+    assert rule_fingerprint(rule_a) != rule_fingerprint(rule_c)
+    # A different window is a different rule
+    rule_b["detection"]["timeframe"] = "5m"
+    assert rule_fingerprint(rule_a) != rule_fingerprint(rule_b)
+    with pytest.raises(ValueError):
+        rule_fingerprint({"title": "no detection"})
+
+def test_duplicates_endpoint(tmp_path, monkeypatch):
+    print("=== Duplicate Rules Test ===")
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    for name, rule in [("failed_logons.yml", RULE_A), ("brute_force.yml", RULE_B), ("logons.yml", RULE_C)]:
+        assert client.post("/upload/", files={"file": (name, rule.encode("utf-8"))}).status_code == 200
+
+    response = client.get("/files/duplicates")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["checked"] == 3 and report["total"] == 1
+    cluster = report["clusters"][0]
+    assert cluster["count"] == 2
+    assert {f["filename"] for f in cluster["files"]} == {"failed_logons.yml", "brute_force.yml"}
+    print(f"PASS {cluster['count']} files share fingerprint {cluster['fingerprint'][:16]}")
+
+def test_older_fingerprints_are_recomputed(tmp_path, monkeypatch):
+    """A fingerprint stored by another canonical form version is not trusted"""
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    for name, rule in [("failed_logons.yml", RULE_A), ("brute_force.yml", RULE_B)]:
+        assert client.post("/upload/", files={"file": (name, rule.encode("utf-8"))}).status_code == 200
+    current = get_file_record("brute_force.yml")["fingerprint"]
+    assert get_file_record("brute_force.yml")["fingerprint_version"] == FINGERPRINT_VERSION
+
+    # Stored before versions existed, and by an older version
+    update_file_record("failed_logons.yml", fingerprint="0" * 64, fingerprint_version=None)
+    update_file_record("brute_force.yml", fingerprint="1" * 64, fingerprint_version="1")
+
+    report = client.get("/files/duplicates").json()
+    assert report["total"] == 1 and report["clusters"][0]["fingerprint"] == current
+    for name in ("failed_logons.yml", "brute_force.yml"):
+        record = get_file_record(name)
+        assert (record["fingerprint"], record["fingerprint_version"]) == (current, FINGERPRINT_VERSION)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test streaming export of translated rules
+- zip, tar and ndjson formats
+- manifest with source hashes and transpiler version
+- since= and filenames= filters
+"""
+
+import sys
+import os
+import io
+import json
+import tarfile
+import time
+import zipfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.translation import get_transpiler
+from app.core.transpiler_refactored import TRANSPILER_VERSION
+
+FILENAME = "file_access_win_susp_credential_manager_access.yml"
+RML_NAME = "file_access_win_susp_credential_manager_access.rml"
+
+client = TestClient(app)
+
+def test_export_zip():
+    """The zip export contains the manifest and every translated rule"""
+    print("=== Export zip Test ===")
+
+    response = client.get("/files/export?format=zip")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    names = archive.namelist()
+    assert names[0] == "manifest.json"
+    assert RML_NAME in names
+
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["transpiler_version"] == TRANSPILER_VERSION
+    assert manifest["transpiler_options"] == get_transpiler().output_options()
+    rule = next(r for r in manifest["rules"] if r["filename"] == FILENAME)
+    assert len(rule["source_sha256"]) == 64
+
+    with open(os.path.join("translated_files", RML_NAME), "rb") as f:
+        assert archive.read(RML_NAME) == f.read()
+    print(f"PASS zip export with {manifest['count']} rules")
+
+def test_export_tar():
+    """The tar export is readable as a stream"""
+    print("=== Export tar Test ===")
+
+    response = client.get("/files/export?format=tar")
+    assert response.status_code == 200
+
+    archive = tarfile.open(fileobj=io.BytesIO(response.content), mode="r|")
+    names = [member.name for member in archive]
+    assert names[0] == "manifest.json"
+    assert RML_NAME in names
+    print("PASS tar export")
+
+def test_export_ndjson_filters():
+    """NDJSON export honors the filenames and since filters"""
+    print("=== Export ndjson Test ===")
+
+    response = client.get(f"/files/export?format=ndjson&filenames={FILENAME}")
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "manifest"
+    assert [line["filename"] for line in lines[1:]] == [FILENAME]
+    assert lines[1]["rml"].startswith("logsource")
+
+    future = time.time() + 3600
+    response = client.get(f"/files/export?format=ndjson&since={future}")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["count"] == 0 and len(lines) == 1
+    print("PASS ndjson filters")
+
+def test_export_rejects_bad_input():
+    """Unknown formats and malformed timestamps are rejected"""
+    assert client.get("/files/export?format=rar").status_code == 400
+    assert client.get("/files/export?since=yesterday").status_code == 400
+
+if __name__ == "__main__":
+    test_export_zip()
+    test_export_tar()
+    test_export_ndjson_filters()
+    test_export_rejects_bad_input()
@@ -14,7 +14,7 @@ def test_path_resolution():
     print("=== Testing Path Resolution ===")
     
     try:
-        from app.api.files import resolve_path, normalize_path
+        from app.storage.layout import resolve_path, normalize_path
         
         # Test path normalization
         test_paths = [
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test on-demand request profiling
+- Disabled unless configured, unknown dump formats rejected
+- Per-stage wall/CPU breakdown and hot functions in the response
+- pstats and speedscope dumps written to the profile directory
+"""
+
+import sys
+import os
+import json
+import pstats
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app import config
+from app.main import app
+
+SIGMA_RULE = """title: Profiled Rule
+logsource:
+  product: windows
+detection:
+  selection:
+    EventID: 4688
+    Image|endswith: '\\\\cmd.exe'
+  condition: selection
+"""
+
+def _profile(client, **params):
+    response = client.post("/transpile/", data={"sigma_text": SIGMA_RULE}, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_profiling_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_ENABLED", False)
+    client = TestClient(app)
+    response = client.post("/transpile/", data={"sigma_text": SIGMA_RULE}, params={"profile": "true"})
+    assert response.status_code == 403
+
+    # Plain requests are unaffected
+    response = client.post("/transpile/", data={"sigma_text": SIGMA_RULE})
+    assert response.status_code == 200
+    assert "profile" not in response.json()
+
+def test_transpile_profile_breakdown(monkeypatch):
+    """The response carries stage timings and the hottest functions"""
+    print("=== Transpile Profile Test ===")
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    client = TestClient(app)
+
+    body = _profile(client, profile="true")
+    assert body["rml"] == client.post("/transpile/", data={"sigma_text": SIGMA_RULE}).json()["rml"]
+    report = body["profile"]
+    assert report["profiler"] == "cProfile"
+    assert report["wall_ms"] > 0
+
+    stages = {entry["stage"]: entry for entry in report["stages"]}
+    for name in ("yaml_load", "simplify_condition", "selection_generation", "monitor_generation"):
+        assert stages[name]["calls"] >= 1
+        assert stages[name]["wall_ms"] >= 0 and stages[name]["cpu_ms"] >= 0
+    assert sum(entry["wall_ms"] for entry in report["stages"]) <= report["wall_ms"]
+
+    hot = report["hot_functions"]
+    assert hot and len(hot) <= 15
+    assert [entry["own_ms"] for entry in hot] == sorted((entry["own_ms"] for entry in hot), reverse=True)
+    assert any("transpile" in entry["function"] for entry in hot) or any("yaml" in entry["file"] for entry in hot)
+    print(f"PASS {len(stages)} stages, top function {hot[0]['function']}")
+
+def test_profile_dumps(tmp_path, monkeypatch):
+    """pstats and speedscope files load with their usual tools"""
+    print("=== Profile Dump Test ===")
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path / "profiles"))
+    client = TestClient(app)
+
+    report = _profile(client, profile="true", profile_dump="pstats")["profile"]
+    assert os.path.dirname(report["dump_path"]) == str(tmp_path / "profiles")
+    stats = pstats.Stats(report["dump_path"])
+    assert stats.total_calls > 0
+
+    report = _profile(client, profile_dump="speedscope")["profile"]
+    assert report["profiler"] == "evented"
+    assert report["hot_functions"]
+    with open(report["dump_path"], encoding="utf-8") as f:
+        speedscope = json.load(f)
+    assert speedscope["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+    frames = speedscope["shared"]["frames"]
+    events = speedscope["profiles"][0]["events"]
+    # Every frame opened is closed, in stack order, with non-decreasing timestamps
+    stack, last = [], 0
+    for event in events:
+        assert event["at"] >= last and 0 <= event["frame"] < len(frames)
+        last = event["at"]
+        if event["type"] == "O":
+            stack.append(event["frame"])
+        else:
+            assert stack.pop() == event["frame"]
+    assert not stack
+    print(f"PASS speedscope profile with {len(frames)} frames and {len(events)} events")
+
+    response = client.post("/transpile/", data={"sigma_text": SIGMA_RULE}, params={"profile_dump": "svg"})
+    assert response.status_code == 400
+
+def test_translate_profile(tmp_path, monkeypatch):
+    """Profiling a file translation also covers reading and writing"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    client = TestClient(app)
+    assert client.post("/upload/", files={"file": ("profiled_rule.yml", SIGMA_RULE.encode("utf-8"))}).status_code == 200
+
+    response = client.post("/translate/profiled_rule.yml", params={"profile": "true"})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["rml_path"]
+    stages = {entry["stage"] for entry in body["profile"]["stages"]}
+    assert {"yaml_load", "monitor_generation"} <= stages
+
+    assert client.post("/translate/missing.yml", params={"profile": "true"}).status_code == 404
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test raw file and RML download endpoints
+- Strong ETags and If-None-Match
+- Range requests
+- gzip negotiation
+"""
+
+import sys
+import os
+import gzip
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.file_responses import negotiate_encoding, etag_matches
+
+FILENAME = "file_access_win_susp_credential_manager_access.yml"
+RML_PATH = "translated_files/file_access_win_susp_credential_manager_access.rml"
+
+client = TestClient(app)
+
+def test_raw_rml_etag_roundtrip():
+    """Unchanged RML answers 304 to a matching If-None-Match"""
+    print("=== Raw RML ETag Test ===")
+
+    response = client.get(f"/files/{FILENAME}/rml/raw", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    with open(RML_PATH, "rb") as f:
+        assert response.content == f.read()
+
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith('W/')
+    print(f"PASS ETag: {etag}")
+
+    cached = client.get(f"/files/{FILENAME}/rml/raw", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    print("PASS If-None-Match returns 304")
+
+def test_raw_rml_range():
+    """Range requests return the requested bytes only"""
+    print("=== Raw RML Range Test ===")
+
+    response = client.get(f"/files/{FILENAME}/rml/raw", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    with open(RML_PATH, "rb") as f:
+        assert response.content == f.read()[:10]
+    assert response.headers["content-range"].startswith("bytes 0-9/")
+    print("PASS Range bytes=0-9 returns 206")
+
+def test_raw_file_gzip():
+    """Clients accepting gzip get a compressed body with its own ETag"""
+    print("=== Raw File gzip Test ===")
+
+    response = client.get(f"/files/{FILENAME}/raw", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert "Accept-Encoding" in response.headers["vary"]
+
+    # The bytes on the wire are gzip, not just the body httpx decodes
+    with client.stream("GET", f"/files/{FILENAME}/raw", headers={"Accept-Encoding": "gzip"}) as raw:
+        compressed = b"".join(raw.iter_raw())
+    with open(os.path.join("uploaded_files", FILENAME), "rb") as f:
+        original = f.read()
+    assert gzip.decompress(compressed) == original
+    assert response.content == original
+    print("PASS gzip-encoded download decodes to the original file")
+
+def test_raw_missing_file():
+    """Unknown files return 404"""
+    response = client.get("/files/does_not_exist.yml/rml/raw")
+    assert response.status_code == 404
+
+def test_negotiation_helpers():
+    """Accept-Encoding and If-None-Match parsing"""
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert etag_matches('W/"abc", "def"', {'"abc"'})
+    assert etag_matches("*", {'"abc"'})
+    assert not etag_matches('"abc"', {'"abd"'})
+    print("PASS negotiation helpers")
+
+if __name__ == "__main__":
+    test_raw_rml_etag_roundtrip()
+    test_raw_rml_range()
+    test_raw_file_gzip()
+    test_raw_missing_file()
+    test_negotiation_helpers()
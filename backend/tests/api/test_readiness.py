@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test the readiness endpoint
+- Pool utilization, queue depth, cache, registry latency and transpile p95
+- 503 while saturated or warming up
+- Answers from memory, without touching the filesystem
+"""
+
+import sys
+import os
+import builtins
+import threading
+import time
+from collections import deque
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app.main import app, readiness_check
+from app.core.metrics import Window
+from app.jobs.queue import JobQueue
+from app.jobs.worker import current_runner
+from app.utils.admission import transpile_admission
+
+SIGMA_RULE = """title: Ready Rule
+detection:
+  selection:
+    EventID: 4624
+  condition: selection
+"""
+
+def test_window_percentile():
+    window = Window(size=100)
+    assert window.percentile(0.95) is None
+    for value in range(1, 201):
+        window.observe(value)
+    # Only the last 100 observations count
+    assert len(window) == 100
+    assert window.percentile(0.95) == 195
+    assert window.percentile(0.5) == 150
+
+def test_queue_tracks_pending_items(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.submit(["a.yml", "b.yml", "c.yml"])
+    assert queue.queued == 3
+    queue.claim()
+    assert queue.queued == 2
+    queue.cancel(job_id)
+    assert queue.queued == 0
+    # A second handle on the same file starts from the database
+    queue.submit(["d.yml"])
+    assert JobQueue(str(tmp_path / "jobs.db")).queued == 1
+
+def test_ready_report(tmp_path, monkeypatch):
+    """A fresh worker is ready and reports what it has seen"""
+    print("=== Readiness Report Test ===")
+    monkeypatch.chdir(tmp_path)
+    with TestClient(app) as client:
+        client.post("/transpile/", data={"sigma_text": SIGMA_RULE})
+        client.post("/upload/", files={"file": ("ready_rule.yml", SIGMA_RULE.encode("utf-8"))})
+        client.get("/files/ready_rule.yml/rml")
+
+        response = client.get("/ready")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["ready"] and body["reasons"] == []
+        assert set(body["workers"]["admission"]) == {"transpile", "translate", "upload"}
+        assert body["workers"]["translate"]["alive"] == body["workers"]["translate"]["size"]
+        assert body["queue"]["admission_waiting"] == 0
+        assert body["cache"]["warm"]
+        assert {"read", "durable_write"} <= set(body["registry"]["latency_ms"])
+        assert body["transpile"]["samples"] >= 1 and body["transpile"]["p95_ms"] > 0
+        print(f"PASS transpile p95 {body['transpile']['p95_ms']} ms, registry {body['registry']['latency_ms']}")
+
+def test_ready_without_filesystem(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with TestClient(app):
+        def refuse(*args, **kwargs):
+            raise AssertionError("readiness touched the filesystem")
+        with monkeypatch.context() as patched:
+            patched.setattr(builtins, "open", refuse)
+            patched.setattr(os, "stat", refuse)
+            patched.setattr(os.path, "exists", refuse)
+            start = time.perf_counter()
+            response = readiness_check()
+            elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert elapsed < 0.05
+
+def test_not_ready_when_saturated(tmp_path, monkeypatch):
+    """A full transpile queue takes the worker out of rotation"""
+    monkeypatch.chdir(tmp_path)
+    with TestClient(app) as client:
+        monkeypatch.setattr(transpile_admission, "_limit", 2)
+        monkeypatch.setattr(transpile_admission, "_queue_size", 8)
+        monkeypatch.setattr(transpile_admission, "active", 2)
+        monkeypatch.setattr(transpile_admission, "waiters", deque([object()] * 4))
+
+        response = client.get("/ready")
+        assert response.status_code == 503
+        body = response.json()
+        assert body["reasons"] == ["transpile saturated"]
+        assert body["workers"]["admission"]["transpile"]["utilization"] == 1.0
+        assert body["queue"]["admission_waiting"] == 4
+
+        monkeypatch.setattr(transpile_admission, "waiters", deque([object()] * 3))
+        assert client.get("/ready").status_code == 200
+
+def test_not_ready_while_warming_up(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with TestClient(app) as client:
+        runner = current_runner()
+        # Park every worker inside claim so none can see the queue empty meanwhile
+        parked = threading.Semaphore(0)
+        release = threading.Event()
+        def gated_claim():
+            parked.release()
+            release.wait()
+            return None
+        monkeypatch.setattr(runner.queue, "claim", gated_claim)
+        runner.notify()
+        for _ in range(runner.workers):
+            assert parked.acquire(timeout=10)
+
+        with runner.lock:
+            runner.warming = True
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["reasons"] == ["warming up"]
+        assert not response.json()["cache"]["warm"]
+
+        # The flag clears once a worker finds the queue empty
+        release.set()
+        deadline = time.monotonic() + 10
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
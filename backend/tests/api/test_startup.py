@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test cold start
+- Importing app.main stays within the import-time budget
+- Heavy modules (yaml, profilers, tracemalloc, archives, sqlite) load on first use
+- Importing has no filesystem side effects
+- The pre-fork warmup freezes a warm heap without opening files or threads
+"""
+
+import sys
+import os
+import gc
+import json
+import subprocess
+import threading
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app.core import metrics
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+# Milliseconds spent importing app.main once FastAPI itself is loaded
+IMPORT_BUDGET_MS = float(os.environ.get("SIGMA2RML_IMPORT_BUDGET_MS", "250"))
+
+LAZY_MODULES = ("yaml", "cProfile", "pstats", "tracemalloc", "tarfile", "sqlite3")
+
+MEASURE = f"""
+import json, os, sys, time
+sys.path.insert(0, {BACKEND_DIR!r})
+import fastapi, fastapi.responses, fastapi.middleware.cors, starlette.concurrency, pydantic
+before = set(sys.modules)
+start = time.perf_counter()
+import app.main
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    "elapsed_ms": elapsed,
+    "loaded": sorted(m for m in {LAZY_MODULES!r} if m in sys.modules and m not in before),
+    "created": sorted(os.listdir(".")),
+}}))
+"""
+
+def _measure(cwd):
+    output = subprocess.run([sys.executable, "-c", MEASURE], cwd=cwd, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def test_import_time_budget(tmp_path):
+    """Best of three cold imports, in an empty working directory"""
+    print("=== Import Time Test ===")
+    runs = [_measure(tmp_path) for _ in range(3)]
+    for run in runs:
+        assert run["loaded"] == [], f"imported eagerly: {run['loaded']}"
+        assert run["created"] == [], f"created at import: {run['created']}"
+    best = min(run["elapsed_ms"] for run in runs)
+    print(f"PASS app.main imported in {best:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    assert best <= IMPORT_BUDGET_MS
+
+def test_prefork_warmup(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from app.main import prefork_warmup
+    threads = threading.active_count()
+    counted = dict(metrics.rules_processed.values)
+    try:
+        prefork_warmup()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+    assert "yaml" in sys.modules
+    assert threading.active_count() == threads
+    assert os.listdir(tmp_path) == []
+    # Warmup rules are not counted as traffic
+    assert metrics.rules_processed.values == counted
+    assert metrics.enabled
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test single-flight coalescing of concurrent transpile requests
+- Identical concurrent calls share one execution
+- A cancelled caller doesn't cancel the shared computation
+- Errors reach every waiter and free the key
+"""
+
+import sys
+import os
+import asyncio
+import threading
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import yaml
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.singleflight import SingleFlight, rule_key
+
+SIGMA_RULE = """title: Coalesced Rule
+logsource:
+  product: windows
+  service: security
+detection:
+  selection:
+    EventID: 4625
+  condition: selection
+"""
+
+def _blocking(release, calls):
+    def compute(value):
+        calls.append(value)
+        release.wait(5)
+        return value.upper()
+    return compute
+
+def test_rule_key_ignores_formatting():
+    reformatted = "# comment\n" + SIGMA_RULE.replace("4625", "'4625'").replace("EventID: '4625'", "EventID:   4625")
+    assert rule_key(yaml.safe_load(SIGMA_RULE)) == rule_key(yaml.safe_load(reformatted))
+    assert rule_key(yaml.safe_load(SIGMA_RULE)) != rule_key(yaml.safe_load(SIGMA_RULE.replace("4625", "4624")))
+
+def test_concurrent_calls_share_one_execution():
+    """A burst of identical calls runs once per distinct key"""
+    print("=== Single-Flight Burst Test ===")
+    flight, release, calls = SingleFlight(), threading.Event(), []
+    compute = _blocking(release, calls)
+
+    async def burst():
+        tasks = [asyncio.create_task(flight.do("a", compute, "rule a")) for _ in range(10)]
+        tasks.append(asyncio.create_task(flight.do("b", compute, "rule b")))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(burst())
+    assert results == ["RULE A"] * 10 + ["RULE B"]
+    assert sorted(calls) == ["rule a", "rule b"]
+    stats = flight.snapshot()
+    assert stats["executions"] == 2 and stats["coalesced"] == 9 and stats["inflight"] == 0
+    print(f"PASS 11 calls, {stats['executions']} executions")
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+    compute = _blocking(release, calls)
+
+    async def scenario():
+        first = asyncio.create_task(flight.do("a", compute, "rule a"))
+        second = asyncio.create_task(flight.do("a", compute, "rule a"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        result = await second
+        return first, result
+
+    first, result = asyncio.run(scenario())
+    assert first.cancelled()
+    assert result == "RULE A" and calls == ["rule a"]
+    assert flight.snapshot()["cancelled"] == 1
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing(value):
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        tasks = [asyncio.create_task(flight.do("a", failing, "x")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    stats = flight.snapshot()
+    assert stats["executions"] == 1 and stats["errors"] == 1 and stats["inflight"] == 0
+
+def test_transpile_endpoint_reports_coalescing():
+    client = TestClient(app)
+    response = client.post("/transpile/", data={"sigma_text": SIGMA_RULE})
+    assert response.status_code == 200
+    assert response.json()["rml"]
+    assert client.get("/stats").json()["transpile_coalescing"]["calls"] >= 1
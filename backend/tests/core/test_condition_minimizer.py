@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test condition minimization
+- Minimized formulas are equivalent to the condition (exhaustive truth tables)
+- Absorption, duplicates from quantifier expansion, tautologies and contradictions
+- The monitor only changes when the minimized condition is smaller
+- Conditions over budget or nested past the recursion limit are left as written
+"""
+
+import sys
+import os
+import itertools
+import random
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app.core.condition_minimizer import minimize_condition, to_condition
+from app.core.transpiler_refactored import RefactoredTranspiler
+
+SELECTIONS = ["a", "b", "c", "d", "e"]
+
+def evaluate(formula, env):
+    if isinstance(formula, bool):
+        return formula
+    if isinstance(formula, str):
+        return env[formula]
+    if formula.operator == "not":
+        return not evaluate(formula.operands[0], env)
+    results = [evaluate(operand, env) for operand in formula.operands]
+    return all(results) if formula.operator == "and" else any(results)
+
+def random_condition(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(SELECTIONS)
+    operator = rng.choice(["and", "or", "not"])
+    if operator == "not":
+        return f"not ({random_condition(rng, depth - 1)})"
+    return f"({random_condition(rng, depth - 1)} {operator} {random_condition(rng, depth - 1)})"
+
+def test_minimized_is_equivalent():
+    rng = random.Random(43)
+    for _ in range(500):
+        minimized = minimize_condition(random_condition(rng, 4), SELECTIONS)
+        assert minimized.literals <= minimized.original_literals or not minimized.reduced
+        for values in itertools.product([False, True], repeat=len(SELECTIONS)):
+            env = dict(zip(SELECTIONS, values))
+            assert evaluate(minimized.original, env) == evaluate(minimized.formula, env)
+
+def test_minimize_condition():
+    cases = {
+        "a or (a and b)": "a",
+        "a and b and a": "a and b",
+        "a and b or a and c or a and d": "a and (b or c or d)",
+        "a and (b or not b)": "a",
+    }
+    for condition, expected in cases.items():
+        minimized = minimize_condition(condition, SELECTIONS)
+        assert to_condition(minimized.formula) == expected and minimized.reduced
+    assert minimize_condition("a and not a", SELECTIONS).constant is False
+    assert minimize_condition("a or not a", SELECTIONS).constant is True
+    # Already minimal: nothing to gain
+    assert not minimize_condition("(a or b) and (c or d)", SELECTIONS).reduced
+    # Not a plain boolean condition
+    assert minimize_condition("a | count() > 5", SELECTIONS) is None
+    assert minimize_condition("1 of them", SELECTIONS) is None
+
+def test_absorbed_selection_dropped():
+    """A selection absorbed by another disappears from event types and monitor"""
+    print("=== Condition Minimization Test ===")
+    sigma = {
+        'detection': {
+            'selection': {'EventID': 4688},
+            'filter': {'Image': 'C:\\Windows\\explorer.exe'},
+            'condition': 'selection or (selection and not filter)'
+        }
+    }
+    result = RefactoredTranspiler().transpile(sigma)
+    assert "safe_filter" not in result
+    assert result.endswith("Monitor = safe_selection*;")
+    print("PASS", result.splitlines()[-1])
+
+def test_quantifier_duplicates():
+    sigma = {
+        'detection': {
+            'selection1': {'EventID': 1},
+            'selection2': {'EventID': 2},
+            'condition': 'all of selection* and selection1'
+        }
+    }
+    result = RefactoredTranspiler().transpile(sigma)
+    assert result.endswith("Monitor = (safe_selection1 \\/ safe_selection2)*;")
+    assert "always" not in result
+
+def test_contradiction_flagged():
+    sigma = {
+        'detection': {
+            'selection': {'EventID': 1},
+            'condition': 'selection and not selection'
+        }
+    }
+    assert "// condition is always false" in RefactoredTranspiler().transpile(sigma)
+
+def test_nested_formula_monitor():
+    sigma = {
+        'detection': {**{name: {'EventID': i} for i, name in enumerate("abcd")},
+                      'condition': 'a and b or a and c or a and d'}
+    }
+    result = RefactoredTranspiler().transpile(sigma)
+    assert result.endswith("Monitor = (safe_a \\/ (safe_b /\\ safe_c /\\ safe_d))*;")
+
+def test_product_of_sums_over_budget():
+    print("=== Minimization Budget Test ===")
+    # (a0 or b0) and ... and (a19 or b19) has 2^20 cubes in sum-of-products form
+    clauses = 20
+    detection = {f"{side}{i}": {'EventID': i} for i in range(clauses) for side in "ab"}
+    detection['condition'] = " and ".join(f"(a{i} or b{i})" for i in range(clauses))
+    start = time.perf_counter()
+    assert minimize_condition(detection['condition'], [name for name in detection if name != 'condition']) is None
+    result = RefactoredTranspiler().transpile({'detection': detection})
+    elapsed = time.perf_counter() - start
+    assert "Error" not in result and "safe_a19" in result
+    assert elapsed < 2
+    # Small products are still minimized (and kept as written, being smaller)
+    assert minimize_condition("(a or b) and (c or d)", SELECTIONS).original_literals == 4
+    print(f"PASS {clauses} clauses in {elapsed * 1000:.0f}ms")
+
+def test_deep_condition_skips_minimization():
+    # The simplifier is stack-based; minimization must not turn a raised depth limit into a RecursionError
+    depth = 500
+    sigma = {
+        'detection': {
+            'selection': {'EventID': 1},
+            'filter': {'EventID': 2},
+            'condition': "(" * depth + "selection" + ")" * depth + " and not filter"
+        }
+    }
+    result = RefactoredTranspiler(max_condition_depth=depth + 100).transpile(sigma)
+    assert not result.startswith("// Error")
+    assert "safe_filter" in result
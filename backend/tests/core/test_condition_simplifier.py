@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test condition preprocessing
+- De Morgan rewriting through nested groups
+- Calls such as count() stay as written
+- Length, depth and balance errors, without recursion on deep nesting
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import pytest
+from app.core.transpiler_refactored import ConditionSimplifier, RefactoredTranspiler
+
+def test_simplify_condition():
+    simplifier = ConditionSimplifier()
+    cases = {
+        "not (a or b)": "(not a and not b)",
+        "not(a or b)": "(not a and not b)",
+        "a and (b and c)": "a and b and c",
+        "not (a and (b or c))": "(not a or (not b and not c))",
+        "(a)  and  (a)": "(a) and (a)",
+        "selection | count() > 5": "selection | count() > 5",
+    }
+    for condition, expected in cases.items():
+        assert simplifier.simplify_condition(condition) == expected
+
+def test_limits():
+    simplifier = ConditionSimplifier(max_depth=3, max_length=40)
+    assert simplifier.simplify_condition("((a and b))") == "((a and b))"
+    with pytest.raises(ValueError, match="deeper than 3 levels"):
+        simplifier.simplify_condition("((((a))))")
+    with pytest.raises(ValueError, match="too long"):
+        simplifier.simplify_condition("a or " * 10 + "b")
+    for unbalanced in ("(a and b", "a and b)", "(a))("):
+        with pytest.raises(ValueError, match="Unbalanced"):
+            simplifier.simplify_condition(unbalanced)
+
+def test_deep_nesting_without_recursion():
+    print("=== Deep Condition Test ===")
+    depth = 5 * sys.getrecursionlimit()
+    condition = "(" * depth + "a or b" + ")" * depth
+    simplified = ConditionSimplifier(max_depth=depth).simplify_condition("not " + condition)
+    assert simplified == "(" * depth + "not a and not b" + ")" * depth
+    print(f"PASS {depth} levels")
+
+def test_transpile_rejects_deep_condition():
+    sigma = {
+        'detection': {
+            'selection': {'EventID': 1},
+            'condition': "(" * 100 + "selection" + ")" * 100
+        }
+    }
+    result = RefactoredTranspiler(max_condition_depth=10).transpile(sigma)
+    assert result == "// Error during transpilation: Condition nests parentheses deeper than 10 levels"
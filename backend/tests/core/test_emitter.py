@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test the streaming RML emitter
+- Pretty mode writes statements as given, lines separated by newlines
+- Compact mode drops comments and blank lines, puts each statement on one line and shortens internal names
+- The source map leads from each compact line and short name back to the pretty layout
+- Transpiling straight to a file or a response gives the same text as transpile()
+"""
+
+import sys
+import os
+import io
+import re
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.emitter import render
+from app.core.transpiler_refactored import RefactoredTranspiler
+
+TEMPORAL_RULE = {
+    'logsource': {'product': 'windows'},
+    'detection': {
+        'selection1': {'EventID': 4625, 'Image': 'C:\\Program  Files\\app.exe'},
+        'selection2': {'EventID': 4624},
+        'timeframe': '5m',
+        'condition': 'selection1 and selection2'
+    }
+}
+
+# Ten selections in one window: one monitor case per selection
+WIDE_RULE = {'detection': {f'selection{i}': {'EventID': i} for i in range(1, 11)}}
+WIDE_RULE['detection'].update(timeframe='5m', condition=' and '.join(f'selection{i}' for i in range(1, 11)))
+
+# A field named like an event type stays a field name
+BASIC_RULE = {
+    'detection': {
+        'selection': {'EventID': 4624, 'safe_filter': 'x'},
+        'filter': {'User': 'SYSTEM'},
+        'condition': 'selection and not filter'
+    }
+}
+
+class CountingSink(io.StringIO):
+    """Counts write calls, to see output arrive in pieces"""
+    writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+def produce(out):
+    out.comment("event types")
+    out.line("a matches {x: 'two  spaces // kept'}; // trailing note")
+    out.blank()
+    with out.statement():
+        out.write("Monitor =\n    ")
+        out.write("a*")
+        out.write(";")
+
+def test_pretty_and_compact():
+    assert render(produce) == "// event types\na matches {x: 'two  spaces // kept'}; // trailing note\n\nMonitor =\n    a*;"
+    assert render(produce, compact=True) == "a matches {x: 'two  spaces // kept'};\nMonitor = a*;"
+
+def test_transpile_to_sink(tmp_path):
+    print("=== RML Emitter Test ===")
+    transpiler = RefactoredTranspiler()
+    expected = transpiler.transpile(TEMPORAL_RULE)
+
+    sink = CountingSink()
+    assert transpiler.transpile_to(WIDE_RULE, sink)
+    assert sink.getvalue() == transpiler.transpile(WIDE_RULE)
+    # The monitor is written case by case, not as one string
+    assert sink.writes > 2 * len(WIDE_RULE['detection'])
+
+    path = tmp_path / "rule.rml"
+    with open(path, "w", encoding="utf-8") as f:
+        assert transpiler.transpile_to(TEMPORAL_RULE, f)
+    assert path.read_text(encoding="utf-8") == expected
+    print(f"PASS {len(sink.getvalue())} characters in {sink.writes} writes")
+
+def test_compact_transpile():
+    transpiler = RefactoredTranspiler()
+    compact = transpiler.transpile(TEMPORAL_RULE, compact=True)
+    lines = compact.splitlines()
+    assert not any(line.startswith("//") or not line for line in lines)
+    assert all(line.endswith(";") for line in lines)
+    assert "image: 'C:\\Program  Files\\app.exe'" in compact
+    assert lines[-1].startswith("M0<start_ts, s1, s2> = { let ts; e0(ts) (")
+    assert "Main = logsource >> M0<0, 0>!;" in lines
+    assert len(compact) < len(transpiler.transpile(TEMPORAL_RULE))
+
+def test_source_map():
+    transpiler = RefactoredTranspiler()
+    for rule in (TEMPORAL_RULE, WIDE_RULE, BASIC_RULE):
+        pretty = transpiler.transpile(rule).split("\n")
+        compact, source_map = transpiler.transpile_with_source_map(rule)
+        compact_lines = compact.split("\n")
+        assert source_map["version"] == 1
+        assert len(source_map["lines"]) == len(compact_lines)
+        names = source_map["names"]
+        for line, (first, last) in zip(compact_lines, source_map["lines"]):
+            # Putting the names back gives the pretty lines, up to whitespace and comments
+            original = " ".join(pretty[first - 1:last]).split(" //")[0]
+            restored = re.sub(r"\w+", lambda word: names.get(word.group(), word.group()), line)
+            assert "".join(original.split()) == "".join(restored.split())
+    compact, source_map = transpiler.transpile_with_source_map(BASIC_RULE)
+    assert "e0 not matches {eventid: 4624, safe_filter: 'x'};" in compact
+    assert source_map["names"] == {"M0": "Monitor", "e0": "safe_selection", "e1": "safe_filter"}
+    error, source_map = transpiler.transpile_with_source_map({'detection': {'condition': '(x'}})
+    assert error.startswith("// Error during transpilation") and source_map == {}
+
+def test_streamed_error():
+    sink = io.StringIO()
+    rule = {'detection': {'selection': {'EventID': 1}, 'condition': '(selection'}}
+    assert not RefactoredTranspiler().transpile_to(rule, sink)
+    assert sink.getvalue().startswith("// Error during transpilation: Unbalanced parentheses")
+
+def test_transpile_endpoint_compact():
+    sigma_text = "detection:\n  selection:\n    EventID: 4624\n  condition: selection\n"
+    response = TestClient(app).post("/transpile/?compact=true", data={"sigma_text": sigma_text})
+    assert response.status_code == 200
+    rml, source_map = RefactoredTranspiler().transpile_with_source_map(
+        {'detection': {'selection': {'EventID': 4624}, 'condition': 'selection'}}
+    )
+    assert response.json()["rml"] == rml
+    assert response.json()["source_map"] == source_map
+    pretty = TestClient(app).post("/transpile/", data={"sigma_text": sigma_text}).json()
+    assert "source_map" not in pretty
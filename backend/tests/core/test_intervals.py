@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test numeric bound merging
+- Bounds on one field merge into one interval, redundant bounds are dropped
+- One variable per field, a single-value interval becomes a literal
+- Contradictory bounds are flagged as never matching
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import pytest
+from app.core.intervals import merge_bounds
+from app.core.transpiler_refactored import RefactoredTranspiler
+
+def transpile_selection(fields):
+    sigma = {
+        'logsource': {'product': 'windows', 'service': 'security'},
+        'detection': {'selection': fields, 'condition': 'selection'}
+    }
+    return RefactoredTranspiler().transpile(sigma).splitlines()[4]
+
+def test_merge_bounds():
+    interval = merge_bounds([("gte", 5), ("gt", 3), ("lte", 10), ("lt", 10), ("gte", 5)])
+    assert interval.constraints("x1") == ["x1 >= 5", "x1 < 10"]
+    assert not interval.is_empty() and interval.point() is None
+
+    assert merge_bounds([("gte", 5), ("gt", 5)]).constraints("x1") == ["x1 > 5"]
+    assert merge_bounds([("gte", 7), ("lte", 7)]).point() == 7
+    assert merge_bounds([("gt", 7), ("lte", 7)]).is_empty()
+    assert merge_bounds([("gte", 10), ("lt", 5)]).is_empty()
+    # Floats are not rounded: there is room between 4 and 5
+    assert not merge_bounds([("gt", 4), ("lt", 5)]).is_empty()
+
+def test_unsupported_bound():
+    with pytest.raises(ValueError):
+        merge_bounds([("contains", 5)])
+
+def test_one_variable_per_field():
+    """Two modifiers on one field used to overwrite each other"""
+    print("=== Interval Merge Test ===")
+    line = transpile_selection({'EventID': 4625, 'Count|gte': 5, 'Count|lte': 10, 'Count|gt': 2, 'Port|lt': 1024})
+    assert line == "safe_selection not matches {eventid: 4625, count: x1, port: x2} with x1 >= 5 and x1 <= 10 and x2 < 1024;"
+    print("PASS", line)
+
+def test_single_value_interval():
+    line = transpile_selection({'Count|gte': 5, 'Count|lte': 5, 'Size|gt': 0})
+    assert line == "safe_selection not matches {count: 5, size: x1} with x1 > 0;"
+
+def test_empty_interval_flagged():
+    line = transpile_selection({'Count|gte': 10, 'Count|lt': 5})
+    assert line == "safe_selection not matches {count: x1} with x1 >= 10 and x1 < 5; // never matches: empty range for count"
+
+def test_temporal_bounds():
+    sigma = {
+        'detection': {
+            'selection': {'EventID': 4625, 'Count|gt': 1, 'Count|lt': 100},
+            'timeframe': '1m',
+            'condition': 'selection | count() > 5'
+        }
+    }
+    result = RefactoredTranspiler().transpile(sigma)
+    assert "timed_selection(ts) matches {timestamp: ts, eventid: 4625, count: x1} with x1 > 1 and x1 < 100;" in result
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test keyed count monitors
+- count() by field binds the key and keeps <key, start, count> per slot
+- count(field) and count(distinct field) keep the values seen per slot
+- A field the selection already constrains is bound once, its value moving to the guard
+- Above the distinct cap every matching event is counted, with a warning
+- Slots idle for a timeframe are recycled; the state does not grow with keys
+- The AST parser and the canonical form keep the field and the group key
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app.core.ast.condition_parser import ConditionParser
+from app.core.canonical import canonical_condition
+from app.core.keyed_count import CountAggregation, parse_count
+from app.core.transpiler_refactored import RefactoredTranspiler
+
+BY_USER_RULE = {
+    'detection': {
+        'selection': {'EventID': 4625},
+        'timeframe': '5m',
+        'condition': 'selection | count() by TargetUserName > 5'
+    }
+}
+
+DISTINCT_BY_HOST_RULE = {
+    'detection': {
+        'selection': {'EventID': 4625},
+        'timeframe': '5m',
+        'condition': 'selection | count(distinct Workstation) by host >= 3'
+    }
+}
+
+PORT_SCAN_RULE = {
+    'detection': {
+        'selection': {'EventID': 3},
+        'timeframe': '1m',
+        'condition': 'selection | count(DstPort) > 2'
+    }
+}
+
+def test_parse_count():
+    assert parse_count('selection | count() > 5') == CountAggregation()
+    assert not parse_count('selection | count() > 5').keyed
+    assert parse_count('selection | count() by TargetUserName > 5') == CountAggregation(None, 'TargetUserName')
+    assert parse_count('selection | count(distinct user) by host >= 3') == CountAggregation('user', 'host')
+    assert parse_count('selection | count(DstPort) < 3') == CountAggregation('DstPort', None)
+    assert parse_count('selection and not filter') is None
+
+def test_count_by_key():
+    print("=== Keyed Count Test ===")
+    rml = RefactoredTranspiler(count_keys=2).transpile(BY_USER_RULE)
+    assert "timed_selection(ts, key) matches {timestamp: ts, eventid: 4625, targetusername: key};" in rml
+    assert "Main = logsource >> Monitor<0, 0, 0, 0, 0, 0>!;" in rml
+    assert "Monitor<k1, t1, n1, k2, t2, n2> =" in rml
+    # The key's own open window, then the first slot idle for a timeframe, then the last slot
+    assert "if (ts - t2 <= 300000 && key == k2) (if (n2+1 > 5) safe_selection else Monitor<k1, t1, n1, k2, t2, n2+1>)" in rml
+    assert "else if (ts - t1 > 300000) (if (1 > 5) safe_selection else Monitor<key, ts, 1, k2, t2, n2>)" in rml
+    assert "else (if (1 > 5) safe_selection else Monitor<k1, t1, n1, key, ts, 1>)" in rml
+    assert "{let ts; timed_other_events(ts) Monitor<k1, t1, n1, k2, t2, n2>};" in rml
+    print(f"PASS {len(rml)} characters with 2 keys")
+
+def test_distinct_count_by_key():
+    rml = RefactoredTranspiler(count_keys=2).transpile(DISTINCT_BY_HOST_RULE)
+    assert "timed_selection(ts, key, value) matches {timestamp: ts, eventid: 4625, host: key, workstation: value};" in rml
+    assert "Monitor<k1, t1, n1, v1_1, v1_2, k2, t2, n2, v2_1, v2_2> =" in rml
+    # A value already seen leaves the slot as it is; a new one goes first
+    assert ("(if (value == v1_1 || value == v1_2) Monitor<k1, t1, n1, v1_1, v1_2, k2, t2, n2, v2_1, v2_2> "
+            "else (if (n1+1 > 2) safe_selection else Monitor<k1, t1, n1+1, value, v1_1, k2, t2, n2, v2_1, v2_2>))") in rml
+    assert "Monitor<key, ts, 1, value, 0, k2, t2, n2, v2_1, v2_2>" in rml
+
+    unkeyed = RefactoredTranspiler().transpile(PORT_SCAN_RULE)
+    assert "timed_selection(ts, value) matches {timestamp: ts, eventid: 3, dstport: value};" in unkeyed
+    assert "Main = logsource >> Monitor<0, 0, 0, 0>!;" in unkeyed
+    assert "else (if (1 > 2) safe_selection else Monitor<ts, 1, value, 0>)" in unkeyed
+
+def test_constrained_field_is_bound_once():
+    by_bob = {'detection': {**BY_USER_RULE['detection'], 'selection': {'EventID': 4625, 'TargetUserName': 'bob'}}}
+    rml = RefactoredTranspiler().transpile(by_bob)
+    assert "timed_selection(ts, key) matches {timestamp: ts, eventid: 4625, targetusername: key} with key == 'bob';" in rml
+    assert "safe_selection not matches {eventid: 4625, targetusername: 'bob'};" in rml
+
+    rml = RefactoredTranspiler().transpile({'detection': {**PORT_SCAN_RULE['detection'],
+                                                          'selection': {'EventID': 3, 'DstPort|lt': 1024}}})
+    assert "timed_selection(ts, value) matches {timestamp: ts, eventid: 3, dstport: value} with value < 1024;" in rml
+
+def test_distinct_cap_counts_every_event():
+    assert "timed_selection(ts, key, value) matches" in RefactoredTranspiler(count_max_distinct=2).transpile(DISTINCT_BY_HOST_RULE)
+
+    transpiler = RefactoredTranspiler(count_keys=2, count_max_distinct=1)
+    fallback = transpiler.transpile(DISTINCT_BY_HOST_RULE)
+    assert "// warning: count(Workstation) limit is above 1 distinct values, every matching event is counted" in fallback
+    assert "timed_selection(ts, key) matches {timestamp: ts, eventid: 4625, host: key};" in fallback
+    assert "Main = logsource >> Monitor<0, 0, 0, 0, 0, 0>!;" in fallback
+    assert "(if (n1+1 > 2) safe_selection else Monitor<k1, t1, n1+1, k2, t2, n2>)" in fallback
+
+    port_scan = transpiler.transpile(PORT_SCAN_RULE)
+    assert not port_scan.startswith("// Error")
+    assert "Main = logsource >> Monitor<0, 0>!;" in port_scan
+
+def test_state_is_bounded_by_keys():
+    # The state depends on the slots only: plain count() is unchanged and keyed rules are not packed
+    transpiler = RefactoredTranspiler(count_keys=4)
+    short = transpiler.transpile({'detection': {**BY_USER_RULE['detection'], 'timeframe': '10s'}})
+    long = transpiler.transpile({'detection': {**BY_USER_RULE['detection'], 'timeframe': '24h',
+                                               'condition': 'selection | count() by TargetUserName > 50000'}})
+    assert short.count("Monitor<") == long.count("Monitor<")
+    plain = {'detection': {**BY_USER_RULE['detection'], 'condition': 'selection | count() > 5'}}
+    assert "Monitor<start_ts, count> =" in transpiler.transpile(plain)
+    assert transpiler.monitor_shape(BY_USER_RULE) is None
+
+def test_ast_keeps_aggregation():
+    parser = ConditionParser(['selection'])
+    node = parser.parse('selection | count(distinct Workstation) by host > 5').condition_node
+    assert (node.count, node.field, node.group_by) == (5, 'Workstation', 'host')
+    assert node.to_rml() == "temporal_count(selection, 5, 10s, distinct=Workstation, by=host)"
+    assert parser.parse('selection | count() > 5').condition_node.to_rml() == "temporal_count(selection, 5, 10s)"
+    # Counting per user and counting overall are different conditions
+    assert canonical_condition('selection | count() by user > 5', ['selection']) != \
+        canonical_condition('selection | count() > 5', ['selection'])
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test rule packs with shared monitors
+- count and near rules instantiate one parametric monitor per shape
+- Pack size grows by a few short lines per rule, not a monitor per rule
+- Other rules are reported as unpacked; /files/pack packs uploaded rules
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.pack import build_pack
+from app.core.transpiler_refactored import MonitorShape, RefactoredTranspiler
+
+FAILED_LOGONS_RULE = {
+    'logsource': {'product': 'windows', 'service': 'security'},
+    'detection': {
+        'selection': {'EventID': 4625},
+        'timeframe': '5m',
+        'condition': 'selection | count() >= 10'
+    }
+}
+
+FEW_LOGONS_RULE = {
+    'logsource': {'product': 'windows', 'service': 'security'},
+    'detection': {
+        'selection': {'EventID': 4700},
+        'timeframe': '1h',
+        'condition': 'selection | count() < 3'
+    }
+}
+
+NEAR_RULE = {
+    'detection': {
+        'logon': {'EventID': 4624},
+        'privilege': {'EventID': 4672},
+        'timeframe': '30s',
+        'condition': 'logon | near privilege'
+    }
+}
+
+BASIC_RULE = {'detection': {'selection': {'EventID': 1}, 'condition': 'selection'}}
+
+def test_monitor_shape():
+    transpiler = RefactoredTranspiler()
+    at_most = {**FAILED_LOGONS_RULE, 'detection': {**FAILED_LOGONS_RULE['detection'],
+                                                   'condition': 'selection | count() <= 10'}}
+    assert transpiler.monitor_shape(FAILED_LOGONS_RULE) == MonitorShape('count', ['selection'], 300000, ('>', 9))
+    assert transpiler.monitor_shape(at_most).comparison == ('<', 11)
+    assert transpiler.monitor_shape(NEAR_RULE) == MonitorShape('near', ['logon', 'privilege'], 30000)
+    assert transpiler.monitor_shape(BASIC_RULE) is None
+
+def test_pack_shares_monitors():
+    rules = [("near.yml", NEAR_RULE), ("basic.yml", BASIC_RULE)]
+    rules += [(f"count{i}.yml", {**FAILED_LOGONS_RULE, 'detection': {**FAILED_LOGONS_RULE['detection'],
+                                                                   'selection': {'EventID': 4600 + i},
+                                                                   'condition': f'selection | count() > {i + 1}'}})
+              for i in range(3)]
+    rules.append(("fewer.yml", FEW_LOGONS_RULE))
+    rml, report = build_pack(rules)
+    assert report["rules"] == 5
+    assert report["templates"] == {"Near": 1, "CountAbove": 3, "CountBelow": 1}
+    assert report["unpacked"] == [{"name": "basic.yml", "reason": "No shared monitor for this condition"}]
+    # One monitor definition per shape, one instantiation per rule
+    assert rml.count("CountAbove<rule, window, limit, start_ts, count> =") == 1
+    assert rml.count("Near<rule, window, start_ts, s1, s2> =") == 1
+    # The near rule has no logsource and gets the default one, the same as the count rules
+    assert rml.count(" matches {product: 'windows', service: 'security'};") == 1
+    assert "Rule0 = source0 >> Near<0, 30000, 0, 0, 0>!; // near.yml" in rml
+    assert "Rule2 = source0 >> CountAbove<2, 300000, 2, 0, 0>!; // count1.yml" in rml
+    assert "Rule4 = source0 >> CountBelow<4, 3600000, 3, 0, 0>!; // fewer.yml" in rml
+    assert "count_hit(ts, rule) matches {timestamp: ts, eventid: 4601} with rule == 2;" in rml
+    assert "near_second(ts, rule) matches {timestamp: ts, eventid: 4672} with rule == 0;" in rml
+    assert rml.endswith("Main = Rule0 /\\ Rule1 /\\ Rule2 /\\ Rule3 /\\ Rule4;")
+    assert build_pack([("basic.yml", BASIC_RULE)])[0] == ""
+
+def test_pack_size_grows_per_shape():
+    print("=== Rule Pack Test ===")
+    transpiler = RefactoredTranspiler()
+    sizes = {}
+    for rules in (10, 200):
+        pack = [(f"rule{i}.yml", {**FAILED_LOGONS_RULE, 'detection': {**FAILED_LOGONS_RULE['detection'],
+                                                                    'selection': {'EventID': 4000 + i},
+                                                                    'condition': f'selection | count() > {i % 50 + 1}'}})
+                for i in range(rules)]
+        standalone = sum(len(transpiler.transpile(rule)) for _, rule in pack)
+        sizes[rules] = (len(build_pack(pack, transpiler=transpiler)[0]), standalone)
+    per_rule = (sizes[200][0] - sizes[10][0]) / 190
+    standalone_per_rule = sizes[200][1] / 200
+    assert per_rule < standalone_per_rule / 3
+    print(f"PASS {per_rule:.0f} bytes per packed rule, {standalone_per_rule:.0f} standalone")
+
+def test_pack_endpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    rules = {
+        "failed.yml": "detection:\n  selection:\n    EventID: 4625\n  timeframe: 5m\n  condition: selection | count() > 5\n",
+        "logon.yml": "detection:\n  selection:\n    EventID: 4624\n  condition: selection\n",
+    }
+    for name, text in rules.items():
+        assert client.post("/upload/", files={"file": (name, text.encode("utf-8"))}).status_code == 200
+
+    response = client.get("/files/pack", params={"compact": "true"})
+    assert response.status_code == 200
+    pack = response.json()
+    assert pack["packed"] == ["failed.yml"] and pack["templates"] == {"CountAbove": 1}
+    assert [entry["name"] for entry in pack["unpacked"]] == ["logon.yml"]
+    assert "//" not in pack["rml"] and pack["output_length"] == len(pack["rml"])
@@ -363,6 +363,28 @@ def test_de_morgan_simplification():
     print("Match:", "✅ PASS" if all_found else "❌ FAIL")
     return all_found
 
+def test_variable_numbering_is_per_rule():
+    """A reused transpiler numbers variables from x1 for every rule"""
+    print("\n--- Test Variable Numbering Per Rule ---")
+    
+    sigma = {
+        'detection': {
+            'selection': {'EventID': 4663, 'ObjectNumber|lte': 100},
+            'condition': 'selection'
+        }
+    }
+    
+    transpiler = RefactoredTranspiler()
+    first = transpiler.transpile(sigma)
+    second = transpiler.transpile(sigma)
+    
+    print("Generated:", second)
+    assert "objectnumber: x1} with x1 <= 100;" in first
+    assert second == first
+    assert transpiler.variable_counter == 2
+    print("Match: ✅ PASS")
+    return True
+
 def run_all_tests():
     """Run all test cases"""
     print("TEST: Refactored Transpiler Test Suite")
@@ -377,7 +399,8 @@ def run_all_tests():
         test_basic_example_9,
         test_basic_example_11,
         test_basic_example_26,
-        test_de_morgan_simplification
+        test_de_morgan_simplification,
+        test_variable_numbering_is_per_rule
     ]
     
     passed = 0
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test sliding-window count monitors
+- count_buckets=0 keeps the tumbling <start_ts, count> monitor
+- With buckets the state is <head, c1, ..., cB>, one case per bucket shift
+- Packs use the sliding shared monitors with the bucket width as parameter
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app.core.pack import build_pack
+from app.core.sliding_count import bucket_width
+from app.core.transpiler_refactored import RefactoredTranspiler
+
+FAILED_LOGONS_RULE = {
+    'detection': {
+        'selection': {'EventID': 4625},
+        'timeframe': '5m',
+        'condition': 'selection | count() > 5'
+    }
+}
+
+def test_tumbling_by_default():
+    rml = RefactoredTranspiler().transpile(FAILED_LOGONS_RULE)
+    assert "Main = logsource >> Monitor<0, 0>!;" in rml
+    assert "Monitor<start_ts, count> =" in rml
+
+def test_sliding_monitor():
+    print("=== Sliding Count Test ===")
+    rml = RefactoredTranspiler(count_buckets=4).transpile(
+        {'detection': {**FAILED_LOGONS_RULE['detection'], 'condition': 'selection | count() >= 5'}})
+    assert "Main = logsource >> Monitor<0, 0, 0, 0, 0>!;" in rml
+    assert "Monitor<head, c1, c2, c3, c4> =" in rml
+    # Start over, same bucket, then one case per shift of 1 to 3 buckets of 75s
+    assert "if (ts - head >= 300000) (if (1 > 4) safe_selection else Monitor<ts, 1, 0, 0, 0>)" in rml
+    assert "else if (ts - head < 75000) (if (c1 + c2 + c3 + c4 + 1 > 4) safe_selection else Monitor<head, c1+1, c2, c3, c4>)" in rml
+    assert "else if (ts - head < 150000) (if (c1 + c2 + c3 + 1 > 4) safe_selection else Monitor<head + 75000, 1, c1, c2, c3>)" in rml
+    assert "else (if (c1 + 1 > 4) safe_selection else Monitor<head + 225000, 1, 0, 0, c1>)" in rml
+    assert "{let ts; timed_other_events(ts) Monitor<head, c1, c2, c3, c4>};" in rml
+
+    below = RefactoredTranspiler(count_buckets=4).transpile(
+        {'detection': {**FAILED_LOGONS_RULE['detection'], 'condition': 'selection | count() <= 3'}})
+    assert "(if (c1 + 1 < 4) safe_selection" in below
+    print(f"PASS {len(rml)} characters with 4 buckets")
+
+def test_state_is_bounded():
+    # Window length and limit change constants only, never the size of the state
+    transpiler = RefactoredTranspiler(count_buckets=8)
+    short = transpiler.transpile({'detection': {**FAILED_LOGONS_RULE['detection'], 'timeframe': '10s'}})
+    long = transpiler.transpile({'detection': {**FAILED_LOGONS_RULE['detection'], 'timeframe': '24h',
+                                               'condition': 'selection | count() > 50000'}})
+    assert short.count("Monitor<") == long.count("Monitor<")
+    assert bucket_width(86400000, 8) == 10800000
+    assert bucket_width(5, 8) == 1
+
+def test_sliding_pack():
+    transpiler = RefactoredTranspiler(count_buckets=3)
+    rule = {'detection': {**FAILED_LOGONS_RULE['detection'], 'timeframe': '90s'}}
+    rml, report = build_pack([("a.yml", rule)], transpiler=transpiler)
+    assert report["templates"] == {"SlidingCountAbove": 1}
+    assert "SlidingCountAbove<rule, width, limit, head, c1, c2, c3> =" in rml
+    assert "else if (ts - head < 2 * width) (if (c1 + c2 + 1 > limit) count_safe(rule)" in rml
+    assert "Rule0 = source0 >> SlidingCountAbove<0, 30000, 5, 0, 0, 0, 0>!; // a.yml" in rml
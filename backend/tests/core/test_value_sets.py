@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test list value compression
+- Duplicates are dropped; long lists are sorted and integer runs become range checks
+- Short lists keep their order and spelling
+- Basic, temporal and legacy AST event types stay equivalent to the plain alternation
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app.core.transpiler_refactored import RefactoredTranspiler
+from app.core.value_sets import COMPACT_SET_SIZE, compress_values, format_alternation, membership_guard
+from app.core.ast.nodes import MatchNode
+
+def test_compress_values():
+    values = list(range(4758, 4727, -1)) + [4800, 4801, 4728, "4728", "b", "a", "b"]
+    value_set = compress_values(values)
+    assert value_set.ranges == [(4728, 4758)]
+    assert value_set.literals == [4800, 4801, "4728", "a", "b"]
+    assert len(value_set.values()) == 31 + 5
+    assert membership_guard("x1", value_set) == (
+        "((x1 >= 4728 and x1 <= 4758) or x1 == 4800 or x1 == 4801 or x1 == '4728' or x1 == 'a' or x1 == 'b')"
+    )
+
+def test_short_lists_unchanged():
+    value_set = compress_values(["TargetObject", "ProcessId", "TargetObject"])
+    assert value_set.ranges == []
+    assert format_alternation(value_set.values()) == "'TargetObject' | 'ProcessId'"
+    assert format_alternation(compress_values([4728, 4729, 4730]).values()) == "4728 | 4729 | 4730"
+
+def test_large_sets_are_compact():
+    hashes = [f"{i:032x}" for i in range(COMPACT_SET_SIZE + 1)]
+    assert " | " not in format_alternation(hashes)
+    assert format_alternation(hashes).count("|") == COMPACT_SET_SIZE
+
+def test_transpiled_ranges():
+    """Event IDs collapse into one guard on a bound variable"""
+    print("=== Value Range Test ===")
+    sigma = {
+        'logsource': {'product': 'windows', 'service': 'security'},
+        'detection': {
+            'selection': {'EventID': list(range(4728, 4759)) + [1102], 'LogonType|gte': 3},
+            'condition': 'selection'
+        }
+    }
+    result = RefactoredTranspiler().transpile(sigma)
+    assert ("safe_selection not matches {eventid: x1, logontype: x2} "
+            "with ((x1 >= 4728 and x1 <= 4758) or x1 == 1102) and x2 >= 3;") in result
+    print("PASS", result.splitlines()[4])
+
+def test_temporal_ranges():
+    sigma = {
+        'detection': {
+            'selection': {'EventID': list(range(1000, 2000))},
+            'timeframe': '30s',
+            'condition': 'selection | count() > 5'
+        }
+    }
+    result = RefactoredTranspiler().transpile(sigma)
+    assert "timed_selection(ts) matches {timestamp: ts, eventid: x1} with x1 >= 1000 and x1 <= 1999;" in result
+    assert "safe_selection not matches {eventid: x1} with x1 >= 1000 and x1 <= 1999;" in result
+
+def test_match_node_ranges():
+    node = MatchNode("selection", {"EventID": list(range(10, 20)), "Count|lt": 5})
+    assert node.to_rml() == "selection matches {eventid: x1, count: x2} with x1 >= 10 && x1 <= 19 && x2 < 5;"
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test eager translation and startup warmup
+- Uploads are translated in the background and viewed from the warm output cache
+- Warmup queues records whose RML is missing or stale
+- Changing an output option (count window settings) makes translations stale
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app import config
+from app.main import app
+from app.core import translation
+from app.core.translation import is_stale, stale_filenames
+from app.storage.db import get_file_record, update_file_record
+from app.storage.layout import content_hash, resolve_path
+from app.utils.file_responses import text_cache_stats
+
+RULE_TEMPLATE = """title: Eager Rule {n}
+logsource:
+  product: windows
+  service: security
+detection:
+  selection:
+    EventID: {event_id}
+  condition: selection
+"""
+
+def _upload(client, n):
+    rule = RULE_TEMPLATE.format(n=n, event_id=4700 + n).encode("utf-8")
+    response = client.post("/upload/", files={"file": (f"eager_rule_{n}.yml", rule)})
+    assert response.status_code == 200
+    return f"eager_rule_{n}.yml"
+
+def _wait_translated(filename, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = get_file_record(filename)
+        if record and record.get("translated"):
+            return record
+        time.sleep(0.05)
+    raise AssertionError(f"{filename} was not translated")
+
+def test_upload_is_translated_eagerly(tmp_path, monkeypatch):
+    """With eager mode on, the first view is served from precomputed output"""
+    print("=== Eager Translate Test ===")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "EAGER_TRANSLATE", True)
+    client = TestClient(app)
+
+    filename = _upload(client, 0)
+    record = _wait_translated(filename)
+    assert not is_stale(record)
+    print(f"PASS translated in the background to {record['rml_path']}")
+
+    hits = text_cache_stats()["hits"]
+    response = client.get(f"/files/{filename}/rml")
+    assert response.status_code == 200
+    assert response.json()["rml"]
+    assert text_cache_stats()["hits"] == hits + 1
+    print("PASS view served from the warm cache")
+
+def test_startup_warmup_translates_stale_records(tmp_path, monkeypatch):
+    """Missing, outdated-transpiler and changed-source records are re-translated on startup"""
+    print("=== Startup Warmup Test ===")
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+
+    fresh, old_version, changed, missing = [_upload(client, n) for n in range(4)]
+    for filename in (fresh, old_version, changed):
+        assert client.post(f"/translate/{filename}").status_code == 200
+    update_file_record(old_version, transpiler_version="0.0.1")
+
+    # Source edited in place, as a re-upload would leave it
+    new_source = RULE_TEMPLATE.format(n=2, event_id=4999).encode("utf-8")
+    with open(resolve_path(get_file_record(changed)["path"]), "wb") as f:
+        f.write(new_source)
+    update_file_record(changed, sha256=content_hash(new_source))
+
+    assert sorted(stale_filenames()) == sorted([old_version, changed, missing])
+
+    monkeypatch.setattr(config, "WARMUP_ON_STARTUP", True)
+    with TestClient(app):
+        deadline = time.monotonic() + 30
+        while stale_filenames() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    assert stale_filenames() == []
+    assert get_file_record(old_version)["transpiler_version"] == get_file_record(fresh)["transpiler_version"]
+    assert get_file_record(missing)["translated"]
+    with open(resolve_path(get_file_record(changed)["rml_path"])) as f:
+        assert "4999" in f.read()
+    print("PASS warmup re-translated stale records")
+
+def test_changed_count_options_make_translations_stale(tmp_path, monkeypatch):
+    """Translations record the count settings they were made with"""
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    filename = _upload(client, 0)
+    assert client.post(f"/translate/{filename}").status_code == 200
+    assert get_file_record(filename)["transpiler_options"] == {"count_buckets": 0, "count_keys": 8, "count_max_distinct": 32}
+    assert stale_filenames() == []
+
+    # A new process with another setting; this thread's transpiler is built again from config
+    monkeypatch.setattr(config, "COUNT_BUCKETS", 4)
+    monkeypatch.setattr(translation._local, "transpiler", None, raising=False)
+    assert stale_filenames() == [filename]
+
+    assert client.post(f"/translate/{filename}").status_code == 200
+    assert get_file_record(filename)["transpiler_options"]["count_buckets"] == 4
+    assert not is_stale(get_file_record(filename))
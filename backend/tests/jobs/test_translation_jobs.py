@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Test background translation jobs
+- Submitting single files, lists and all untranslated files
+- Status polling until the job finishes
+- Cancellation and recovery of items orphaned by a dead worker
+- Server-sent progress events and bounded buffering for slow streams
+- Open streams hold no threadpool thread
+"""
+
+import sys
+import os
+import asyncio
+import json
+import time
+import anyio
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app import config
+from app.main import app
+from app.jobs.events import EventBroker, job_event_stream, job_events
+from app.jobs.queue import JobQueue, QUEUED, RUNNING, CANCELLED
+from app.jobs.worker import get_runner
+from app.storage.db import get_file_record
+
+RULE_TEMPLATE = """title: Job Rule {n}
+logsource:
+  product: windows
+  service: security
+detection:
+  selection:
+    EventID: {event_id}
+  condition: selection
+"""
+
+def _upload(client, count):
+    for n in range(count):
+        rule = RULE_TEMPLATE.format(n=n, event_id=4600 + n).encode("utf-8")
+        response = client.post("/upload/", files={"file": (f"job_rule_{n}.yml", rule)})
+        assert response.status_code == 200
+
+def _wait(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/translate/jobs/{job_id}").json()
+        if job["status"] not in (QUEUED, RUNNING):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_translate_all_untranslated(tmp_path, monkeypatch):
+    """A job over every untranslated file translates them in the background"""
+    print("=== Translation Job Test ===")
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    _upload(client, 5)
+
+    response = client.post("/translate/jobs", json={"all_untranslated": True})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["total"] == 5
+    print(f"Submitted job {job['job_id']}: {job['status']}")
+
+    job = _wait(client, job["job_id"])
+    assert job["status"] == "succeeded"
+    assert job["counts"]["succeeded"] == 5
+    for item in job["items"]:
+        assert get_file_record(item["filename"])["rml_path"] == item["rml_path"]
+    print("PASS all files translated")
+
+    # Nothing is left to translate
+    again = client.post("/translate/jobs", json={"all_untranslated": True}).json()
+    assert again["total"] == 0
+
+def test_job_reports_failed_files(tmp_path, monkeypatch):
+    """Per-file failures are reported without failing the other files"""
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    _upload(client, 1)
+    client.post("/upload/", files={"file": ("broken.yml", b"title: [unclosed")})
+
+    job = client.post("/translate/jobs", json={"filenames": ["job_rule_0.yml", "broken.yml"]}).json()
+    job = _wait(client, job["job_id"])
+    assert job["status"] == "failed"
+    statuses = {item["filename"]: item["status"] for item in job["items"]}
+    assert statuses == {"job_rule_0.yml": "succeeded", "broken.yml": "failed"}
+    assert "Invalid YAML" in job["items"][1]["error"]
+
+def test_submit_validation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    assert client.post("/translate/jobs", json={}).status_code == 400
+    assert client.post("/translate/jobs", json={"filename": "missing.yml"}).status_code == 404
+    assert client.get("/translate/jobs/unknown").status_code == 404
+    assert client.post("/translate/jobs/unknown/cancel").status_code == 404
+
+def test_cancel_queued_items(tmp_path):
+    """Cancelling a job drops the items that have not started"""
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.submit(["a.yml", "b.yml", "c.yml"])
+    item = queue.claim()
+
+    assert queue.cancel(job_id)
+    job = queue.get(job_id)
+    assert job["counts"][RUNNING] == 1 and job["counts"][CANCELLED] == 2
+    assert job["status"] == RUNNING
+
+    queue.finish(item["id"], "succeeded", result={"rml_path": "x.rml"})
+    assert queue.get(job_id)["status"] == CANCELLED
+
+def test_orphaned_items_are_requeued(tmp_path):
+    """Items left running by a dead process go back to the queue"""
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.submit(["a.yml"])
+    item = queue.claim()
+
+    with queue._write_transaction() as conn:
+        conn.execute("UPDATE job_items SET owner_pid = ? WHERE id = ?", (2 ** 22 + 1, item["id"]))
+
+    assert queue.requeue_orphans() == 1
+    assert queue.get(job_id)["status"] == QUEUED
+    assert queue.claim()["filename"] == "a.yml"
+
+def test_items_of_an_earlier_process_with_the_same_pid_are_requeued(tmp_path):
+    """After a restart the app may get its old PID back; the owner token tells the processes apart"""
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.submit(["a.yml", "b.yml"])
+    earlier = queue.claim()
+    current = queue.claim()
+
+    with queue._write_transaction() as conn:
+        conn.execute("UPDATE job_items SET owner_token = ? WHERE id = ?", ("earlier-boot", earlier["id"]))
+
+    assert queue.requeue_orphans() == 1
+    assert queue.get(job_id)["counts"][RUNNING] == 1
+    assert queue.claim()["filename"] == earlier["filename"]
+    assert queue.requeue_orphans() == 0
+    queue.finish(current["id"], "succeeded")
+
+def _parse_events(lines):
+    events, event = [], None
+    for line in lines:
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+def test_job_event_stream(tmp_path, monkeypatch):
+    """The SSE stream reports every file with timing and output hash, then the summary"""
+    print("=== Job Event Stream Test ===")
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    _upload(client, 4)
+
+    job = client.post("/translate/jobs", json={"all_untranslated": True}).json()
+    with client.stream("GET", f"/translate/jobs/{job['job_id']}/events") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse_events(response.iter_lines())
+
+    items = [data for event, data in events if event == "item"]
+    assert len(items) == 4
+    assert sorted(item["completed"] for item in items) == [1, 2, 3, 4]
+    for item in items:
+        assert item["status"] == "succeeded" and item["total"] == 4
+        assert item["duration_ms"] >= 0 and len(item["rml_sha256"]) == 64
+    assert events[-1][0] == "done" and events[-1][1]["status"] == "succeeded"
+    print(f"PASS {len(items)} item events and a done event")
+
+    assert client.get("/translate/jobs/unknown/events").status_code == 404
+
+def test_slow_stream_is_bounded(tmp_path, monkeypatch):
+    """A stream that doesn't keep up stops buffering and catches up from the queue"""
+    monkeypatch.setattr(config, "JOB_EVENTS_PUT_TIMEOUT_S", 0.01)
+    monkeypatch.setattr(config, "JOB_EVENTS_QUEUE_SIZE", 1)
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    broker = EventBroker()
+    job_id = queue.submit([f"rule_{n}.yml" for n in range(5)])
+
+    async def consume():
+        stream = job_event_stream(queue, job_id, broker=broker, keepalive=0.05)
+        assert await stream.__anext__() == ": keepalive\n\n"
+        subscription = next(iter(broker.subscriptions[job_id]))
+
+        for _ in range(5):
+            item = queue.claim()
+            broker.publish(job_id, queue.finish(item["id"], "succeeded", result={"rml_path": "x.rml"}))
+        assert subscription.events.qsize() <= 1
+        assert subscription.lagging.is_set()
+
+        return [chunk async for chunk in stream]
+
+    events = _parse_events(line for chunk in asyncio.run(consume()) for line in chunk.splitlines())
+    assert len([e for e, _ in events if e == "item"]) == 5
+    assert events[-1] == ("done", {"job_id": job_id, "status": "succeeded", "total": 5,
+                                   "counts": {"queued": 0, "running": 0, "succeeded": 5, "failed": 0, "cancelled": 0}})
+    assert job_id not in broker.subscriptions
+
+async def _get(path, disconnect=None):
+    """Start one GET through the ASGI app; returns the response once it started, and the request task"""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"host", b"testserver")], "client": ("testclient", 50000), "server": ("testserver", 80)}
+    response = {"status": None, "body": b""}
+    started = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await (disconnect or asyncio.Event()).wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            started.set()
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(started.wait(), 5)
+    return response, task
+
+def test_open_streams_do_not_block_the_threadpool(tmp_path, monkeypatch):
+    """More open streams than threadpool threads still leave room for plain endpoints"""
+    print("=== Open Streams Test ===")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "JOB_EVENTS_KEEPALIVE_S", 30.0)
+    queue = JobQueue(config.JOBS_DB_PATH)
+    job_id = queue.submit(["pending.yml"])
+    # Keep the job running for the whole test
+    item = queue.claim()
+    get_runner()
+
+    async def run(streams, threads):
+        anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+        disconnect = asyncio.Event()
+        opened = [await _get(f"/translate/jobs/{job_id}/events", disconnect) for _ in range(streams)]
+        assert all(response["status"] == 200 for response, _ in opened)
+
+        response, task = await _get(f"/translate/jobs/{job_id}")
+        await asyncio.wait_for(task, 5)
+        assert response["status"] == 200 and json.loads(response["body"])["status"] == RUNNING
+
+        disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*(task for _, task in opened)), 5)
+
+    asyncio.run(run(streams=8, threads=4))
+    assert job_id not in job_events.subscriptions
+    queue.finish(item["id"], "succeeded")
+    print("PASS 8 streams on 4 threads, plain endpoint answered, streams unsubscribed on disconnect")
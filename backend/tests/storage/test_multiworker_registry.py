@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test the multi-worker registry mode
+- Concurrent writers in separate processes don't lose records (SQLite WAL)
+- Caches in other processes are invalidated through the change feed
+- The JSON registry is imported on first start
+"""
+
+import sys
+import os
+import json
+import subprocess
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app import config
+from app.storage import db
+from app.storage.notify import ChangeFeed
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+WORKER = """
+import sys
+sys.path.insert(0, {backend!r})
+from app.storage.db import add_file_record, update_translation_status
+for i in range({count}):
+    name = f"worker{worker}_{{i}}.yml"
+    add_file_record(name, f"uploaded_files/{{name}}", title=f"Rule {worker}-{{i}}")
+    update_translation_status(name, f"translated_files/{{name}}.rml")
+"""
+
+def _run_workers(cwd, workers, count):
+    env = dict(os.environ, SIGMA2RML_REGISTRY_BACKEND="sqlite")
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER.format(backend=BACKEND_DIR, worker=w, count=count)],
+            cwd=cwd, env=env
+        )
+        for w in range(workers)
+    ]
+    assert all(p.wait(timeout=60) == 0 for p in processes)
+
+def test_concurrent_workers_keep_every_record(tmp_path, monkeypatch):
+    """Four processes writing at once end up with every record"""
+    print("=== Concurrent Workers Test ===")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "REGISTRY_BACKEND", "sqlite")
+
+    _run_workers(tmp_path, workers=4, count=50)
+
+    records = db.load_db()
+    assert len(records) == 200
+    assert all(r["translated"] for r in records)
+    print("PASS 200/200 records after concurrent writes")
+
+def test_other_worker_changes_invalidate_cache(tmp_path, monkeypatch):
+    """A cached registry sees records added by another process"""
+    print("=== Cache Invalidation Test ===")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "REGISTRY_BACKEND", "sqlite")
+
+    db.add_file_record("local.yml", "uploaded_files/local.yml")
+    assert [r["filename"] for r in db.load_db()] == ["local.yml"]
+
+    _run_workers(tmp_path, workers=1, count=3)
+
+    assert db.get_file_record("worker0_2.yml") is not None
+    assert len(db.load_db()) == 4
+    print("PASS cache invalidated by another worker")
+
+def test_json_registry_is_imported(tmp_path, monkeypatch):
+    """Switching to SQLite keeps the records of the JSON registry"""
+    monkeypatch.chdir(tmp_path)
+    with open("file_registry.json", "w") as f:
+        json.dump([{"filename": "old.yml", "path": "uploaded_files/old.yml", "title": "Old",
+                    "translated": False, "rml_path": None}], f)
+
+    monkeypatch.setattr(config, "REGISTRY_BACKEND", "sqlite")
+    assert db.get_file_record("old.yml")["title"] == "Old"
+
+    db.delete_file_record("old.yml")
+    assert db.load_db() == []
+
+def test_change_feed(tmp_path):
+    """Feed events from other processes reach subscribers, rotation triggers a reset"""
+    path = str(tmp_path / "events.log")
+    feed = ChangeFeed(path)
+    received = []
+    feed.subscribe(lambda filename, event: received.append((filename, event)))
+
+    # Own events are not echoed back
+    feed.publish("mine.yml", "update")
+    assert feed.poll() == 0
+
+    with open(path, "a") as f:
+        f.write(json.dumps({"pid": -1, "filename": "theirs.yml", "event": "add"}) + "\n")
+        f.write('{"pid": -1, "filename": "partial')
+    assert feed.poll() == 1
+    assert received == [("theirs.yml", "add")]
+
+    feed._rotate()
+    feed.poll()
+    assert received[-1] == (None, "reset")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test the group-commit write-behind registry
+- Many mutations collapse into a few atomic writes
+- Acknowledged (durable) writes survive a hard kill of the process
+"""
+
+import sys
+import os
+import json
+import signal
+import subprocess
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app import config
+from app.storage import db
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+# Child process: keeps adding records, waits for durability on every 5th one and
+# acknowledges it on stdout. The parent SIGKILLs it mid-stream.
+CRASH_WRITER = """
+import sys
+sys.path.insert(0, {backend!r})
+from app.storage.db import add_file_record
+i = 0
+while True:
+    durable = i % 5 == 0
+    add_file_record(f"rule_{{i}}.yml", f"uploaded_files/rule_{{i}}.yml", durable=durable)
+    if durable:
+        print(f"ACK rule_{{i}}.yml", flush=True)
+    i += 1
+"""
+
+def test_group_commit(tmp_path, monkeypatch):
+    """Hundreds of mutations are persisted with a handful of writes"""
+    print("=== Group Commit Test ===")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "REGISTRY_FLUSH_INTERVAL_MS", 50.0)
+    monkeypatch.setattr(config, "REGISTRY_FLUSH_BATCH", 1000)
+
+    for i in range(500):
+        db.add_file_record(f"rule_{i}.yml", f"uploaded_files/rule_{i}.yml")
+        db.update_translation_status(f"rule_{i}.yml", f"translated_files/rule_{i}.rml")
+
+    assert len(db.load_db()) == 500
+    assert db.wait_durable(timeout=5)
+
+    registry = db.get_registry()
+    print(f"1000 mutations, {registry.flush_count} writes")
+    assert registry.flush_count < 10
+
+    with open("file_registry.json") as f:
+        on_disk = json.load(f)
+    assert len(on_disk) == 500 and all(r["translated"] for r in on_disk)
+    print("PASS group commit")
+
+def test_write_through_when_interval_is_zero(tmp_path, monkeypatch):
+    """An interval of 0 keeps the old synchronous behavior"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "REGISTRY_FLUSH_INTERVAL_MS", 0)
+
+    db.add_file_record("sync.yml", "uploaded_files/sync.yml")
+    with open("file_registry.json") as f:
+        assert [r["filename"] for r in json.load(f)] == ["sync.yml"]
+
+def test_external_edit_is_picked_up(tmp_path, monkeypatch):
+    """A registry rewritten by hand is reloaded when nothing is pending"""
+    monkeypatch.chdir(tmp_path)
+    db.add_file_record("first.yml", "uploaded_files/first.yml", durable=True)
+
+    with open("file_registry.json", "w") as f:
+        json.dump([{"filename": "edited.yml", "path": "p", "title": "", "translated": False, "rml_path": None}], f)
+    os.utime("file_registry.json", ns=(0, 0))
+
+    assert [r["filename"] for r in db.load_db()] == ["edited.yml"]
+
+def test_acknowledged_writes_survive_kill(tmp_path):
+    """SIGKILL mid-stream never loses an acknowledged record or leaves a torn file"""
+    print("=== Crash Recovery Test ===")
+    child = subprocess.Popen(
+        [sys.executable, "-c", CRASH_WRITER.format(backend=os.path.abspath(BACKEND_DIR))],
+        cwd=tmp_path,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+
+    acknowledged = []
+    try:
+        for line in child.stdout:
+            acknowledged.append(line.split()[1])
+            if len(acknowledged) >= 40:
+                break
+    finally:
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+
+    with open(tmp_path / "file_registry.json") as f:
+        on_disk = {r["filename"] for r in json.load(f)}
+
+    missing = [name for name in acknowledged if name not in on_disk]
+    print(f"{len(acknowledged)} acknowledged, {len(on_disk)} on disk, {len(missing)} missing")
+    assert acknowledged and not missing
+    print("PASS no acknowledged write lost")
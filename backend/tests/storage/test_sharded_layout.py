@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the hash-sharded storage layout
+- Upload, translate and delete through the API land in shard directories
+- One-shot migration of the flat layout
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.storage.layout import ShardedStorage, content_hash, migrate_flat_layout, uploads, translations
+from app.storage.db import get_file_record
+
+SIGMA_RULE = b"""title: Sharded Layout Rule
+logsource:
+  product: windows
+  service: security
+detection:
+  selection:
+    EventID: 4625
+  condition: selection
+"""
+
+def test_location_for():
+    """Locations are derived from the content hash prefix"""
+    storage = ShardedStorage("uploaded_files")
+    digest = content_hash(b"hello")
+    assert storage.location_for("rule.yml", digest) == f"uploaded_files/{digest[:2]}/{digest[2:4]}/rule.yml"
+    assert storage.is_sharded(f"uploaded_files/{digest[:2]}/{digest[2:4]}/rule.yml")
+    assert not storage.is_sharded("uploaded_files/rule.yml")
+
+def test_upload_translate_delete_roundtrip(tmp_path, monkeypatch):
+    """Files move through the API in the sharded layout and shards are pruned on delete"""
+    print("=== Sharded Roundtrip Test ===")
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+
+    response = client.post("/upload/", files={"file": ("sharded.yml", SIGMA_RULE)})
+    assert response.status_code == 200
+    record = get_file_record("sharded.yml")
+    assert uploads.is_sharded(record["path"])
+    assert record["sha256"] == content_hash(SIGMA_RULE)
+    assert os.path.exists(record["path"])
+    print(f"PASS uploaded to {record['path']}")
+
+    duplicate = client.post("/upload/", files={"file": ("sharded.yml", SIGMA_RULE)})
+    assert duplicate.status_code == 400
+
+    response = client.post("/translate/sharded.yml")
+    assert response.status_code == 200
+    record = get_file_record("sharded.yml")
+    assert translations.is_sharded(record["rml_path"])
+    assert client.get("/files/sharded.yml/rml").json()["rml"] == response.json()["rml_text"]
+    print(f"PASS translated to {record['rml_path']}")
+
+    response = client.delete("/files/sharded.yml")
+    assert response.status_code == 200
+    assert os.listdir("uploaded_files") == []
+    assert os.listdir("translated_files") == []
+    print("PASS delete pruned empty shards")
+
+def test_migrate_flat_layout(tmp_path, monkeypatch):
+    """Flat registry entries are moved into shards, running twice is a no-op"""
+    print("=== Flat Layout Migration Test ===")
+    monkeypatch.chdir(tmp_path)
+
+    os.makedirs("uploaded_files")
+    os.makedirs("translated_files")
+    with open("uploaded_files/flat.yml", "wb") as f:
+        f.write(SIGMA_RULE)
+    with open("translated_files/flat.rml", "w") as f:
+        f.write("Monitor = safe_selection*;")
+    with open("file_registry.json", "w") as f:
+        json.dump([{
+            "filename": "flat.yml",
+            "path": "uploaded_files/flat.yml",
+            "title": "Flat",
+            "translated": True,
+            "rml_path": "translated_files/flat.rml"
+        }], f)
+
+    assert migrate_flat_layout() == 2
+    record = get_file_record("flat.yml")
+    assert uploads.is_sharded(record["path"]) and os.path.exists(record["path"])
+    assert translations.is_sharded(record["rml_path"]) and os.path.exists(record["rml_path"])
+    assert not os.path.exists("uploaded_files/flat.yml")
+    assert migrate_flat_layout() == 0
+    print("PASS migration moved 2 files and is idempotent")